@@ -196,6 +196,9 @@ def revert_world(world_uid):
     """Reverts the world to the last saved state."""
     data = micropsi_core.runtime.world_data[world_uid]
     micropsi_core.runtime.worlds[world_uid] = get_world_class_from_name(data.world_type)(**data)
+    for nodenet in micropsi_core.runtime.nodenets.values():
+        if nodenet.state.get("world") == world_uid:
+            nodenet.world_binding.invalidate_agent()
     return True
 
 
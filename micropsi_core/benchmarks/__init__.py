@@ -0,0 +1,6 @@
+#!/usr/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks for the nodenet implementation, to be run as scripts, e.g. python -m micropsi_core.benchmarks.memory
+"""
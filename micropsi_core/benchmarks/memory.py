@@ -0,0 +1,99 @@
+#!/usr/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Memory benchmark
+
+Generates nodenets with the given numbers of links (and one node for every ten links, of mixed node types),
+loads them the way the runtime loads saved nodenets, and reports the memory retained per node and per link,
+including the nodenet state the objects are backed by.
+
+    python -m micropsi_core.benchmarks.memory --links 10000 100000 1000000
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import tempfile
+import tracemalloc
+
+from micropsi_core.nodenet.node import STANDARD_NODETYPES
+from micropsi_core.nodenet.nodenet import Nodenet, NODENET_VERSION
+
+NODETYPES = ("Register", "Concept", "Script", "Pipe")
+
+
+def generate_nodenet_data(links, nodes=None, seed=42):
+    """Returns the JSON string of a random nodenet with the given number of links, in the format of a saved
+    nodenet"""
+    rng = random.Random(seed)
+    nodes = nodes or max(1, links // 10)
+    data = {
+        "version": NODENET_VERSION,
+        "uid": "benchmark",
+        "nodes": {},
+        "links": {},
+        "monitors": {},
+        "nodespaces": {"Root": {}},
+        "step": 0,
+        "settings": {}
+    }
+    uids = []
+    for i in range(nodes):
+        uid = "n%d" % i
+        nodetype = NODETYPES[i % len(NODETYPES)]
+        data["nodes"][uid] = {"uid": uid, "name": uid, "type": nodetype, "parent_nodespace": "Root",
+                              "position": [i % 1000, i // 1000]}
+        uids.append(uid)
+    for i in range(links):
+        source = rng.choice(uids)
+        target = rng.choice(uids)
+        uid = "l%d" % i
+        data["links"][uid] = {
+            "uid": uid,
+            "source_node_uid": source,
+            "source_gate_name": rng.choice(STANDARD_NODETYPES[data["nodes"][source]["type"]]["gatetypes"]),
+            "target_node_uid": target,
+            "target_slot_name": rng.choice(STANDARD_NODETYPES[data["nodes"][target]["type"]]["slottypes"]),
+            "weight": rng.choice([1, 0.5, -0.3]),
+            "certainty": 1}
+    return json.dumps(data)
+
+
+def measure(string):
+    """Loads the given nodenet string from a file and returns the number of bytes retained by the nodenet,
+    and its numbers of nodes and links"""
+    handle, filename = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(handle, 'w') as file:
+        file.write(string)
+    del string
+    try:
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        nodenet = Nodenet(filename, name="benchmark", nodetypes=STANDARD_NODETYPES, native_modules={})
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+    finally:
+        os.remove(filename)
+    return retained, len(nodenet.nodes), len(nodenet.links)
+
+
+def main(sizes):
+    print("%10s %10s %16s %16s" % ("links", "nodes", "bytes per node", "bytes per link"))
+    for links in sizes:
+        nodes = max(1, links // 10)
+        node_bytes, node_count, _ = measure(generate_nodenet_data(0, nodes=nodes))
+        total_bytes, _, link_count = measure(generate_nodenet_data(links, nodes=nodes))
+        print("%10d %10d %16.0f %16.0f" % (link_count, node_count, node_bytes / node_count,
+                                           (total_bytes - node_bytes) / max(1, link_count)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the memory used per node and per link.")
+    parser.add_argument('--links', type=int, nargs='+', default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+    main(args.links)
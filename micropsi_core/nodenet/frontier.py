@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+"""
+Event-driven stepping
+
+In event-driven stepping, a step only spreads activation from the gates that emit activation, and only calculates
+the node functions of the nodes whose state can change (the frontier of the net):
+    - nodes whose slots receive activation in this step, or received activation in the previous step
+    - nodes whose activation or gates changed when they were calculated in the previous step
+    - nodes whose activation or gates have been set from the outside since the previous step (their gates are
+      spread, too)
+    - nodes that are always active: sensors, actors, native modules whose definition sets "always_active",
+      and pipes that use a lock
+A node that is not part of the frontier would calculate the same values again, so its gates keep their activation.
+Changes to the topology, link weights, node and gate parameters, gate functions or activators cause one full step.
+
+Once nothing emits activation and the frontier is empty, the net is quiescent, and a step costs next to nothing:
+the nodenet runner does not step a quiescent net at all, but only advances its step counter (see
+Nodenet.idle_step), until something changes the net from the outside or a scheduled event is due. A net with
+sensors or actors is never quiescent, because they are calculated in every step.
+The mode is selected per nodenet, by setting "stepping" to "event_driven" in the nodenet settings. It pays off for
+nets that are mostly idle; on a net where most nodes are active in every step, the bookkeeping of the frontier makes
+a step slower than a full step (e.g. 256ms instead of 166ms on a random net of 2000 nodes).
+"""
+
+from collections import OrderedDict
+
+
+class FrontierStepper(object):
+    """Spreads activation and calculates node functions for the frontier of a nodenet.
+
+    Attributes:
+        nodenet: the nodenet to step
+        plan: the step plan the orders below were built from
+        full: if True, the next step spreads all gates and calculates all nodes
+        order: a dict of node uids and their position in the step plan
+        gate_order: a dict of linked gates and their position in the step plan
+        activators: the uids of the activator nodes
+        always_active: the uids of the nodes that are calculated in every step
+        emitting: the linked gates with a non-zero activation, or with more than the default sheaf
+        receivers: the uids of the nodes whose slots received activation in the last step
+        previous_receivers: the uids of the nodes whose slots received activation in the step before
+        changed: the uids of the nodes whose activation or gates changed in the last step
+    """
+
+    def __init__(self, nodenet):
+        self.nodenet = nodenet
+        self.plan = None
+        self.full = True
+        self.order = {}
+        self.gate_order = {}
+        self.activators = set()
+        self.always_active = set()
+        self.emitting = set()
+        self.receivers = set()
+        self.previous_receivers = set()
+        self.changed = set()
+
+    @property
+    def is_quiescent(self):
+        """True if the next step will neither spread activation nor calculate any node function"""
+        return not (self.full or self.emitting or self.receivers or self.changed or self.always_active or
+                    self.nodenet.touched_nodes)
+
+    def invalidate(self):
+        """Makes the next step a full step"""
+        self.full = True
+
+    def rebuild(self, plan):
+        self.plan = plan
+        self.full = True
+        nodes = list(plan.nativemodules.items()) + list(plan.everythingelse.items())
+        self.order = dict((uid, i) for i, (uid, node) in enumerate(nodes))
+        self.gate_order = dict((gate, i) for i, gate in enumerate(plan.linked_gates))
+        self.activators = set(plan.activators.keys())
+        self.always_active = set(uid for uid, node in nodes if (node.nodetype is not None and node.nodetype.always_active)
+                                 or node.get_parameter('sublock') is not None)
+
+    def propagate(self, plan):
+        """Resets the slots that received activation in the last step, and spreads the emitting gates"""
+        if plan is not self.plan:
+            self.rebuild(plan)
+        self.previous_receivers = self.receivers
+        if self.full:
+            nodes = plan.nodes_with_slots
+            gates = plan.linked_gates
+        else:
+            nodes = [self.nodenet.nodes[uid] for uid in self.previous_receivers if uid in self.nodenet.nodes]
+            gates = set(self.emitting)
+            for uid in self.nodenet.touched_nodes:    # gates may have been set from the outside
+                if uid in self.nodenet.nodes:
+                    gates.update(gate for gate in self.nodenet.nodes[uid].gates.values() if gate.outgoing)
+            gates = sorted(gates, key=self.gate_order.get)
+        self.nodenet.propagate_gate_activation(nodes, gates)
+        self.receivers = set(link.target_node.uid for gate in gates for link in gate.outgoing.values())
+
+    def calculate_node_functions(self, plan):
+        """Calculates the node functions of the frontier, in the order of the step plan"""
+        nodenet = self.nodenet
+        full = self.full
+        self.full = False
+        frontier = self.receivers | self.previous_receivers | self.changed | self.always_active
+        frontier.update(nodenet.touched_nodes - self.activators)  # activators are set at the end of every step
+        nodenet.touched_nodes.clear()
+
+        activators = plan.activators if full else self.select(plan.activators, frontier)
+        activator_values = [(node, nodenet.nodespaces[node.parent_nodespace].activators.get(node.parameters['type']))
+                            for node in activators.values()]
+        nodenet.calculate_node_functions(activators)
+        for node, value in activator_values:
+            if nodenet.nodespaces[node.parent_nodespace].activators.get(node.parameters['type']) != value:
+                full = True
+
+        if full:
+            self.emitting = set()
+        nativemodules = plan.nativemodules if full else self.select(plan.nativemodules, frontier)
+        changed = self.calculate(nativemodules)
+        frontier.update(nodenet.touched_nodes)  # nodes set by native modules
+        everythingelse = plan.everythingelse if full else self.select(plan.everythingelse, frontier)
+        changed.update(self.calculate(everythingelse))
+
+        nodenet.touched_nodes.difference_update(nativemodules.keys())
+        nodenet.touched_nodes.difference_update(everythingelse.keys())
+        self.changed = changed
+
+    def select(self, nodes, frontier):
+        """Returns the nodes of the given dict that are part of the frontier, in the order of the step plan"""
+        return OrderedDict((uid, nodes[uid]) for uid in sorted((uid for uid in frontier if uid in nodes),
+                                                               key=self.order.get))
+
+    def calculate(self, nodes):
+        """Calculates the given nodes, updates the emitting gates and returns the uids of the changed nodes"""
+        before = dict((uid, self.get_signature(node)) for uid, node in nodes.items())
+        self.nodenet.calculate_node_functions(nodes)
+        changed = set()
+        for uid, node in nodes.items():
+            if self.get_signature(node) != before[uid]:
+                changed.add(uid)
+            for gate in node.gates.values():
+                if gate.outgoing:
+                    if len(gate.sheaves) > 1 or gate.sheaves.get_activation('default') != 0:
+                        self.emitting.add(gate)
+                    else:
+                        self.emitting.discard(gate)
+        return changed
+
+    def get_signature(self, node):
+        """Returns a value that changes whenever the sheaves of the node or of its gates change"""
+        return (node.sheaves.ids.tobytes(), node.sheaves.activations.tobytes(),
+                tuple((gate.sheaves.ids.tobytes(), gate.sheaves.activations.tobytes()) for gate in node.gates.values()))
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+"""
+Vectorized gate functions
+
+The gate functions of a nodespace are compiled as scalar python functions of x (the input activation), r (rho) and
+t (theta), and called once per gate. Gate functions that consist of a single return statement with an arithmetic
+expression of x, r, t, numbers, math constants and math functions (e.g. "return 1/(1+math.exp(-t*x))") are also
+compiled into a numpy expression, which calculates the gate functions of many gates in one call.
+
+The expression is read from the source of the scalar function: micropsi_core.tools.create_function attaches the
+source of every function it compiles as the function's docstring (inspect.getsource can not find the source of
+these functions, because they have no file). Gate functions that have not been compiled from source this way are
+never vectorized.
+
+The nodenet calculates the gates of batched node functions this way: the gates that share a vectorized gate
+function are calculated together, including the activators, thresholds, amplification and limits of the gate
+pipeline. All other gates, and all gates of a group whose expression would raise an error or produce an invalid
+value (e.g. an overflow, or the square root of a negative number), are calculated with their scalar gate
+functions. The numpy functions may differ from the math functions in the last bit, so the activations of
+vectorized gates are equal to the scalar ones within float tolerance, not bit for bit.
+"""
+
+import ast
+import math
+
+import micropsi_core.tools
+from . import vectorized
+
+np = vectorized.np
+
+# the smallest number of gates that are calculated together
+MIN_GATES = 4
+
+# math functions with a numpy equivalent, and the number of their arguments
+MATH_FUNCTIONS = {
+    'exp': ('exp', 1), 'expm1': ('expm1', 1), 'log': ('log', 1), 'log10': ('log10', 1), 'log1p': ('log1p', 1),
+    'sqrt': ('sqrt', 1), 'sin': ('sin', 1), 'cos': ('cos', 1), 'tan': ('tan', 1), 'asin': ('arcsin', 1),
+    'acos': ('arccos', 1), 'atan': ('arctan', 1), 'sinh': ('sinh', 1), 'cosh': ('cosh', 1), 'tanh': ('tanh', 1),
+    'fabs': ('fabs', 1), 'floor': ('floor', 1), 'ceil': ('ceil', 1), 'degrees': ('degrees', 1),
+    'radians': ('radians', 1), 'atan2': ('arctan2', 2), 'hypot': ('hypot', 2), 'pow': ('power', 2)
+}
+MATH_CONSTANTS = ('pi', 'e')
+BUILTINS = {'abs': ('absolute', 1), 'min': ('minimum', 2), 'max': ('maximum', 2)}
+OPERATORS = {ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/', ast.FloorDiv: '//', ast.Mod: '%',
+             ast.Pow: '**'}
+UNARY_OPERATORS = {ast.USub: '-', ast.UAdd: '+'}
+VARIABLES = ('x', 'r', 't')
+
+# vectorized gate functions (or None) by source
+vectorized_functions = {}
+
+
+def is_number(node):
+    value = getattr(node, 'value', getattr(node, 'n', None))
+    return (node.__class__.__name__ in ('Constant', 'Num') and isinstance(value, (int, float)) and
+            not isinstance(value, bool))
+
+
+def translate(node):
+    """Returns the numpy expression for the given expression node, raises a ValueError if it is not vectorizable"""
+    if is_number(node):
+        return repr(getattr(node, 'value', getattr(node, 'n', None)))
+    if isinstance(node, ast.Name) and node.id in VARIABLES:
+        return node.id
+    if isinstance(node, ast.BinOp) and type(node.op) in OPERATORS:
+        return "(%s %s %s)" % (translate(node.left), OPERATORS[type(node.op)], translate(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+        return "(%s%s)" % (UNARY_OPERATORS[type(node.op)], translate(node.operand))
+    if (isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == 'math' and
+            node.attr in MATH_CONSTANTS):
+        return "math.%s" % node.attr
+    if isinstance(node, ast.Call) and not node.keywords and not getattr(node, 'starargs', None) and \
+            not getattr(node, 'kwargs', None):
+        function = None
+        if (isinstance(node.func, ast.Attribute) and isinstance(node.func.value, ast.Name) and
+                node.func.value.id == 'math'):
+            function = MATH_FUNCTIONS.get(node.func.attr)
+        elif isinstance(node.func, ast.Name):
+            function = BUILTINS.get(node.func.id)
+        if function is not None and len(node.args) == function[1]:
+            return "np.%s(%s)" % (function[0], ", ".join(translate(arg) for arg in node.args))
+    raise ValueError("Not vectorizable: %s" % ast.dump(node))
+
+
+def get_source(gatefunction):
+    """Returns the source of a gate function that has been compiled by micropsi_core.tools.create_function, which
+    keeps it in the docstring of the function, or None for other functions"""
+    if getattr(gatefunction, '__globals__', {}).get('__name__') != "SUBENV":
+        return None
+    source = gatefunction.__doc__
+    return source if isinstance(source, str) else None
+
+
+def vectorize(source):
+    """Returns a numpy function of the arrays x, r and t for the given gate function source, or None if numpy is
+    not available or the source is not a single return statement with a vectorizable expression"""
+    if source in vectorized_functions:
+        return vectorized_functions[source]
+    function = None
+    if np is not None:
+        try:
+            body = ast.parse(source.strip()).body
+            if len(body) == 1 and isinstance(body[0], ast.Return) and body[0].value is not None:
+                function = micropsi_core.tools.create_function("return " + translate(body[0].value),
+                    parameters="x, r, t", additional_symbols={'np': np, 'math': math})
+        except (SyntaxError, ValueError):
+            function = None
+    vectorized_functions[source] = function
+    return function
+
+
+def calculate_gates(gate_values):
+    """Calls the gate functions of the gates in the given list of (gate, value) tuples with their values, in the
+    default sheaf. Gates whose gate functions can be vectorized are calculated in groups, all others one by one."""
+    groups = {}
+    for gate, value in gate_values:
+        if gate.custom_gate_function is None:
+            pipeline = gate.pipeline or gate.get_pipeline()
+            gatefunction = pipeline[1]
+            source = get_source(gatefunction) if gatefunction is not None else None
+            if source is not None:
+                function = vectorize(source)
+                if function is not None:
+                    groups.setdefault(function, []).append((gate, value, pipeline))
+                    continue
+        gate.gate_function(value)
+    for function, group in groups.items():
+        if len(group) < MIN_GATES or not calculate_group(function, group):
+            for gate, value, pipeline in group:
+                gate.gate_function(value)
+
+
+def calculate_group(function, group):
+    """Calculates the given (gate, value, pipeline) tuples with the given vectorized gate function, like
+    Gate.gate_function does for every gate (equal within float tolerance). Returns False, and changes nothing, if
+    the expression raises an error or produces an invalid value for any of the gates."""
+    x = np.array([0.0 if value is None else value for gate, value, pipeline in group], dtype=np.float64)
+    r = np.array([pipeline[2] for gate, value, pipeline in group], dtype=np.float64)
+    t = np.array([pipeline[3] for gate, value, pipeline in group], dtype=np.float64)
+    try:
+        with np.errstate(all='raise'):
+            # expressions without x, r or t return a scalar (numpy 1.8 has no broadcast_to)
+            activation = np.asarray(function(x, r, t), dtype=np.float64) * np.ones_like(x)
+            factor = np.array([pipeline[0].get(gate.type, 1.0) for gate, value, pipeline in group], dtype=np.float64)
+            threshold = np.array([pipeline[4] for gate, value, pipeline in group], dtype=np.float64)
+            amplification = np.array([pipeline[5] for gate, value, pipeline in group], dtype=np.float64)
+            minimum = np.array([pipeline[6] for gate, value, pipeline in group], dtype=np.float64)
+            maximum = np.array([pipeline[7] for gate, value, pipeline in group], dtype=np.float64)
+            activation = np.where(activation * factor < threshold, 0.0, activation * amplification * factor)
+            activation = np.minimum(maximum, np.maximum(minimum, activation))
+            activation = np.where(factor == 0.0, 0.0, activation)
+    except (FloatingPointError, ArithmeticError, ValueError, TypeError):
+        return False
+    if np.isnan(activation).any():
+        return False
+    for (gate, value, pipeline), gate_activation in zip(group, activation.tolist()):
+        gate.sheaves.set_activation('default', gate_activation)
+        gate.node.report_gate_sheaves(gate.type, gate.sheaves)
+    return True
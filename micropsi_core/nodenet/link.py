@@ -20,6 +20,8 @@ class Link(object):
     You may retrieve links either from the global dictionary (by uid), or from the gates of nodes themselves.
     """
 
+    __slots__ = ('nodenet', 'data', 'source_node_pointer', 'target_node_pointer')
+
     @property
     def uid(self):
         return self.data.get("uid")
@@ -31,6 +33,7 @@ class Link(object):
     @weight.setter
     def weight(self, value):
         self.data["weight"] = value
+        self.nodenet.invalidate_engine()
 
     @property
     def certainty(self):
@@ -74,6 +77,12 @@ class Link(object):
     def target_slot(self, slot):
         self.data["target_slot_name"] = slot.type
 
+    @property
+    def index_key(self):
+        """The key of the link in the link index of the nodenet: (source uid, gate type, target uid, slot type)"""
+        return (self.data["source_node_uid"], self.data["source_gate_name"],
+                self.data["target_node_uid"], self.data["target_slot_name"])
+
     def __init__(self, source_node, source_gate_name, target_node, target_slot_name, weight=1, certainty=1, uid=None):
         """create a link between the source_node and the target_node, from the source_gate to the target_slot.
         Note: you should make sure that no link between source and gate exists.
@@ -100,6 +109,8 @@ class Link(object):
             You may call this function to change the connections of an existing link. If the link is already
             linked, it will be unlinked first.
         """
+        if "source_gate_name" in self.data and self.nodenet.link_index.get(self.index_key) is self:
+            del self.nodenet.link_index[self.index_key]
         if self.source_node:
             if self.source_node != source_node and self.source_gate.type != source_gate_name:
                 del self.source_gate.outgoing[self.uid]
@@ -114,6 +125,8 @@ class Link(object):
         self.certainty = certainty
         self.source_gate.outgoing[self.uid] = self
         self.target_slot.incoming[self.uid] = self
+        self.nodenet.link_index[self.index_key] = self
+        self.nodenet.invalidate_step_plan()
 
     def remove(self):
         """unplug the link from the node net
@@ -121,3 +134,6 @@ class Link(object):
         """
         del self.source_gate.outgoing[self.uid]
         del self.target_slot.incoming[self.uid]
+        if self.nodenet.link_index.get(self.index_key) is self:
+            del self.nodenet.link_index[self.index_key]
+        self.nodenet.invalidate_step_plan()
@@ -34,9 +34,16 @@ class Monitor(object):
         self.data['target'] = self.target = target
 
     def step(self, step):
+        value = self.get_value()
+        if value is not None:
+            self.values[step] = value
+
+    def get_value(self):
+        """Returns the current activation of the observed slot or gate, or None if it does not exist"""
         if self.node_uid in self.nodenet.nodes:
             if self.target in getattr(self.nodenet.nodes[self.node_uid], self.type + 's'):
-                self.values[step] = getattr(self.nodenet.nodes[self.node_uid], self.type + 's')[self.target].sheaves['default']['activation']
+                return getattr(self.nodenet.nodes[self.node_uid], self.type + 's')[self.target].sheaves['default']['activation']
+        return None
 
     def clear(self):
         self.data['values'] = {}
@@ -22,6 +22,8 @@ class NetEntity(object):
         parent_nodespace: the node space this entity is contained in
     """
 
+    __slots__ = ('nodenet', 'data', 'entitytype')
+
     @property
     def uid(self):
         return self.data.get("uid")
@@ -37,6 +39,8 @@ class NetEntity(object):
     @name.setter
     def name(self, string):
         self.data["name"] = string
+        if self.entitytype == "nodes" and self.uid in self.nodenet.nodes:
+            self.nodenet.node_index.update(self)
 
     @property
     def position(self):
@@ -45,6 +49,8 @@ class NetEntity(object):
     @position.setter
     def position(self, pos):
         self.data["position"] = pos
+        if self.entitytype == "nodes" and self.uid in self.nodenet.nodes:
+            self.nodenet.node_positions.update(self.uid, self.parent_nodespace, pos)
 
     @property
     def parent_nodespace(self):
@@ -65,6 +71,13 @@ class NetEntity(object):
                 if old_parent and old_parent.uid != uid and self.uid in old_parent.netentities.get(self.entitytype, []):
                     old_parent.netentities[self.entitytype].remove(self.uid)
         self.data['parent_nodespace'] = uid
+        if self.entitytype == "nodes" and self.uid in self.nodenet.nodes:
+            self.nodenet.node_positions.update(self.uid, uid, self.position)
+            self.nodenet.node_index.update(self)
+            # the gate pipelines hold the activators and gatefunctions of the old nodespace
+            for gate in self.gates.values():
+                gate.invalidate_pipeline()
+            self.nodenet.invalidate_frontier()
 
     def __init__(self, nodenet, parent_nodespace, position, name="", entitytype="abstract_entities",
                  uid=None, index=None):
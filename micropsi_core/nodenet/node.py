@@ -11,9 +11,11 @@ default Nodetypes
 
 """
 
+import sys
 import warnings
 import micropsi_core.tools
 from .netentity import NetEntity
+from .sheaves import Sheaves
 import logging
 
 __author__ = 'joscha'
@@ -44,26 +46,42 @@ class Node(NetEntity):
         node_function: a function to be executed whenever the node receives activation
     """
 
+    __slots__ = ('gates', 'slots', 'sheaves')
+
     @property
     def activation(self):
-        return self.sheaves['default']['activation']
+        return self.sheaves.get_activation('default')
 
     @activation.setter
     def activation(self, activation):
         self.set_sheaf_activation(activation)
 
     def set_sheaf_activation(self, activation, sheaf="default"):
-        sheaves_to_calculate = self.get_sheaves_to_calculate()
-        if sheaf not in sheaves_to_calculate:
-            raise "Sheaf " + sheaf + " can not be set as it hasn't been propagated to any slot"
-
+        if sheaf == "default":
+            # the default sheaf is always calculated, there is no need to collect the sheaves of the slots
+            name = self.sheaves.table.names[0]
+        else:
+            sheaves_to_calculate = self.get_sheaves_to_calculate()
+            if sheaf not in sheaves_to_calculate:
+                raise "Sheaf " + sheaf + " can not be set as it hasn't been propagated to any slot"
+            name = sheaves_to_calculate[sheaf]['name']
+        self.__write_sheaf_activation(activation, sheaf, name)
+
+    def __write_sheaf_activation(self, activation, sheaf, name):
+        """Sets the activation of the given sheaf of the node and of its first gate, without checking whether the
+        sheaf is calculated"""
         if activation is None:
             activation = 0
 
-        self.sheaves[sheaf]['activation'] = float(activation)
-        if 'sheaves' not in self.data:
-            self.data['sheaves'] = {}
-        self.data['sheaves'][sheaf] = {"uid": sheaf, "name": sheaves_to_calculate[sheaf]['name'], "activation": activation}
+        self.sheaves.set_activation(sheaf, float(activation))
+        if self.nodenet.touched_nodes is not None:
+            self.nodenet.touched_nodes.add(self.uid)
+        if self.nodenet.lazy_state:
+            self.nodenet.dirty_nodes.add(self.uid)
+        else:
+            if 'sheaves' not in self.data:
+                self.data['sheaves'] = {}
+            self.data['sheaves'][sheaf] = {"uid": sheaf, "name": name, "activation": activation}
         if len(self.nodetype.gatetypes):
             self.set_gate_activation(self.nodetype.gatetypes[0], activation, sheaf)
 
@@ -109,7 +127,7 @@ class Node(NetEntity):
 
         self.gates = {}
         self.slots = {}
-        self.data["type"] = type
+        self.data["type"] = sys.intern(type)
 
         #self.nodetype = self.nodenet.get_nodetype(type)
         self.parameters = dict((key, None) for key in self.nodetype.parameters)
@@ -128,7 +146,10 @@ class Node(NetEntity):
         if state:
             self.state = state
         nodenet.nodes[self.uid] = self
-        self.sheaves = {"default": emptySheafElement.copy()}
+        nodenet.node_positions.update(self.uid, self.parent_nodespace, self.position)
+        nodenet.node_index.update(self)
+        nodenet.invalidate_step_plan()
+        self.sheaves = Sheaves(nodenet.sheaf_table)
 
     def get_gate_parameters(self):
         """Looks into the gates and returns gate parameters if these are defined"""
@@ -142,11 +163,11 @@ class Node(NetEntity):
             return None
 
     def set_gate_activation(self, gate, activation, sheaf="default"):
-        """ sets the activation of the given gate, and calls `report_gate_activation`"""
+        """ sets the activation of the given gate, and calls `report_gate_sheaves`"""
         activation = float(activation)
         if gate in self.gates:
-            self.gates[gate].sheaves[sheaf]['activation'] = activation
-            self.report_gate_activation(gate, self.gates[gate].sheaves[sheaf])
+            self.gates[gate].sheaves.set_activation(sheaf, activation)
+            self.report_gate_sheaves(gate, self.gates[gate].sheaves)
 
     def node_function(self):
         """Called whenever the node is activated or active.
@@ -163,21 +184,29 @@ class Node(NetEntity):
         # call nodefunction of my node type
         if self.nodetype and self.nodetype.nodefunction is not None:
 
+            if self.has_default_sheaf_only():
+                self.__prepare_default_sheaf()
+                self.__calculate_sheaf("default")
+                return
+
             sheaves_to_calculate = self.get_sheaves_to_calculate()
 
             # find node activation to carry over
             node_activation_to_carry_over = {}
             for id in self.sheaves:
                 if id in sheaves_to_calculate:
-                    node_activation_to_carry_over[id] = self.sheaves[id]
+                    node_activation_to_carry_over[id] = self.sheaves.get_activation(id)
 
             # clear activation states
+            lazy_state = self.nodenet.lazy_state
             for gatename in self.gates:
                 gate = self.get_gate(gatename)
-                gate.sheaves = {}
-                self.data['gate_activations'][gatename] = {}
-            self.sheaves = {}
-            self.data['sheaves'] = {}
+                gate.sheaves.clear()
+                if not lazy_state:
+                    self.data['gate_activations'][gatename] = {}
+            self.sheaves.clear()
+            if not lazy_state:
+                self.data['sheaves'] = {}
 
             # calculate activation states for all open sheaves
             for sheaf_id in sheaves_to_calculate:
@@ -185,22 +214,17 @@ class Node(NetEntity):
                 # prepare sheaves
                 for gatename in self.gates:
                     gate = self.gates[gatename]
-                    gate.sheaves[sheaf_id] = sheaves_to_calculate[sheaf_id].copy()
-                    gate.node.report_gate_activation(gate.type, gate.sheaves[sheaf_id])
+                    gate.sheaves[sheaf_id] = sheaves_to_calculate[sheaf_id]
+                    self.report_gate_sheaves(gate.type, gate.sheaves)
+                self.sheaves[sheaf_id] = sheaves_to_calculate[sheaf_id]
+                name = sheaves_to_calculate[sheaf_id]['name']
                 if sheaf_id in node_activation_to_carry_over:
-                    self.sheaves[sheaf_id] = node_activation_to_carry_over[sheaf_id].copy()
-                    self.set_sheaf_activation(node_activation_to_carry_over[sheaf_id]['activation'], sheaf_id)
+                    self.__write_sheaf_activation(node_activation_to_carry_over[sheaf_id], sheaf_id, name)
                 else:
-                    self.sheaves[sheaf_id] = sheaves_to_calculate[sheaf_id].copy()
-                    self.set_sheaf_activation(0, sheaf_id)
+                    self.__write_sheaf_activation(0, sheaf_id, name)
 
                 # and actually calculate new values for them
-                try:
-                    self.nodetype.nodefunction(netapi=self.nodenet.netapi, node=self, sheaf=sheaf_id, **self.parameters)
-                except Exception:
-                    self.nodenet.is_active = False
-                    self.data["activation"] = -1
-                    raise
+                self.__calculate_sheaf(sheaf_id)
         else:
             # default node function (only using the "default" sheaf)
             if len(self.slots):
@@ -209,6 +233,117 @@ class Node(NetEntity):
                     for type, gate in self.gates.items():
                         gate.gate_function(self.activation)
 
+    def __calculate_sheaf(self, sheaf_id):
+        try:
+            self.nodetype.nodefunction(netapi=self.nodenet.netapi, node=self, sheaf=sheaf_id, **self.parameters)
+        except Exception:
+            self.nodenet.is_active = False
+            self.data["activation"] = -1
+            raise
+
+    def __prepare_default_sheaf(self):
+        """Prepares the node and its gates for calculating the default sheaf, if no slot received any other sheaf.
+        The result is the same as that of the preparation of every sheaf in node_function (the gates start with
+        the activation of the last slot, the node and its first gate with the previous activation of the node),
+        but the sheaf arrays of the node and its gates, and the default entries of the node data, are reused."""
+        nodenet = self.nodenet
+        slot_activation = 0.0
+        for slot in self.slots.values():
+            slot_activation = slot.sheaves.activations[0]
+        sheaves = self.sheaves
+        activation = sheaves.activations[sheaves.ids.index(0)] if 0 in sheaves.ids else 0
+        for gate in self.gates.values():
+            gate.sheaves.reset(slot_activation)
+        sheaves.reset(float(activation))
+        gatetypes = self.nodetype.gatetypes
+        if len(gatetypes) and gatetypes[0] in self.gates:
+            self.gates[gatetypes[0]].sheaves.activations[0] = float(activation)
+
+        if nodenet.touched_nodes is not None:
+            nodenet.touched_nodes.add(self.uid)
+        if nodenet.lazy_state:
+            nodenet.dirty_nodes.add(self.uid)
+            return
+        name = sheaves.table.names[0]
+        if 'gate_activations' not in self.data:
+            self.data['gate_activations'] = {}
+        gate_activations = self.data['gate_activations']
+        for gatetype, gate in self.gates.items():
+            self.__set_default_data(gate_activations, gatetype, name, gate.sheaves.activations[0])
+        self.__set_default_data(self.data, 'sheaves', name, activation)
+
+    @staticmethod
+    def __set_default_data(data, key, name, activation):
+        """Sets data[key] to a dict with only the default sheaf, and updates the existing dict if possible"""
+        entries = data.get(key)
+        if entries is not None and len(entries) == 1 and 'default' in entries:
+            entry = entries['default']
+            entry['name'] = name
+            entry['activation'] = activation
+        else:
+            data[key] = {'default': {"uid": "default", "name": name, "activation": activation}}
+
+    def has_default_sheaf_only(self):
+        """Returns True if none of the slots of the node received activation in any sheaf but the default sheaf"""
+        for slot in self.slots.values():
+            if len(slot.sheaves) > 1:
+                return False
+        return True
+
+    def set_batch_result(self, activation, gate_values, pending=None):
+        """Sets the default sheaf of the node and its gates to the result of a batched node function.
+
+        The gates are prepared like the node function would prepare them, and the gate functions are then called
+        for all gates with a value that is not None.
+
+        Arguments:
+            activation: the new activation of the node
+            gate_values: a dict of gate types and the values to call their gate functions with
+            pending (optional): a list; if given, (gate, value) tuples are appended to it instead of calling the
+                gate functions, so that the caller can calculate the gates of many nodes together
+        """
+        if activation is None:
+            activation = 0
+        initial_activation = 0.0
+        for slotname in self.slots:
+            initial_activation = self.slots[slotname].sheaves.get_activation('default')
+        self.sheaves.reset(float(activation))
+        if self.nodenet.lazy_state:
+            self.nodenet.dirty_nodes.add(self.uid)
+            for gate in self.gates.values():
+                gate.sheaves.reset(initial_activation)
+        else:
+            self.data['sheaves'] = {'default': dict(uid='default', name='default', activation=activation)}
+            for gatetype, gate in self.gates.items():
+                gate.sheaves.reset(initial_activation)
+                self.report_gate_sheaves(gatetype, gate.sheaves)
+        if len(self.nodetype.gatetypes):
+            self.set_gate_activation(self.nodetype.gatetypes[0], activation)
+        for gatetype, value in gate_values.items():
+            if value is not None:
+                if pending is None:
+                    self.gates[gatetype].gate_function(value)
+                else:
+                    pending.append((self.gates[gatetype], value))
+
+    def set_default_activations(self, activation, gate_activations):
+        """Sets the default sheaf of the node and its gates to activations that have been calculated elsewhere,
+        including the gate functions, and removes all other sheaves.
+
+        Arguments:
+            activation: the new activation of the node
+            gate_activations: the new activations of the gates, in the order of the node's gates
+        """
+        self.sheaves.reset(activation)
+        for gate, gate_activation in zip(self.gates.values(), gate_activations):
+            gate.sheaves.reset(gate_activation)
+        if self.nodenet.lazy_state:
+            self.nodenet.dirty_nodes.add(self.uid)
+        else:
+            self.data['sheaves'] = {'default': dict(uid='default', name='default', activation=activation)}
+            for gatetype, gate in self.gates.items():
+                self.report_gate_sheaves(gatetype, gate.sheaves)
+
     def get_gate(self, gatename):
         try:
             return self.gates[gatename]
@@ -241,8 +376,7 @@ class Node(NetEntity):
     def get_sheaves_to_calculate(self):
         sheaves_to_calculate = {}
         for slotname in self.slots:
-            for uid in self.slots[slotname].sheaves:
-                sheaves_to_calculate[uid] = self.slots[slotname].sheaves[uid].copy()
+            sheaves_to_calculate.update(self.slots[slotname].sheaves.to_dict())
         if 'default' not in sheaves_to_calculate:
             sheaves_to_calculate['default'] = emptySheafElement.copy()
         return sheaves_to_calculate
@@ -250,27 +384,73 @@ class Node(NetEntity):
     def set_gate_parameters(self, gate_type, parameters):
         if 'gate_parameters' not in self.data:
             self.data['gate_parameters'] = {}
+        gate = self.gates[gate_type]
+        self.data['gate_parameters'][gate_type] = gate.parameters
         for parameter, value in parameters.items():
             if parameter in Nodetype.GATE_DEFAULTS:
                 try:
                     value = float(value)
                 except:
                     raise Exception("Standard gate parameters must be numeric")
-            self.data['gate_parameters'][gate_type][parameter] = value
-            self.gates[gate_type].parameters[parameter] = value
+            gate.parameters[parameter] = value
+        gate.invalidate_pipeline()
+        self.nodenet.invalidate_frontier()
 
     def report_gate_activation(self, gate_type, sheafelement):
+        """Records a change of the activation of a gate. The sheaf element may be a SheafElement view of the
+        sheaves of the gate, whose sheaves are then all mirrored into the node data (see report_gate_sheaves), or
+        any mapping with 'uid', 'name' and 'activation'"""
+        sheaves = getattr(sheafelement, 'sheaves', None)
+        if sheaves is not None:
+            self.report_gate_sheaves(gate_type, sheaves)
+            return
+        if self.nodenet.touched_nodes is not None:
+            self.nodenet.touched_nodes.add(self.uid)
+        if self.nodenet.lazy_state:
+            self.nodenet.dirty_nodes.add(self.uid)
+            return
         if 'gate_activations' not in self.data:
             self.data['gate_activations'] = {}
         if gate_type not in self.data['gate_activations']:
             self.data['gate_activations'][gate_type] = {}
-        if sheafelement['uid'] not in self.data['gate_activations'][gate_type]:
-            self.data['gate_activations'][gate_type][sheafelement['uid']] = {}
         self.data['gate_activations'][gate_type][sheafelement['uid']] = {"uid": sheafelement['uid'], "name": sheafelement['name'], "activation": sheafelement['activation']}
 
+    def report_gate_sheaves(self, gate_type, sheaves):
+        """Records a change of the activations of the given sheaves of the given gate: mirrors them into the node
+        data straight from the sheaf arrays, updating the existing entries if the gate still has the same sheaves,
+        or marks the node as dirty if the nodenet state is updated on demand"""
+        nodenet = self.nodenet
+        if nodenet.touched_nodes is not None:
+            nodenet.touched_nodes.add(self.uid)
+        if nodenet.lazy_state:
+            nodenet.dirty_nodes.add(self.uid)
+            return
+        gate_activations = self.data.get('gate_activations')
+        if gate_activations is None:
+            gate_activations = self.data['gate_activations'] = {}
+        entries = gate_activations.get(gate_type)
+        ids = sheaves.ids
+        if entries is not None and len(entries) == len(ids):
+            uids = sheaves.table.uids
+            names = sheaves.table.names
+            for sheaf_id, activation in zip(ids, sheaves.activations):
+                entry = entries.get(uids[sheaf_id])
+                if entry is None:
+                    break
+                entry['name'] = names[sheaf_id]
+                entry['activation'] = activation
+            else:
+                return
+        gate_activations[gate_type] = sheaves.to_dict()
+
+    def materialize_data(self):
+        """Writes the current activations of the node and its gates into the node data"""
+        self.data['sheaves'] = self.sheaves.to_dict()
+        self.data['gate_activations'] = dict((gatetype, gate.sheaves.to_dict()) for gatetype, gate in self.gates.items())
+
     def reset_slots(self):
         for slot in self.slots:
-            self.slots[slot].sheaves = {"default": emptySheafElement.copy()}
+            self.slots[slot].sheaves.reset()
 
     def get_parameter(self, parameter):
         if parameter in self.parameters:
@@ -284,9 +464,11 @@ class Node(NetEntity):
                 del self.data['parameters'][parameter]
             else:
                 self.data['parameters'][parameter] = None
+            self.nodenet.invalidate_frontier()
 
     def set_parameter(self, parameter, value):
         self.parameters[parameter] = value
+        self.nodenet.invalidate_frontier()
 
     def set_parameters(self, parameters):
         for key in parameters:
@@ -313,16 +495,21 @@ class Gate(object):  # todo: take care of gate functions at the level of nodespa
         activation: a numerical value which is calculated at every step by the gate function
         parameters: a dictionary of values used by the gate function
         gate_function: called by the node function, updates the activation
+        custom_gate_function: a function that replaces the gate function of this gate, or None
         outgoing: the set of links originating at the gate
+        pipeline: the activators of the parent nodespace, the gatefunction and the gate parameters, as used by the
+            gate function, or None if they have to be looked up again
     """
 
+    __slots__ = ('type', 'node', 'sheaves', 'outgoing', 'parameters', 'custom_gate_function', 'pipeline')
+
     @property
     def activation(self):
-        return self.sheaves['default']['activation']
+        return self.sheaves.get_activation('default')
 
     @activation.setter
     def activation(self, activation):
-        self.sheaves['default']['activation'] = activation
+        self.sheaves.set_activation('default', activation)
 
     def __init__(self, type, node, sheaves=None, gate_function=None, parameters=None, gate_defaults=None):
         """create a gate.
@@ -332,17 +519,12 @@ class Gate(object):  # todo: take care of gate functions at the level of nodespa
             node: the parent node
             parameters: an optional dictionary of parameters for the gate function
         """
-        self.type = type
+        self.type = sys.intern(type)
         self.node = node
-        if sheaves is None:
-            self.sheaves = {"default": emptySheafElement.copy()}
-        else:
-            self.sheaves = {}
-            for key in sheaves:
-                self.sheaves[key] = dict(uid=sheaves[key]['uid'], name=sheaves[key]['name'], activation=sheaves[key]['activation'])
-        self.node.report_gate_activation(self.type, self.sheaves['default'])
+        self.sheaves = Sheaves(node.nodenet.sheaf_table, sheaves)
+        self.node.report_gate_sheaves(self.type, self.sheaves)
         self.outgoing = {}
-        self.gate_function = gate_function or self.gate_function
+        self.custom_gate_function = gate_function
         self.parameters = {}
         if gate_defaults is not None:
             self.parameters = gate_defaults.copy()
@@ -356,7 +538,26 @@ class Gate(object):  # todo: take care of gate functions at the level of nodespa
                         self.parameters[key] = Nodetype.GATE_DEFAULTS.get(key, 0)
                 else:
                     self.parameters[key] = float(parameters[key])
-        self.monitor = None
+        self.pipeline = None
+
+    def get_pipeline(self):
+        """Looks up the activators of the parent nodespace, the gatefunction and the gate parameters once, and
+        keeps them until the gatefunction or the gate parameters change"""
+        if self.pipeline is None:
+            nodespace = self.node.nodenet.nodespaces[self.node.parent_nodespace]
+            self.pipeline = (
+                nodespace.activators,
+                nodespace.get_gatefunction(self.node.type, self.type),
+                self.parameters.get('rho', 0),
+                self.parameters.get('theta', 0),
+                self.parameters['threshold'],
+                self.parameters['amplification'],
+                self.parameters['minimum'],
+                self.parameters['maximum'])
+        return self.pipeline
+
+    def invalidate_pipeline(self):
+        self.pipeline = None
 
     def gate_function(self, input_activation, sheaf="default"):
         """This function sets the activation of the gate.
@@ -365,31 +566,29 @@ class Gate(object):  # todo: take care of gate functions at the level of nodespa
         if necessary. This default gives a linear function (input * amplification), cut off below a threshold.
         You might want to replace it with a radial basis function, for instance.
         """
+        if self.custom_gate_function is not None:
+            return self.custom_gate_function(input_activation, sheaf)
         if input_activation is None: input_activation = 0
 
+        activators, gatefunction, rho, theta, threshold, amplification, minimum, maximum = \
+            self.pipeline or self.get_pipeline()
 
         # check if the current node space has an activator that would prevent the activity of this gate
-        nodespace = self.node.nodenet.nodespaces[self.node.parent_nodespace]
-        if self.type in nodespace.activators:
-            gate_factor = nodespace.activators[self.type]
-        else:
-            gate_factor = 1.0
+        gate_factor = activators.get(self.type, 1.0)
         if gate_factor == 0.0:
-            self.sheaves[sheaf]['activation'] = 0
-            self.node.report_gate_activation(self.type, self.sheaves[sheaf])
+            self.sheaves.set_activation(sheaf, 0)
+            self.node.report_gate_sheaves(self.type, self.sheaves)
             return  # if the gate is closed, we don't need to execute the gate function
             # simple linear threshold function; you might want to use a sigmoid for neural learning
-        gatefunction = self.node.nodenet.nodespaces[self.node.parent_nodespace].get_gatefunction(self.node.type,
-            self.type)
         if gatefunction:
-            activation = gatefunction(input_activation, self.parameters.get('rho', 0), self.parameters.get('theta', 0))
+            activation = gatefunction(input_activation, rho, theta)
         else:
             activation = input_activation
 
-        if activation * gate_factor < self.parameters['threshold']:
+        if activation * gate_factor < threshold:
             activation = 0
         else:
-            activation = activation * self.parameters["amplification"] * gate_factor
+            activation = activation * amplification * gate_factor
 
         # if self.parameters["decay"]:  # let activation decay gradually
         #     if activation < 0:
@@ -397,8 +596,8 @@ class Gate(object):  # todo: take care of gate functions at the level of nodespa
         #     else:
         #         activation = max(activation, self.activation * (1 - self.parameters["decay"]))
 
-        self.sheaves[sheaf]['activation'] = min(self.parameters["maximum"], max(self.parameters["minimum"], activation))
-        self.node.report_gate_activation(self.type, self.sheaves[sheaf])
+        self.sheaves.set_activation(sheaf, min(maximum, max(minimum, activation)))
+        self.node.report_gate_sheaves(self.type, self.sheaves)
 
     def open_sheaf(self, input_activation, sheaf="default"):
         """This function opens a new sheaf and calls the gate function for the newly opened sheaf
@@ -410,10 +609,10 @@ class Gate(object):  # todo: take care of gate functions at the level of nodespa
             sheaf_uid_prefix = sheaf + "-"
             sheaf_name_prefix = self.sheaves[sheaf].name + "-"
 
-        new_sheaf = dict(uid=sheaf_uid_prefix + self.node.uid, name=sheaf_name_prefix + self.node.name, activation=0)
-        self.sheaves[new_sheaf['uid']] = new_sheaf
+        new_sheaf_uid = sheaf_uid_prefix + self.node.uid
+        self.sheaves.add(new_sheaf_uid, sheaf_name_prefix + self.node.name)
 
-        self.gate_function(input_activation, new_sheaf['uid'])
+        self.gate_function(input_activation, new_sheaf_uid)
 
 
 class Slot(object):
@@ -427,6 +626,8 @@ class Slot(object):
         incoming: a dictionary of incoming links together with the respective activation received by them
     """
 
+    __slots__ = ('type', 'node', 'incoming', 'current_step', 'sheaves')
+
     def __init__(self, type, node):
         """create a slot.
 
@@ -434,11 +635,11 @@ class Slot(object):
             type: a string that refers to the slot type
             node: the parent node
         """
-        self.type = type
+        self.type = sys.intern(type)
         self.node = node
         self.incoming = {}
         self.current_step = -1
-        self.sheaves = {"default": emptySheafElement.copy()}
+        self.sheaves = Sheaves(node.nodenet.sheaf_table)
 
     @property
     def activation(self):
@@ -449,7 +650,7 @@ class Slot(object):
             return 0
         if sheaf not in self.sheaves:
             return 0
-        return self.sheaves[sheaf]['activation']
+        return self.sheaves.get_activation(sheaf)
 
 
 STANDARD_NODETYPES = {
@@ -474,14 +675,16 @@ STANDARD_NODETYPES = {
         "name": "Sensor",
         "parameters": ["datasource"],
         "nodefunction_name": "sensor",
-        "gatetypes": ["gen"]
+        "gatetypes": ["gen"],
+        "always_active": True
     },
     "Actor": {
         "name": "Actor",
         "parameters": ["datatarget"],
         "nodefunction_name": "actor",
         "slottypes": ["gen"],
-        "gatetypes": ["gen"]
+        "gatetypes": ["gen"],
+        "always_active": True
     },
     "Concept": {
         "name": "Concept",
@@ -573,7 +776,10 @@ STANDARD_NODETYPES = {
 
 class Nodetype(object):
     """Every node has a type, which is defined by its slot types, gate types, its node function and a list of
-    node parameteres."""
+    node parameteres.
+
+    If the node function comes with a batched node function, nodes of this type that only carry the default sheaf
+    are calculated together, with one call of the batched node function per step."""
 
     GATE_DEFAULTS = {
         "minimum": -1,
@@ -635,9 +841,10 @@ class Nodetype(object):
     @nodefunction_definition.setter
     def nodefunction_definition(self, string):
         self.data["nodefunction_definition"] = string
+        self.batch_nodefunction = None
         args = ','.join(self.parameters).strip(',')
         try:
-            self.nodefunction = micropsi_core.tools.create_function(string,
+            self.nodefunction = micropsi_core.tools.get_function(string,
                 parameters="nodenet, node, " + args)
         except SyntaxError as err:
             warnings.warn("Syntax error while compiling node function: %s", str(err))
@@ -656,9 +863,11 @@ class Nodetype(object):
             from micropsi_core.nodenet import nodefunctions
             if hasattr(nodefunctions, name):
                 self.nodefunction = getattr(nodefunctions, name)
+                self.batch_nodefunction = getattr(nodefunctions, name + "_batch", None)
             else:
                 import nodefunctions as custom_nodefunctions
                 self.nodefunction = getattr(custom_nodefunctions, name)
+                self.batch_nodefunction = getattr(custom_nodefunctions, name + "_batch", None)
 
         except (ImportError, AttributeError) as err:
             warnings.warn("Import error while importing node function: nodefunctions.%s %s" % (name, err))
@@ -673,15 +882,22 @@ class Nodetype(object):
             from imp import reload
             reload(custom_nodefunctions)
             self.nodefunction = getattr(custom_nodefunctions, self.nodefunction_name)
+            self.batch_nodefunction = getattr(custom_nodefunctions, self.nodefunction_name + "_batch", None)
 
     def __init__(self, name, nodenet, slottypes=None, gatetypes=None, states=None, parameters=None,
                  nodefunction_definition=None, nodefunction_name=None, parameter_values=None, gate_defaults=None,
-                 symbol=None, shape=None):
+                 symbol=None, shape=None, always_active=False, time_budget=None, disabled_steps=0, isolated=False):
         """Initializes or creates a nodetype.
 
         Arguments:
             name: a unique identifier for this nodetype
             nodenet: the nodenet that this nodetype is part of
+            always_active: if True, nodes of this type are calculated in every step, even in event-driven stepping
+            time_budget: the number of seconds a call of the node function may take (see watchdog.py). Calls that
+                take longer are reported after they returned; only isolated calls are stopped.
+            disabled_steps: the number of steps a node is not calculated after it exceeded the time budget
+            isolated: if True, the node function is called in a worker process, which is stopped after the time
+                budget
 
         If a nodetype with the same name is already defined in the nodenet, it is overwritten. Parameters that
         are not given here will be taken from the original definition. Thus, you may use this initializer to
@@ -698,6 +914,7 @@ class Nodetype(object):
             }
         """
         self.data = {'name': name}
+        self.batch_nodefunction = None
 
         self.states = self.data.get('states', {}) if states is None else states
         self.slottypes = self.data.get("slottypes", ["gen"]) if slottypes is None else slottypes
@@ -717,6 +934,10 @@ class Nodetype(object):
 
         self.parameters = self.data.get("parameters", []) if parameters is None else parameters
         self.parameter_values = self.data.get("parameter_values", []) if parameter_values is None else parameter_values
+        self.always_active = always_active
+        self.time_budget = None if time_budget is None else float(time_budget)
+        self.disabled_steps = int(disabled_steps or 0)
+        self.isolated = isolated
 
         if nodefunction_definition:
             self.nodefunction_definition = nodefunction_definition
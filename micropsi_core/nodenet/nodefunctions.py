@@ -1,3 +1,15 @@
+"""
+Node functions of the standard node types
+
+A node function is called with the netapi and a single node, and calculates one sheaf of the node.
+Node types may also provide a batched node function, with the name of the node function followed by "_batch".
+It is called with the netapi, a list of nodes of that type that only carry the default sheaf, a list of their
+current activations and a dict that maps each slot type to a list of the nodes' slot activations. It returns
+a list of new node activations, and a dict that maps gate types to lists of the values the nodes' gate functions
+are called with. A gate value of None leaves the gate untouched; a node activation of None marks a node that the
+batched function can not handle, which is calculated with the node function instead.
+"""
+
 
 def register(netapi, node=None, **params):
     node.activation = node.get_slot("gen").activation
@@ -5,22 +17,35 @@ def register(netapi, node=None, **params):
         gate.gate_function(node.get_slot("gen").activation)
 
 
+def register_batch(netapi, nodes, activations, slots):
+    gen = slots["gen"]
+    return list(gen), dict((gatetype, gen) for gatetype in nodes[0].gates)
+
+
 def sensor(netapi, node=None, datasource=None, **params):
-    datasource_value = netapi.world.get_datasource(netapi.uid, datasource)
+    datasource_value = netapi.read_sensors([node])[0]
     node.activation = datasource_value
     node.gates["gen"].gate_function(datasource_value)
 
 
+def sensor_batch(netapi, nodes, activations, slots):
+    values = [0 if value is None else value for value in netapi.read_sensors(nodes)]
+    return values, {"gen": values}
+
+
 def actor(netapi, node=None, datatarget=None, **params):
-    if not netapi.world:
-        return
-    activation_to_set = node.get_slot("gen").activation
-    netapi.world.set_datatarget(netapi.uid, datatarget, activation_to_set)
+    feedback = netapi.write_actors([node], [node.get_slot("gen").activation])
     # if activation_to_set > 0:
         # node.activation = 1
-    feedback = netapi.world.get_datatarget_feedback(netapi.uid, datatarget)
-    if feedback is not None:
-        node.get_gate('gen').gate_function(feedback)
+    if feedback is not None and feedback[0] is not None:
+        node.get_gate('gen').gate_function(feedback[0])
+
+
+def actor_batch(netapi, nodes, activations, slots):
+    feedback = netapi.write_actors(nodes, slots["gen"])
+    if feedback is None:
+        return activations, {}
+    return activations, {"gen": feedback}
 
 
 def concept(netapi, node=None, **params):
@@ -29,6 +54,11 @@ def concept(netapi, node=None, **params):
         gate.gate_function(node.get_slot("gen").activation)
 
 
+def concept_batch(netapi, nodes, activations, slots):
+    gen = slots["gen"]
+    return list(gen), dict((gatetype, gen) for gatetype in nodes[0].gates)
+
+
 def script(netapi, node=None, **params):
     """ Script nodes are state machines that use the node activation for determining their behavior.
         They form hierarchical scripts that are started via sub-activating their top-node. If the sur-activation
@@ -62,93 +92,61 @@ def script(netapi, node=None, **params):
 
     """
 
-    if node.get_slot("sub").activation < 0.01:  # node is not requested and is turned off
-        node.activation = 0.0
-        node.get_gate("por").gate_function(0.0)
-        node.get_gate("ret").gate_function(0.0)
-        node.get_gate("sub").gate_function(0.0)
-        node.get_gate("sur").gate_function(0.0)
-        return
-
-    node.activation = (
-        node.activation if node.activation < -0.01 else  # failed -> failed
-        0.2 if node.activation < 0.01 else  # (we already tested that sub is positive): inactive -> preparing
-        0.4 if node.activation < 0.5 and node.get_slot("por").activation < 0 else  # preparing -> supressed
-        0.6 if node.activation < 0.5 else  # preparing/supressed -> requesting
-        0.8 if node.activation < 0.7 else  # requesting -> pending
-        1.0 if node.get_slot("sur").activation >= 1 else  # pending -> confirmed
-        -1. if node.get_slot("sur").activation <= 0 else  # pending -> failed
-        node.activation
-    )
-
-    # always inhibit successor, except when confirmed
-    node.get_gate("por").gate_function(-1.0 if node.activation < 1 else 1.0)
-    # inhibit confirmation of predecessor, and tell it to stop once successor is requested
-    node.get_gate("ret").gate_function(-1.0 if 0.1 < node.activation < 1 else 1.0)
-    # request children when becoming requesting
-    node.get_gate("sub").gate_function(1.0 if 0.5 < node.activation else 0)
-    # keep parent from failing while pending or processing, confirm parent when confirmed
-    node.get_gate("sur").gate_function(
-        0 if node.activation < 0.01 or node.get_slot("ret").activation > 0 else
-        0.01 if node.activation < 1 else
-        0.01 if node.get_slot("ret").activation < 0 else
-        1)
-
-def pipe(netapi, node=None, sheaf="default", **params):
-    gen = 0.0
-    por = 0.0
-    ret = 0.0
-    sub = 0.0
-    sur = 0.0
-    cat = 0.0
-    exp = 0.0
+    activation, por, ret, sub, sur = _script_activations(node.activation, node.get_slot("sub").activation,
+        node.get_slot("por").activation, node.get_slot("ret").activation, node.get_slot("sur").activation)
+    node.activation = activation
+    node.get_gate("por").gate_function(por)
+    node.get_gate("ret").gate_function(ret)
+    node.get_gate("sub").gate_function(sub)
+    node.get_gate("sur").gate_function(sur)
 
-    neighbors = len(node.get_slot("por").incoming)
 
-    gen += node.get_slot("gen").get_activation(sheaf)
-    if gen < 0.1: gen = 0
-    gen += node.get_slot("sur").get_activation(sheaf)
-    gen += node.get_slot("exp").get_activation(sheaf)
-    if gen > 1: gen = 1
+def script_batch(netapi, nodes, activations, slots):
+    results = [_script_activations(*values) for values in
+               zip(activations, slots["sub"], slots["por"], slots["ret"], slots["sur"])]
+    return [result[0] for result in results], {
+        "por": [result[1] for result in results],
+        "ret": [result[2] for result in results],
+        "sub": [result[3] for result in results],
+        "sur": [result[4] for result in results]}
 
-    sub += max(node.get_slot("sur").get_activation(sheaf), 0)
-    sub += node.get_slot("sub").get_activation(sheaf)
-    sub *= 0 if node.get_slot("por").get_activation(sheaf) < 0 else 1
-    sub *= 0 if node.get_slot("gen").get_activation(sheaf) > 0 else 1
-    if sub > 0: sub = 1
 
-    sur += node.get_slot("sur").get_activation(sheaf)
-    if sur == 0: sur += node.get_slot("sur").get_activation("default")      # no activation in our sheaf, maybe from sensors?
-    sur += 0 if node.get_slot("gen").get_activation(sheaf) < 0.1 else 1
-    sur += node.get_slot("exp").get_activation(sheaf)
-    if sur > 0:     # else: always propagate failure
-        sur *= 0 if node.get_slot("por").get_activation(sheaf) < 0 else 1
-        sur *= 0 if node.get_slot("ret").get_activation(sheaf) < 0 else 1
-    if sur < -1: sur = -1
-    if sur > 1: sur = 1
-    sur /= neighbors if neighbors > 1 else 1
+def _script_activations(activation, sub, por, ret, sur):
+    """Returns the new node activation and the por, ret, sub and sur gate activations of a script node,
+    given its current activation and the activations of its slots"""
+    if sub < 0.01:  # node is not requested and is turned off
+        return 0.0, 0.0, 0.0, 0.0, 0.0
 
-    por += node.get_slot("sur").get_activation(sheaf) * \
-           (1+node.get_slot("por").get_activation(sheaf))
-    por += (0 if node.get_slot("gen").get_activation(sheaf) < 0.1 else 1) * \
-           (1+node.get_slot("por").get_activation(sheaf))
-    por += node.get_slot("por").get_activation(sheaf) if node.get_slot("sub").get_activation(sheaf) == 0 and node.get_slot("sur").get_activation(sheaf) == 0 else 0
-    por += 1 if neighbors > 1 else 0
-    if por <= 0: por = -1
-    if por > 0: por = 1
+    activation = (
+        activation if activation < -0.01 else  # failed -> failed
+        0.2 if activation < 0.01 else  # (we already tested that sub is positive): inactive -> preparing
+        0.4 if activation < 0.5 and por < 0 else  # preparing -> supressed
+        0.6 if activation < 0.5 else  # preparing/supressed -> requesting
+        0.8 if activation < 0.7 else  # requesting -> pending
+        1.0 if sur >= 1 else  # pending -> confirmed
+        -1. if sur <= 0 else  # pending -> failed
+        activation
+    )
 
-    ret += node.get_slot("ret").get_activation(sheaf) if node.get_slot("sub").get_activation(sheaf) == 0 and node.get_slot("sur").get_activation(sheaf) == 0 else 0
-    ret += 1 if neighbors > 1 else 0
-    if ret <= 0: ret = -1
+    return (
+        activation,
+        # always inhibit successor, except when confirmed
+        -1.0 if activation < 1 else 1.0,
+        # inhibit confirmation of predecessor, and tell it to stop once successor is requested
+        -1.0 if 0.1 < activation < 1 else 1.0,
+        # request children when becoming requesting
+        1.0 if 0.5 < activation else 0,
+        # keep parent from failing while pending or processing, confirm parent when confirmed
+        0 if activation < 0.01 or ret > 0 else
+        0.01 if activation < 1 else
+        0.01 if ret < 0 else
+        1)
 
-    cat = sub
-    if cat == 0: cat += node.get_slot("cat").get_activation(sheaf)
-    if cat < 0: cat = 0
 
-    exp += node.get_slot("sur").get_activation(sheaf)
-    exp += node.get_slot("exp").get_activation(sheaf) * 0.1                 # magic priming number
-    if exp == 0: exp += node.get_slot("sur").get_activation("default")      # no activation in our sheaf, maybe from sensors?
-    if exp > 1: exp = 1
+def pipe(netapi, node=None, sheaf="default", **params):
+    gen, por, ret, sub, sur, cat, exp = _pipe_activations(
+        *[node.get_slot(slotname).get_activation(sheaf) for slotname in ("gen", "por", "ret", "sub", "sur", "cat", "exp")],
+        sur_default=node.get_slot("sur").get_activation("default"), neighbors=len(node.get_slot("por").incoming))
 
     # handle locking if configured for this node
     sub_lock_needed = node.get_parameter('sublock')
@@ -184,6 +182,91 @@ def pipe(netapi, node=None, sheaf="default", **params):
         node.get_gate("cat").gate_function(cat, sheaf)
 
 
+def pipe_batch(netapi, nodes, activations, slots):
+    new_activations = []
+    gates = dict((gatetype, []) for gatetype in ("gen", "por", "ret", "sub", "sur", "cat", "exp"))
+    for i, node in enumerate(nodes):
+        values = None
+        if node.get_parameter('sublock') is None:   # locks are acquired in the order of the node function calls
+            values = _pipe_activations(slots["gen"][i], slots["por"][i], slots["ret"][i], slots["sub"][i],
+                slots["sur"][i], slots["cat"][i], slots["exp"][i], sur_default=slots["sur"][i],
+                neighbors=len(node.get_slot("por").incoming))
+            if values[5] > 0 and values[3] > 0:     # opening a cat sheaf needs the node function
+                values = None
+        if values is None:
+            new_activations.append(None)
+            for gatetype in gates:
+                gates[gatetype].append(None)
+        else:
+            new_activations.append(values[0])
+            for gatetype, value in zip(("gen", "por", "ret", "sub", "sur", "cat", "exp"), values):
+                gates[gatetype].append(value)
+    return new_activations, gates
+
+
+def _pipe_activations(gen_in, por_in, ret_in, sub_in, sur_in, cat_in, exp_in, sur_default, neighbors):
+    """Returns the gen, por, ret, sub, sur, cat and exp gate activations of a pipe node for one sheaf, given the
+    activations of its slots in that sheaf, the sur activation in the default sheaf and the number of por links"""
+    gen = 0.0
+    por = 0.0
+    ret = 0.0
+    sub = 0.0
+    sur = 0.0
+    cat = 0.0
+    exp = 0.0
+
+    gen += gen_in
+    if gen < 0.1: gen = 0
+    gen += sur_in
+    gen += exp_in
+    if gen > 1: gen = 1
+
+    sub += max(sur_in, 0)
+    sub += sub_in
+    sub *= 0 if por_in < 0 else 1
+    sub *= 0 if gen_in > 0 else 1
+    if sub > 0: sub = 1
+
+    sur += sur_in
+    if sur == 0: sur += sur_default      # no activation in our sheaf, maybe from sensors?
+    sur += 0 if gen_in < 0.1 else 1
+    sur += exp_in
+    if sur > 0:     # else: always propagate failure
+        sur *= 0 if por_in < 0 else 1
+        sur *= 0 if ret_in < 0 else 1
+    if sur < -1: sur = -1
+    if sur > 1: sur = 1
+    sur /= neighbors if neighbors > 1 else 1
+
+    por += sur_in * (1+por_in)
+    por += (0 if gen_in < 0.1 else 1) * (1+por_in)
+    por += por_in if sub_in == 0 and sur_in == 0 else 0
+    por += 1 if neighbors > 1 else 0
+    if por <= 0: por = -1
+    if por > 0: por = 1
+
+    ret += ret_in if sub_in == 0 and sur_in == 0 else 0
+    ret += 1 if neighbors > 1 else 0
+    if ret <= 0: ret = -1
+
+    cat = sub
+    if cat == 0: cat += cat_in
+    if cat < 0: cat = 0
+
+    exp += sur_in
+    exp += exp_in * 0.1                 # magic priming number
+    if exp == 0: exp += sur_default      # no activation in our sheaf, maybe from sensors?
+    if exp > 1: exp = 1
+
+    return gen, por, ret, sub, sur, cat, exp
+
+
 def activator(netapi, node, **params):
     node.activation = node.get_slot("gen").activation
     netapi.nodespaces[node.parent_nodespace].activators[node.parameters["type"]] = node.activation
+
+
+def activator_batch(netapi, nodes, activations, slots):
+    for node, activation in zip(nodes, slots["gen"]):
+        netapi.nodespaces[node.parent_nodespace].activators[node.parameters["type"]] = activation
+    return list(slots["gen"]), {}
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+"""
+Node index
+
+The nodes of a nodenet are indexed by nodespace, by type and by name, so that the NetAPI can answer queries like
+"the nodes of type Register in nodespace X whose names start with 'foo'" without visiting every node of the net.
+The names are kept in a sorted list, which yields the nodes with a given name prefix by bisection. The index is
+updated whenever a node is created, renamed, moved into another nodespace or deleted. Queries return the nodes in
+the order they have been indexed in (the order of the nodes of the nodenet), regardless of the index they use.
+"""
+
+from bisect import bisect_left, insort
+from itertools import count
+
+
+class NodeIndex(object):
+    """Indexes of the nodes of a nodenet.
+
+    Attributes:
+        nodes: a dict of the uids and nodes in the index
+        entries: a dict of node uids and the (name, nodespace uid, type) they are indexed under
+        by_nodespace: a dict of nodespace uids and dicts of the uids and nodes in these nodespaces
+        by_type: a dict of node types and dicts of the uids and nodes of these types
+        names: a sorted list of (name, uid) tuples
+        order: a dict of node uids and the sequence numbers of their first indexing, which queries sort by
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.nodes = {}
+        self.entries = {}
+        self.by_nodespace = {}
+        self.by_type = {}
+        self.names = []
+        self.order = {}
+        self.counter = count()
+
+    def __contains__(self, uid):
+        return uid in self.entries
+
+    def update(self, node):
+        """Indexes the given node, or updates its entries if its name or nodespace changed"""
+        entry = (node.name, node.parent_nodespace, node.type)
+        previous = self.entries.get(node.uid)
+        if previous == entry:
+            return
+        if previous is not None:
+            self.unindex(node.uid)
+        else:
+            self.order[node.uid] = next(self.counter)
+        name, nodespace, type = entry
+        self.nodes[node.uid] = node
+        self.entries[node.uid] = entry
+        self.by_nodespace.setdefault(nodespace, {})[node.uid] = node
+        self.by_type.setdefault(type, {})[node.uid] = node
+        insort(self.names, (name, node.uid))
+
+    def remove(self, uid):
+        """Removes the node with the given uid from the index, if it has been indexed"""
+        self.unindex(uid)
+        self.order.pop(uid, None)
+
+    def unindex(self, uid):
+        """Removes the entries of the node with the given uid, but keeps its position in the order"""
+        entry = self.entries.pop(uid, None)
+        if entry is None:
+            return
+        name, nodespace, type = entry
+        del self.nodes[uid]
+        for index, key in ((self.by_nodespace, nodespace), (self.by_type, type)):
+            del index[key][uid]
+            if not index[key]:
+                del index[key]
+        del self.names[bisect_left(self.names, (name, uid))]
+
+    def get_name_range(self, prefix):
+        """Returns the positions of the first and behind the last name with the given prefix in the sorted names"""
+        start = bisect_left(self.names, (prefix,))
+        if not prefix or ord(prefix[-1]) == 0x10ffff:
+            return start, len(self.names)
+        end = bisect_left(self.names, (prefix[:-1] + chr(ord(prefix[-1]) + 1),))
+        return start, end
+
+    def get_nodes(self, nodespace=None, name_prefix=None, type=None):
+        """Returns the list of nodes in the given nodespace, with the given name prefix and of the given type, in
+        the order they have been indexed in. The smallest of the matching indexes is scanned and filtered by the
+        other criteria."""
+        candidates = []
+        if nodespace is not None:
+            nodes = self.by_nodespace.get(nodespace, {})
+            candidates.append((len(nodes), 'nodespace', nodes))
+        if type is not None:
+            nodes = self.by_type.get(type, {})
+            candidates.append((len(nodes), 'type', nodes))
+        if name_prefix is not None:
+            start, end = self.get_name_range(name_prefix)
+            candidates.append((end - start, 'name', (start, end)))
+        if not candidates:
+            return sorted(self.nodes.values(), key=lambda node: self.order[node.uid])
+
+        size, index, nodes = min(candidates, key=lambda candidate: candidate[0])
+        if index == 'name':
+            nodes = (self.nodes[uid] for name, uid in self.names[nodes[0]:nodes[1]])
+        else:
+            nodes = nodes.values()
+        result = []
+        for node in nodes:
+            name, node_nodespace, node_type = self.entries[node.uid]
+            if ((nodespace is None or node_nodespace == nodespace) and (type is None or node_type == type) and
+                    (name_prefix is None or name.startswith(name_prefix))):
+                result.append(node)
+        result.sort(key=lambda node: self.order[node.uid])
+        return result
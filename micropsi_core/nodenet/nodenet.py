@@ -3,11 +3,13 @@
 """
 Nodenet definition
 """
+from contextlib import contextmanager
 from copy import deepcopy
 
 import micropsi_core.tools
 import json
 import os
+import time
 
 import warnings
 from .node import Node, Nodetype, emptySheafElement, STANDARD_NODETYPES
@@ -16,6 +18,19 @@ import logging
 from .nodespace import Nodespace
 from .link import Link
 from .monitor import Monitor
+from .stepplan import StepPlan
+from .sheaves import SheafTable
+from .spatialindex import SpatialIndex
+from .nodeindex import NodeIndex
+from .worldbinding import WorldBinding
+from .scheduler import StepScheduler
+from .sheafrouting import SheafRouter
+from .profiler import NodenetProfiler
+from .watchdog import NativeModuleWatchdog
+from .frontier import FrontierStepper
+from . import partitioned
+from . import vectorized
+from . import gatefunctions
 
 __author__ = 'joscha'
 __date__ = '09.05.12'
@@ -80,6 +95,7 @@ class Nodenet(object):
             self.state["world"] = world.uid
         else:
             self.state["world"] = None
+        self.world_binding.invalidate_agent()
 
     @property
     def worldadapter(self):
@@ -88,11 +104,92 @@ class Nodenet(object):
     @worldadapter.setter
     def worldadapter(self, worldadapter_uid):
         self.state["worldadapter"] = worldadapter_uid
+        self.world_binding.invalidate_agent()
 
     @property
     def current_step(self):
         return self.state.get("step")
 
+    @property
+    def settings(self):
+        return self.state.get("settings", {})
+
+    @property
+    def lazy_state(self):
+        """True if the nodenet settings defer writing the activations of the nodes into the nodenet state
+        until the state is needed (see materialize_state)"""
+        return self.settings.get("state_updates", "every_step") == "on_demand"
+
+    @property
+    def vectorized_engine(self):
+        """Returns the vectorized activation spreading engine if the nodenet settings select it, None otherwise"""
+        if self.settings.get("engine", "python") != "numpy":
+            return None
+        if self._vectorized_engine is None:
+            if not vectorized.is_available():
+                warnings.warn("Nodenet %s is set to the numpy engine, but numpy is not installed. "
+                              "Using the python engine instead." % self.name)
+                return None
+            self._vectorized_engine = vectorized.VectorizedEngine(self)
+        return self._vectorized_engine
+
+    @property
+    def frontier_stepper(self):
+        """Returns the frontier stepper if the nodenet settings select event-driven stepping, None otherwise"""
+        if self.settings.get("stepping", "full") != "event_driven":
+            if self._frontier_stepper is not None:
+                self._frontier_stepper = None
+                self.touched_nodes = None
+            return None
+        if self._frontier_stepper is None:
+            self._frontier_stepper = FrontierStepper(self)
+            self.touched_nodes = set()
+        return self._frontier_stepper
+
+    @property
+    def partitioned_stepper(self):
+        """Returns the partitioned stepper if the nodenet settings select partitioned stepping, None otherwise"""
+        if self.settings.get("stepping", "full") != "partitioned":
+            if self._partitioned_stepper is not None:
+                self._partitioned_stepper.shutdown()
+                self._partitioned_stepper = None
+            return None
+        if self._partitioned_stepper is None:
+            if not partitioned.is_available():
+                warnings.warn("Nodenet %s is set to partitioned stepping, but worker processes can not be forked "
+                              "on this platform. Stepping in a single process instead." % self.name)
+                return None
+            self._partitioned_stepper = partitioned.PartitionedStepper(self, self.settings.get("processes"))
+        return self._partitioned_stepper
+
+    def release_workers(self):
+        """Stops the worker processes of partitioned stepping and of isolated native modules, if there are any"""
+        self.watchdog.stop_worker()
+        if self._partitioned_stepper is not None:
+            self._partitioned_stepper.shutdown()
+            self._partitioned_stepper = None
+
+    def update_precision(self):
+        """Converts the activations of all nodes, gates and slots to the precision of the "precision" setting:
+        "single" stores them as 32 bit floats, "double" (the default) as 64 bit floats. The numpy engine compiles
+        the link weights with the same precision. The nodenet state keeps its format in both modes."""
+        typecode = 'f' if self.settings.get("precision", "double") == "single" else 'd'
+        if typecode == self.sheaf_table.typecode:
+            return
+        self.sheaf_table.typecode = typecode
+        for node in self.nodes.values():
+            node.sheaves.convert()
+            for gate in node.gates.values():
+                gate.sheaves.convert()
+            for slot in node.slots.values():
+                slot.sheaves.convert()
+        self.invalidate_engine()
+
+    @property
+    def is_quiescent(self):
+        """True if the nodenet uses event-driven stepping, and the next step would not change anything"""
+        return self.frontier_stepper is not None and self.frontier_stepper.is_quiescent
+
     @property
     def is_active(self):
         return self.state.get("is_active", False)
@@ -126,6 +223,7 @@ class Nodenet(object):
             "settings": {}
         }
 
+        self.world_binding = WorldBinding(self)
         self.world = world
         self.owner = owner
         self.name = name or os.path.basename(filename)
@@ -135,14 +233,28 @@ class Nodenet(object):
 
         self.nodes = {}
         self.links = {}
+        self.link_index = {}
+        self.sheaf_table = SheafTable()
+        self.sheaf_router = SheafRouter()
+        self.dirty_nodes = set()
         self.nodetypes = nodetypes
         self.native_modules = native_modules
         self.nodespaces = {}
         self.monitors = {}
         self.locks = {}
-        self.nodes_by_coords = {}
-        self.max_coords = {'x': 0, 'y': 0}
+        self.scheduler = StepScheduler()
+        self.profiler = NodenetProfiler()
+        self.watchdog = NativeModuleWatchdog(self)
+        self.node_positions = SpatialIndex()
+        self.node_index = NodeIndex()
+        self._deferred_updates = 0
+        self._node_positions_outdated = False
         self.netapi = NetAPI(self)
+        self._vectorized_engine = None
+        self._frontier_stepper = None
+        self._partitioned_stepper = None
+        self.touched_nodes = None
+        self._step_plan = None
 
         self.netlock = Lock()
 
@@ -228,18 +340,6 @@ class Nodenet(object):
             data = self.state['nodes'][uid]
             if data['type'] in nodetypes or data['type'] in native_modules:
                 self.nodes[uid] = Node(self, **data)
-                pos = self.nodes[uid].position
-                xpos = int(pos[0] - (pos[0] % 100))
-                ypos = int(pos[1] - (pos[1] % 100))
-                if xpos not in self.nodes_by_coords:
-                    self.nodes_by_coords[xpos] = {}
-                    if xpos > self.max_coords['x']:
-                        self.max_coords['x'] = xpos
-                if ypos not in self.nodes_by_coords[xpos]:
-                    self.nodes_by_coords[xpos][ypos] = []
-                    if ypos > self.max_coords['y']:
-                        self.max_coords['y'] = ypos
-                self.nodes_by_coords[xpos][ypos].append(uid)
             else:
                 warnings.warn("Invalid nodetype %s for node %s" % (data['type'], uid))
             # set up links
@@ -269,8 +369,7 @@ class Nodenet(object):
             return self.native_modules.get(type)
 
     def get_nodespace_area(self, nodespace, x1, x2, y1, y2):
-        x_range = (x1 - (x1 % 100), 100 + x2 - (x2 % 100), 100)
-        y_range = (y1 - (y1 % 100), 100 + y2 - (y2 % 100), 100)
+        self.materialize_state()
         data = {
             'links': {},
             'nodes': {},
@@ -288,15 +387,10 @@ class Nodenet(object):
             self.user_prompt = None
         links = []
         followupnodes = []
-        for x in range(*x_range):
-            if x in self.nodes_by_coords:
-                for y in range(*y_range):
-                    if y in self.nodes_by_coords[x]:
-                        for uid in self.nodes_by_coords[x][y]:
-                            if self.nodes[uid].parent_nodespace == nodespace:  # maybe sort directly by nodespace??
-                                data['nodes'][uid] = self.state['nodes'][uid]
-                                links.extend(self.nodes[uid].get_associated_link_ids())
-                                followupnodes.extend(self.nodes[uid].get_associated_node_ids())
+        for uid in self.node_positions.get_area(nodespace, x1, x2, y1, y2):
+            data['nodes'][uid] = self.state['nodes'][uid]
+            links.extend(self.nodes[uid].get_associated_link_ids())
+            followupnodes.extend(self.nodes[uid].get_associated_node_ids())
         for uid in links:
             data['links'][uid] = self.state['links'][uid]
         for uid in followupnodes:
@@ -304,23 +398,35 @@ class Nodenet(object):
                 data['nodes'][uid] = self.state['nodes'][uid]
         return data
 
+    @property
+    def max_coords(self):
+        """The largest x and y coordinates of the grid cells that hold nodes"""
+        return self.node_positions.max_coords
+
     def update_node_positions(self):
-        """ recalculates the position hash """
-        self.nodes_by_coords = {}
-        self.max_coords = {'x': 0, 'y': 0}
-        for uid in self.nodes:
-            pos = self.nodes[uid].position
-            xpos = int(pos[0] - (pos[0] % 100))
-            ypos = int(pos[1] - (pos[1] % 100))
-            if xpos not in self.nodes_by_coords:
-                self.nodes_by_coords[xpos] = {}
-                if xpos > self.max_coords['x']:
-                    self.max_coords['x'] = xpos
-            if ypos not in self.nodes_by_coords[xpos]:
-                self.nodes_by_coords[xpos][ypos] = []
-                if ypos > self.max_coords['y']:
-                    self.max_coords['y'] = ypos
-            self.nodes_by_coords[xpos][ypos].append(uid)
+        """ rebuilds the position index and the node index from all nodes, or marks them as outdated while updates
+        are deferred. Not needed after creating, moving or deleting nodes, which update the indexes themselves. """
+        if self._deferred_updates:
+            self._node_positions_outdated = True
+            return
+        self._node_positions_outdated = False
+        self.node_positions.clear()
+        self.node_index.clear()
+        for uid, node in self.nodes.items():
+            self.node_positions.update(uid, node.parent_nodespace, node.position)
+            self.node_index.update(node)
+
+    @contextmanager
+    def deferred_updates(self):
+        """Defers rebuilds of the position index until the end of the block (blocks may be nested), so that
+        many calls of update_node_positions rebuild it only once"""
+        self._deferred_updates += 1
+        try:
+            yield
+        finally:
+            self._deferred_updates -= 1
+            if not self._deferred_updates and self._node_positions_outdated:
+                self.update_node_positions()
 
     def delete_node(self, node_uid):
         if node_uid in self.nodespaces:
@@ -351,10 +457,13 @@ class Nodenet(object):
                 parent_nodespace.activators.pop(self.nodes[node_uid].parameters["type"], None)
             del self.nodes[node_uid]
             del self.state['nodes'][node_uid]
-            self.update_node_positions()
+            self.node_positions.remove(node_uid)
+            self.node_index.remove(node_uid)
+            self.invalidate_step_plan()
 
     def get_nodespace(self, nodespace_uid, max_nodes):
         """returns the nodes and links in a given nodespace"""
+        self.materialize_state()
         data = {'nodes': {}, 'links': {}, 'nodespaces': {}}
         if self.user_prompt is not None:
             data['user_prompt'] = self.user_prompt.copy()
@@ -375,10 +484,14 @@ class Nodenet(object):
     def clear(self):
         self.nodes = {}
         self.links = {}
+        self.link_index = {}
         self.monitors = {}
+        self.dirty_nodes = set()
+        self.invalidate_step_plan()
 
-        self.nodes_by_coords = {}
-        self.max_coords = {'x': 0, 'y': 0}
+        self.node_positions.clear()
+        self.node_index.clear()
+        self.watchdog.clear()
 
         self.nodespaces = {}
         Nodespace(self, None, (0, 0), "Root", "Root")
@@ -498,33 +611,107 @@ class Nodenet(object):
     def step(self):
         """perform a simulation step"""
         self.user_prompt = None
-        if self.world is not None and self.world.agents is not None and self.uid in self.world.agents:
-            self.world.agents[self.uid].snapshot()      # world adapter snapshot
-                                                        # TODO: Not really sure why we don't just know our world adapter,
-                                                        # but instead the world object itself
-
+        self.snapshot_world()
         with self.netlock:
-            self.propagate_link_activation(self.nodes.copy())
+            self._step()
+
+    def run(self, steps, condition=None, timeout=None, monitors=None):
+        """perform up to the given number of simulation steps, acquiring the netlock only once.
+        Monitors only record the last step. Returns a dict with the number of steps performed, the current step,
+        whether the condition was met, and the values of the monitors, all read under the same lock as the steps.
 
-            self.timeout_locks()
+        Arguments:
+            steps: the maximum number of steps
+            condition (optional): a function that is called with the nodenet after every step, and stops the run
+                when it returns True
+            timeout (optional): the number of seconds after which the run stops
+            monitors (optional): a list of the uids of the monitors to report, all monitors if None
+        """
+        performed = 0
+        condition_met = False
+        deadline = None if timeout is None else time.time() + timeout
+        self.user_prompt = None
+        with self.netlock:
+            while performed < steps:
+                self.snapshot_world()
+                performed += 1
+                self._step(record_monitors=False)
+                if condition is not None and condition(self):
+                    condition_met = True
+                    break
+                if self.user_prompt is not None:
+                    break       # the user has to answer first
+                if deadline is not None and time.time() >= deadline:
+                    break
+            if performed:
+                for uid in self.monitors:
+                    self.monitors[uid].step(self.state["step"])
+            if monitors is None:
+                monitors = self.monitors.keys()
+            return {
+                'steps': performed,
+                'current_step': self.current_step,
+                'condition_met': condition_met,
+                'monitors': dict((uid, self.monitors[uid].get_value()) for uid in monitors)
+            }
+
+    def idle_step(self):
+        """advances the step counter of a quiescent event-driven nodenet, and records its monitors, without
+        stepping it: a quiescent step would not change any activation. Returns False, and does nothing, if the
+        nodenet has to be stepped, because it is not quiescent, or an event of the step scheduler is due. The
+        nodenet runner uses this to skip the steps of idle nodenets."""
+        with self.netlock:
+            self.update_precision()
+            if not self.is_quiescent or self.scheduler.is_due(self.current_step):
+                return False
+            self.user_prompt = None
+            self.state["step"] += 1
+            for uid in self.monitors:
+                self.monitors[uid].step(self.state["step"])
+        return True
 
-            activators = self.get_activators()
-            nativemodules = self.get_nativemodules()
-            everythingelse = self.nodes.copy()
-            for key in nativemodules:
-                del everythingelse[key]
+    def snapshot_world(self):
+        """takes the snapshot of the world adapter for the sensors and actors of this step"""
+        agent = self.world_binding.get_agent()
+        if agent is not None:
+            agent.snapshot()
+
+    def _step(self, record_monitors=True):
+        """perform a simulation step, with the netlock already acquired"""
+        self.update_precision()
+        self.profiler.enabled = self.settings.get("profiling", False) is True
+        self.scheduler.advance(self.current_step)     # times out locks, and runs the events of native modules
+        plan = self.get_step_plan()
+        frontier_stepper = self.frontier_stepper
+        partitioned_stepper = self.partitioned_stepper if frontier_stepper is None else None
+        if frontier_stepper is not None:
+            frontier_stepper.propagate(plan)
+        elif partitioned_stepper is not None:
+            partitioned_stepper.propagate(plan)
+        elif self.vectorized_engine is not None:
+            self.vectorized_engine.propagate(plan)
+        else:
+            self.propagate_gate_activation(plan.nodes_with_slots, plan.linked_gates)
 
-            self.calculate_node_functions(activators)       # activators go first
-            self.calculate_node_functions(nativemodules)    # then native modules, so API sees a deterministic state
-            self.calculate_node_functions(everythingelse)   # then all the peasant nodes get calculated
+        if frontier_stepper is not None:
+            frontier_stepper.calculate_node_functions(plan)
+        elif partitioned_stepper is not None:
+            partitioned_stepper.calculate_node_functions(plan)
+        else:
+            self.calculate_node_functions(plan.activators)       # activators go first
+            self.calculate_node_functions(plan.nativemodules)    # then native modules, so API sees a deterministic state
+            self.calculate_node_functions(plan.everythingelse)   # then all the peasant nodes get calculated
 
-            self.netapi._step()
+        self.netapi._step()
 
-            self.state["step"] += 1
+        if self.profiler.enabled:
+            self.profiler.steps += 1
+        self.state["step"] += 1
+        if record_monitors:
             for uid in self.monitors:
                 self.monitors[uid].step(self.state["step"])
-            for uid, node in activators.items():
-                node.activation = self.nodespaces[node.parent_nodespace].activators[node.parameters['type']]
+        for uid, node in plan.activators.items():
+            node.activation = self.nodespaces[node.parent_nodespace].activators[node.parameters['type']]
 
     def propagate_link_activation(self, nodes, limit_gatetypes=None):
         """ the linkfunction
@@ -534,61 +721,139 @@ class Nodenet(object):
                 limit_gatetypes (optional): a list of gatetypes to restrict the activation to links originating
                     from the given slottypes.
         """
+        gates = []
         for uid, node in nodes.items():
+            for type, gate in node.gates.items():
+                if limit_gatetypes is None or type in limit_gatetypes:
+                    gates.append(gate)
+        self.propagate_gate_activation(nodes.values(), gates)
+
+    def propagate_gate_activation(self, nodes, gates):
+        """ resets the slots of the given nodes, and propagates the activation of the given gates via their links
+            Arguments:
+                nodes: an iterable of the nodes whose slots receive activation
+                gates: an iterable of the gates to propagate
+        """
+        for node in nodes:
             node.reset_slots()
 
-        # propagate sheaf existence
-        for uid, node in nodes.items():
-            if limit_gatetypes is not None:
-                gates = [(name, gate) for name, gate in node.gates.items() if name in limit_gatetypes]
-            else:
-                gates = node.gates.items()
-            for type, gate in gates:
-                if gate.parameters['spreadsheaves'] is True:
-                    for sheaf in gate.sheaves:
-                        for uid, link in gate.outgoing.items():
-                            for slotname in link.target_node.slots:
-                                if sheaf not in link.target_node.get_slot(slotname).sheaves and link.target_node.type != "Actor":
-                                    link.target_node.get_slot(slotname).sheaves[sheaf] = dict(uid=gate.sheaves[sheaf]['uid'], name=gate.sheaves[sheaf]['name'], activation=0)
-
-        # propagate activation
-        for uid, node in nodes.items():
-            if limit_gatetypes is not None:
-                gates = [(name, gate) for name, gate in node.gates.items() if name in limit_gatetypes]
-            else:
-                gates = node.gates.items()
-
-            for type, gate in gates:
-                for uid, link in gate.outgoing.items():
-                    for sheaf in gate.sheaves:
-                        if link.target_node.type == "Actor":
-                            shef = "default"
-
-                        if sheaf in link.target_slot.sheaves:
-                            link.target_slot.sheaves[sheaf]['activation'] += float(gate.sheaves[sheaf]['activation']) * float(link.weight)  # TODO: where's the string coming from?
-                        elif sheaf.endswith(link.target_node.uid):
-                            upsheaf = sheaf[:-(len(link.target_node.uid) + 1)]
-                            link.target_slot.sheaves[upsheaf]['activation'] += float(gate.sheaves[sheaf]['activation']) * float(link.weight)  # TODO: where's the string coming from?
-
-    def timeout_locks(self):
-        """
-        Removes all locks that time out in the current step
-        """
-        locks_to_delete = []
-        for lock, data in self.locks.items():
-            self.locks[lock] = (data[0] + 1, data[1], data[2])
-            if data[0] + 1 >= data[1]:
-                locks_to_delete.append(lock)
-        for lock in locks_to_delete:
-            del self.locks[lock]
+        self.sheaf_router.spread_sheaves(gates)
+        if self.profiler.enabled:
+            for gate in gates:
+                start = time.perf_counter()
+                self.sheaf_router.propagate((gate,))
+                self.profiler.add('propagation', (gate.node,), time.perf_counter() - start)
+        else:
+            self.sheaf_router.propagate(gates)
+
+    def materialize_state(self):
+        """Writes the activations of all nodes that changed since the last call into the nodenet state.
+        Only needed if the nodenet settings set "state_updates" to "on_demand"; otherwise, the node functions
+        keep the state up to date in every step."""
+        dirty_nodes, self.dirty_nodes = self.dirty_nodes, set()
+        for uid in dirty_nodes:
+            if uid in self.nodes:
+                self.nodes[uid].materialize_data()
+
+    def get_step_plan(self):
+        """Returns the step plan, which is rebuilt after the topology of the nodenet has changed"""
+        if self._step_plan is None:
+            self._step_plan = StepPlan(self)
+        return self._step_plan
+
+    def invalidate_step_plan(self):
+        """Tells the nodenet that nodes or links have been created or deleted"""
+        self._step_plan = None
+        self.sheaf_router.invalidate()
+        self.invalidate_engine()
+
+    def invalidate_engine(self):
+        """Tells the vectorized engine that links or link weights have changed"""
+        if self._vectorized_engine is not None:
+            self._vectorized_engine.invalidate()
+        self.invalidate_frontier()
+
+    def invalidate_frontier(self):
+        """Tells the frontier stepper that the next step has to calculate all nodes, the partitioned stepper
+        that its replicas are outdated, and the world binding that its sensors and actors may have changed, because
+        something changed that is not visible in the activations (link weights, parameters, gate functions)"""
+        if self._frontier_stepper is not None:
+            self._frontier_stepper.invalidate()
+        if self._partitioned_stepper is not None:
+            self._partitioned_stepper.invalidate()
+        self.world_binding.invalidate()
 
     def calculate_node_functions(self, nodes):
-        """for all given nodes, call their node function, which in turn should update the gate functions
+        """for all given nodes, call their node function, which in turn should update the gate functions.
+           Nodes whose type has a batched node function, and that only carry the default sheaf, are calculated
+           with one call per node type; all other nodes are calculated one by one, in the given order. Native
+           modules with a time budget, or isolated ones, are calculated by the watchdog.
            Arguments:
-               nodes: the dict of nodes to consider
+               nodes: the dict of nodes to consider. Node functions may create and delete nodes, so this must
+                   not be the nodenet's own node dict (the dicts of the step plan are never changed).
         """
-        for uid, node in nodes.copy().items():
-            node.node_function()
+        batches = self.get_batches(nodes)
+        profiler = self.profiler if self.profiler.enabled else None
+        watchdog = self.watchdog
+
+        calculated = set()
+        for type, batch in batches.items():
+            if profiler is None:
+                calculated.update(self.calculate_batch_node_function(self.get_nodetype(type), batch))
+            else:
+                start = time.perf_counter()
+                batch_calculated = self.calculate_batch_node_function(self.get_nodetype(type), batch)
+                profiler.add('node_function', [node for node in batch if node.uid in batch_calculated],
+                             time.perf_counter() - start)
+                calculated.update(batch_calculated)
+
+        for uid, node in nodes.items():
+            if uid not in calculated:
+                if watchdog.watches(node):
+                    watchdog.calculate(node, profiler)
+                elif profiler is None:
+                    node.node_function()
+                else:
+                    start = time.perf_counter()
+                    node.node_function()
+                    profiler.add('node_function', (node,), time.perf_counter() - start)
+
+    def get_batches(self, nodes):
+        """returns a dict of nodetype names and lists of the given nodes that can be calculated with the batched node
+           function of their type"""
+        batches = {}
+        for uid, node in nodes.items():
+            nodetype = node.nodetype
+            if (nodetype is not None and nodetype.batch_nodefunction is not None and node.has_default_sheaf_only() and
+                    not self.watchdog.watches_type(nodetype)):
+                if nodetype.name not in batches:
+                    batches[nodetype.name] = []
+                batches[nodetype.name].append(node)
+        return batches
+
+    def calculate_batch_node_function(self, nodetype, nodes):
+        """calls the batched node function of the given nodetype for the given nodes, and returns the uids of
+           the nodes that have been calculated. Nodes that the batched node function can not handle are left to
+           their node function. Gates with the same vectorizable gate function are calculated together.
+        """
+        activations = [node.activation for node in nodes]
+        slots = dict((slottype, [node.slots[slottype].activation for node in nodes]) for slottype in nodetype.slottypes)
+        try:
+            new_activations, gate_values = nodetype.batch_nodefunction(netapi=self.netapi, nodes=nodes,
+                activations=activations, slots=slots)
+        except Exception:
+            self.is_active = False
+            raise
+
+        calculated = set()
+        pending = []
+        for i, node in enumerate(nodes):
+            if new_activations[i] is not None:
+                node.set_batch_result(new_activations[i],
+                    dict((gatetype, values[i]) for gatetype, values in gate_values.items()), pending)
+                calculated.add(node.uid)
+        gatefunctions.calculate_gates(pending)
+        return calculated
 
     def get_nativemodules(self, nodespace=None):
         """Returns a dict of native modules. Optionally filtered by the given nodespace"""
@@ -637,21 +902,31 @@ class Nodenet(object):
             target_slot_name: type of the terminating slot
 
         Returns the link uid, or None if it does not exist"""
-        outgoing_candidates = set(self.nodes[source_uid].get_gate(source_gate_name).outgoing.keys())
-        incoming_candidates = set(self.nodes[target_uid].get_slot(target_slot_name).incoming.keys())
-        try:
-            return (outgoing_candidates & incoming_candidates).pop()
-        except KeyError:
-            return None
+        link = self.link_index.get((source_uid, source_gate_name, target_uid, target_slot_name))
+        return None if link is None else link.uid
 
     def set_link_weight(self, link_uid, weight, certainty=1):
         """Set weight of the given link."""
-        self.state['links'][link_uid]['weight'] = weight
-        self.state['links'][link_uid]['certainty'] = certainty
-        self.links[link_uid].weight = weight
-        self.links[link_uid].certainty = certainty
+        self.set_link_weights([self.links[link_uid]], [weight], [certainty])
         return True
 
+    def set_link_weights(self, links, weights, certainties=None):
+        """Sets the weights, and optionally the certainties, of the given links. The numpy engine updates its
+        compiled weights in place, instead of compiling all links again.
+            Arguments:
+                links: a list of links
+                weights: a list of the new weights of the links, in the same order
+                certainties (optional): a list of the new certainties of the links, in the same order
+        """
+        for index, link in enumerate(links):
+            link.data['weight'] = weights[index]
+            if certainties is not None:
+                link.data['certainty'] = certainties[index]
+        if self._vectorized_engine is None or not self._vectorized_engine.update_weights(links):
+            self.invalidate_engine()
+        else:
+            self.invalidate_frontier()
+
     def create_link(self, source_node_uid, gate_type, target_node_uid, slot_type, weight=1, certainty=1, uid=None):
         """Creates a new link.
 
@@ -688,6 +963,36 @@ class Nodenet(object):
             self.links[link.uid] = link
         return True, link.uid
 
+    def create_links(self, links):
+        """Creates many links at once. All links are validated before the first one is created, so that either
+        all or none of them are created.
+
+        Arguments:
+            links: a list of dicts with the arguments of create_link (source_node_uid, gate_type, target_node_uid,
+                slot_type, and optionally weight, certainty and uid)
+
+        Returns:
+            True and the list of link uids if successful,
+            False and an error message if a link is invalid
+        """
+        for data in links:
+            source = self.nodes.get(data.get('source_node_uid'))
+            target = self.nodes.get(data.get('target_node_uid'))
+            if source is None or target is None:
+                return False, "Node %s not found" % (data.get('target_node_uid') if source else
+                                                     data.get('source_node_uid'))
+            if data.get('gate_type') not in source.gates:
+                return False, "Node %s has no gate %s" % (source.uid, data.get('gate_type'))
+            if data.get('slot_type') not in target.slots:
+                return False, "Node %s has no slot %s" % (target.uid, data.get('slot_type'))
+        uids = []
+        for data in links:
+            result, uid = self.create_link(data['source_node_uid'], data['gate_type'], data['target_node_uid'],
+                                           data['slot_type'], data.get('weight', 1), data.get('certainty', 1),
+                                           data.get('uid'))
+            uids.append(uid)
+        return True, uids
+
     def delete_link(self, link_uid):
         """Delete the given link."""
         self.links[link_uid].remove()
@@ -708,7 +1013,14 @@ class Nodenet(object):
         """
         if self.is_locked(lock):
             raise NodenetLockException("Lock %s is already locked." % lock)
-        self.locks[lock] = (0, timeout, key)
+        expiry = self.current_step + max(timeout, 1)
+        self.locks[lock] = (expiry, timeout, key)
+        self.scheduler.schedule(expiry, self.timeout_lock, lock, self.locks[lock])
+
+    def timeout_lock(self, lock, entry):
+        """Removes the given lock when it times out, unless it has been released (and maybe acquired again)"""
+        if self.locks.get(lock) is entry:
+            del self.locks[lock]
 
     def unlock(self, lock):
         """Removes the given lock
@@ -720,8 +1032,6 @@ class NetAPI(object):
     Node Net API facade class for use from within the node net (in node functions)
     """
 
-    __locks_to_delete = []
-
     @property
     def uid(self):
         return self.__nodenet.uid
@@ -740,6 +1050,7 @@ class NetAPI(object):
 
     def __init__(self, nodenet):
         self.__nodenet = nodenet
+        self.__locks_to_delete = []
 
     @property
     def logger(self):
@@ -751,17 +1062,12 @@ class NetAPI(object):
         """
         return self.__nodenet.nodes[uid]
 
-    def get_nodes(self, nodespace=None, node_name_prefix=None):
+    def get_nodes(self, nodespace=None, node_name_prefix=None, nodetype=None):
         """
         Returns a list of nodes in the given nodespace (all Nodespaces if None) whose names start with
-        the given prefix (all if None)
+        the given prefix (all if None), and of the given type (all if None)
         """
-        nodes = []
-        for node_uid, node in self.__nodenet.nodes.items():
-            if ((node_name_prefix is None or node.name.startswith(node_name_prefix)) and
-                    (nodespace is None or node.parent_nodespace == nodespace)):
-                nodes.append(node)
-        return nodes
+        return self.__nodenet.node_index.get_nodes(nodespace, node_name_prefix, nodetype)
 
     def get_nodes_in_gate_field(self, node, gate=None, no_links_to=None, nodespace=None):
         """
@@ -812,15 +1118,16 @@ class NetAPI(object):
         Returns all nodes with a min activation, of the given type, active at the given gate, or with node.activation
         """
         nodes = []
-        for node in self.get_nodes(nodespace):
-            if type is None or node.type == type:
-                if gate is not None:
-                    if gate in node.gates:
-                        if node.get_gate(gate).sheaves[sheaf]['activation'] >= min_activation:
-                            nodes.append(node)
+        for node in self.get_nodes(nodespace, nodetype=type):
+            if gate is not None:
+                if gate in node.gates:
+                    sheaves = node.gates[gate].sheaves
                 else:
-                    if node.sheaves[sheaf]['activation'] >= min_activation:
-                        nodes.append(node)
+                    continue
+            else:
+                sheaves = node.sheaves
+            if sheaves.get_activation(sheaf) >= min_activation:
+                nodes.append(node)
         return nodes
 
     def delete_node(self, node):
@@ -841,9 +1148,26 @@ class NetAPI(object):
             entity = Nodespace(self.__nodenet, nodespace, pos, name=name)
         else:
             entity = Node(self.__nodenet, nodespace, pos, name=name, type=nodetype)
-        self.__nodenet.update_node_positions()
         return entity
 
+    def create_nodes(self, batch):
+        """
+        Creates many nodes or node spaces at once, given as (nodetype, nodespace) or (nodetype, nodespace, name)
+        tuples, with deferred updates.
+        Returns the list of newly created entities.
+        """
+        with self.__nodenet.deferred_updates():
+            return [self.create_node(*item) for item in batch]
+
+    def deferred_updates(self):
+        """
+        Returns a context manager that defers rebuilds of the node position index until the end of the block:
+            with netapi.deferred_updates():
+                for i in range(1000):
+                    netapi.create_node("Register", "Root")
+        """
+        return self.__nodenet.deferred_updates()
+
     def link(self, source_node, source_gate, target_node, target_slot, weight=1, certainty=1):
         """
         Creates a link between two nodes. If the link already exists, it will be updated
@@ -855,35 +1179,86 @@ class NetAPI(object):
         """
         Creates two (reciprocal) links between two nodes, valid linktypes are subsur, porret, catexp and symref
         """
-        if linktype == "subsur":
-            subslot = "sub" if "sub" in target_node.slots else "gen"
-            surslot = "sur" if "sur" in source_node.slots else "gen"
-            self.__nodenet.create_link(source_node.uid, "sub", target_node.uid, subslot, weight, certainty)
-            self.__nodenet.create_link(target_node.uid, "sur", source_node.uid, surslot, weight, certainty)
-        elif linktype == "porret":
-            porslot = "por" if "por" in target_node.slots else "gen"
-            retslot = "ret" if "ret" in source_node.slots else "gen"
-            self.__nodenet.create_link(source_node.uid, "por", target_node.uid, porslot, weight, certainty)
-            self.__nodenet.create_link(target_node.uid, "ret", source_node.uid, retslot, weight, certainty)
-        elif linktype == "catexp":
-            catslot = "cat" if "cat" in target_node.slots else "gen"
-            expslot = "exp" if "exp" in source_node.slots else "gen"
-            self.__nodenet.create_link(source_node.uid, "cat", target_node.uid, catslot, weight, certainty)
-            self.__nodenet.create_link(target_node.uid, "exp", source_node.uid, expslot, weight, certainty)
-        elif linktype == "symref":
-            symslot = "sym" if "sym" in target_node.slots else "gen"
-            refslot = "ref" if "ref" in source_node.slots else "gen"
-            self.__nodenet.create_link(source_node.uid, "sym", target_node.uid, symslot, weight, certainty)
-            self.__nodenet.create_link(target_node.uid, "ref", source_node.uid, refslot, weight, certainty)
+        self.link_many(self.__get_reciprocal_links(source_node, target_node, linktype), weight, certainty)
+
+    def link_many(self, links, weight=1, certainty=1):
+        """
+        Creates many links at once, given as (source_node, source_gate, target_node, target_slot) tuples,
+        optionally followed by a weight and a certainty. Existing links will be updated.
+        Raises a KeyError, and creates no link, if one of the gates or slots does not exist.
+        """
+        result, message = self.__nodenet.create_links([{
+            'source_node_uid': link[0].uid,
+            'gate_type': link[1],
+            'target_node_uid': link[2].uid,
+            'slot_type': link[3],
+            'weight': link[4] if len(link) > 4 else weight,
+            'certainty': link[5] if len(link) > 5 else certainty} for link in links])
+        if not result:
+            raise KeyError(message)
 
     def link_full(self, nodes, linktype="porret", weight=1, certainty=1):
         """
         Creates two (reciprocal) links between all nodes in the node list (every node to every node),
         valid linktypes are subsur, porret, and catexp.
         """
+        links = []
         for source in nodes:
             for target in nodes:
-                self.link_with_reciprocal(source, target, linktype, weight, certainty)
+                links.extend(self.__get_reciprocal_links(source, target, linktype))
+        self.link_many(links, weight, certainty)
+
+    def __get_reciprocal_links(self, source_node, target_node, linktype):
+        """Returns the two links (as tuples for link_many) that link_with_reciprocal creates"""
+        if linktype not in ("subsur", "porret", "catexp", "symref"):
+            return []
+        forward, backward = linktype[:3], linktype[3:]
+        forwardslot = forward if forward in target_node.slots else "gen"
+        backwardslot = backward if backward in source_node.slots else "gen"
+        return [(source_node, forward, target_node, forwardslot),
+                (target_node, backward, source_node, backwardslot)]
+
+    def get_weights(self, links):
+        """
+        Returns the weights of the given links, as a list
+        """
+        return [link.weight for link in links]
+
+    def set_weights(self, links, weights, certainties=None):
+        """
+        Sets the weights, and optionally the certainties, of the given links to the values of the given lists
+        """
+        if len(weights) != len(links) or (certainties is not None and len(certainties) != len(links)):
+            raise ValueError("Expected %d weights and certainties" % len(links))
+        self.__nodenet.set_link_weights(links, weights, certainties)
+
+    def apply_weight_rule(self, nodespace, gatetype, rule):
+        """
+        Changes the weights of all links that originate from the gates of the given type of the nodes in the given
+        nodespace, using numpy arrays. The rule is called with the arrays of the weights of the links, the
+        activations of their gates and the activations of their target slots, and returns the array of the new
+        weights, e.g. for a hebbian rule:
+            netapi.apply_weight_rule(nodespace, 'gen', lambda w, pre, post: w + 0.01 * pre * post)
+        Returns the list of links, in the order of the arrays.
+        """
+        if not vectorized.is_available():
+            raise ImportError("apply_weight_rule needs numpy")
+        np = vectorized.np
+        links = []
+        for node in self.__nodenet.node_index.by_nodespace.get(nodespace, {}).values():
+            gate = node.get_gate(gatetype)
+            if gate is not None:
+                links.extend(gate.outgoing.values())
+        if not links:
+            return links
+        weights = np.array([float(link.weight) for link in links])
+        gate_activations = np.array([link.source_gate.activation for link in links])
+        slot_activations = np.array([link.target_slot.activation for link in links])
+        new_weights = np.asarray(rule(weights, gate_activations, slot_activations), dtype=np.float64)
+        if new_weights.shape != weights.shape:
+            raise ValueError("The weight rule returned %s weights for %d links" % (new_weights.shape, len(links)))
+        self.__nodenet.set_link_weights(links, new_weights.tolist())
+        return links
 
     def unlink(self, source_node, source_gate=None, target_node=None, target_slot=None):
         """
@@ -918,6 +1293,20 @@ class NetAPI(object):
         for uid in links_to_delete:
             self.__nodenet.delete_link(uid)
 
+    def read_sensors(self, nodes):
+        """
+        Returns the values of the datasources of the given sensor nodes as a list (None for every sensor if the
+        nodenet is not connected to a world)
+        """
+        return self.__nodenet.world_binding.read(nodes)
+
+    def write_actors(self, nodes, values):
+        """
+        Writes the given values into the datatargets of the given actor nodes, and returns the feedback of the
+        datatargets as a list, or None if the nodenet is not connected to a world
+        """
+        return self.__nodenet.world_binding.write(nodes, values)
+
     def link_actor(self, node, datatarget, weight=1, certainty=1, gate='sub', slot='sur'):
         """
         Links a node to an actor. If no actor exists in the node's nodespace for the given datatarget,
@@ -931,7 +1320,7 @@ class NetAPI(object):
                 actor = candidate
         if actor is None:
             actor = self.create_node("Actor", node.parent_nodespace, datatarget)
-            actor.parameters.update({'datatarget': datatarget})
+            actor.set_parameter('datatarget', datatarget)
 
         self.link(node, gate, actor, 'gen', weight, certainty)
         #self.link(actor, 'gen', node, slot)
@@ -949,7 +1338,7 @@ class NetAPI(object):
                 sensor = candidate
         if sensor is None:
             sensor = self.create_node("Sensor", node.parent_nodespace, datasource)
-            sensor.parameters.update({'datasource': datasource})
+            sensor.set_parameter('datasource', datasource)
 
         self.link(sensor, 'gen', node, slot)
 
@@ -970,7 +1359,7 @@ class NetAPI(object):
                         actor = candidate
                 if actor is None:
                     actor = self.create_node("Actor", nodespace, datatarget)
-                    actor.parameters.update({'datatarget': datatarget})
+                    actor.set_parameter('datatarget', datatarget)
                 all_actors.append(actor)
         return all_actors
 
@@ -991,7 +1380,7 @@ class NetAPI(object):
                         sensor = candidate
                 if sensor is None:
                     sensor = self.create_node("Sensor", nodespace, datasource)
-                    sensor.parameters.update({'datasource': datasource})
+                    sensor.set_parameter('datasource', datasource)
                 all_sensors.append(sensor)
         return all_sensors
 
@@ -1030,6 +1419,25 @@ class NetAPI(object):
         """
         self.__locks_to_delete.append(lock)
 
+    def schedule(self, step, callback, *args):
+        """
+        Calls the given callback with the given arguments at the beginning of the given net step, before activation
+        is spread. Callbacks for steps that already began are called at the beginning of the next step.
+        Returns the scheduled event, which can be cancelled with event.cancel()
+        """
+        return self.__nodenet.scheduler.schedule(step, callback, *args)
+
+    def schedule_activation(self, node, activation, step):
+        """
+        Sets the activation of the given node at the beginning of the given net step, so that it is spread in
+        this step. Returns the scheduled event, which can be cancelled with event.cancel()
+        """
+        return self.schedule(step, self.__set_activation, node.uid, activation)
+
+    def __set_activation(self, node_uid, activation):
+        if node_uid in self.__nodenet.nodes:
+            self.__nodenet.nodes[node_uid].activation = activation
+
     def notify_user(self, node, msg):
         """
         Stops the nodenetrunner for this nodenet, and displays an information to the user,
@@ -61,6 +61,7 @@ class Nodespace(NetEntity):
 
     def set_gate_function(self, nodetype, gatetype, gatefunction, parameters=None):
         """Sets the gatefunction for a given node- and gatetype within this nodespace"""
+        self.nodenet.invalidate_frontier()
         if gatefunction:
             if 'gatefunctions' not in self.data:
                 self.data['gatefunctions'] = {}
@@ -71,7 +72,7 @@ class Nodespace(NetEntity):
                 self.gatefunctions[nodetype] = {}
             try:
                 import math
-                self.gatefunctions[nodetype][gatetype] = micropsi_core.tools.create_function(gatefunction, parameters="x, r, t", additional_symbols={'math': math})
+                self.gatefunctions[nodetype][gatetype] = micropsi_core.tools.get_function(gatefunction, parameters="x, r, t", additional_symbols={'math': math})
             except SyntaxError as err:
                 warnings.warn("Syntax error while compiling gate function: %s, %s" % (gatefunction, str(err)))
                 raise err
@@ -80,6 +81,10 @@ class Nodespace(NetEntity):
                 del self.gatefunctions[nodetype][gatetype]
             if nodetype in self.data['gatefunctions'] and gatetype in self.data['gatefunctions'][nodetype]:
                 del self.data['gatefunctions'][nodetype][gatetype]
+        for uid in self.netentities.get('nodes', []):
+            node = self.nodenet.nodes.get(uid)
+            if node is not None and node.type == nodetype and gatetype in node.gates:
+                node.gates[gatetype].invalidate_pipeline()
 
     def get_gatefunction(self, nodetype, gatetype):
         """Retrieve a bytecode-compiled gatefunction for a given node- and gatetype"""
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+"""
+Nodenet profiler
+
+If the "profiling" setting of a nodenet is True, the nodenet measures the wall time of the node functions and of
+the propagation of the gate activations of every node, and accumulates it, together with the number of calls, per
+node and per node type. The profile answers which node types and nodes take the most time since the last reset.
+Nodes that are calculated in a batch share the time of their batch evenly. If the setting is off, the nodenet only
+looks at the enabled flag of the profiler once per call of calculate_node_functions and propagate_gate_activation.
+"""
+
+import threading
+import time
+
+PHASES = ('node_function', 'propagation')
+
+
+class NodenetProfiler(object):
+    """Accumulated execution times of the nodes of a nodenet.
+
+    Attributes:
+        enabled: True if the nodenet measures the execution times
+        since: the time of the last reset
+        steps: the number of steps that have been profiled since the last reset
+        nodetypes: a dict of phases and dicts of node types and their [seconds, calls]
+        nodes: a dict of phases and dicts of node uids and their [seconds, calls, node type]
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()    # the server reads the profile while the nodenet runner steps
+        self.reset()
+
+    def reset(self):
+        """Drops all measurements"""
+        with self.lock:
+            self.since = time.time()
+            self.steps = 0
+            self.nodetypes = dict((phase, {}) for phase in PHASES)
+            self.nodes = dict((phase, {}) for phase in PHASES)
+
+    def add(self, phase, nodes, seconds):
+        """Adds the given time, spent in the given phase for the given nodes, evenly to the nodes and their types"""
+        if not nodes:
+            return
+        share = seconds / len(nodes)
+        with self.lock:
+            nodetypes = self.nodetypes[phase]
+            entries = self.nodes[phase]
+            for node in nodes:
+                entry = entries.get(node.uid)
+                if entry is None:
+                    entry = entries[node.uid] = [0.0, 0, node.type]
+                entry[0] += share
+                entry[1] += 1
+                entry = nodetypes.get(node.type)
+                if entry is None:
+                    entry = nodetypes[node.type] = [0.0, 0]
+                entry[0] += share
+                entry[1] += 1
+
+    def get_profile(self, top=10):
+        """Returns the profile since the last reset: per phase, the given number of node types and of nodes that
+        took the most time, with their total time in seconds, their number of calls and their mean time per call"""
+        with self.lock:
+            profile = {'since': self.since, 'steps': self.steps}
+            for phase in PHASES:
+                nodetypes = sorted(self.nodetypes[phase].items(), key=lambda item: item[1][0], reverse=True)[:top]
+                nodes = sorted(self.nodes[phase].items(), key=lambda item: item[1][0], reverse=True)[:top]
+                profile[phase] = {
+                    'nodetypes': [{'type': type, 'time': seconds, 'calls': calls, 'mean': seconds / calls}
+                                  for type, (seconds, calls) in nodetypes],
+                    'nodes': [{'uid': uid, 'type': type, 'time': seconds, 'calls': calls, 'mean': seconds / calls}
+                              for uid, (seconds, calls, type) in nodes]
+                }
+        return profile
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+"""
+Step scheduler
+
+The step scheduler of a nodenet holds events that are due at a given net step, in a heap ordered by that step.
+At the beginning of every step, the nodenet runs the events that are due, so that a step only looks at the events
+that expire in it, instead of at all pending events. Locks use the scheduler to time out, and native modules can
+schedule callbacks, e.g. to activate a node at a later step, without polling in every step.
+"""
+
+import heapq
+from itertools import count
+
+
+class ScheduledEvent(object):
+    """A callback that is due at the given step"""
+
+    __slots__ = ('step', 'callback', 'args', 'cancelled')
+
+    def __init__(self, step, callback, args):
+        self.step = step
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        """Prevents the event from being run"""
+        self.cancelled = True
+
+
+class StepScheduler(object):
+    """A heap of events, ordered by the step they are due at, and by the order they were scheduled in"""
+
+    def __init__(self):
+        self.heap = []
+        self.counter = count()
+
+    def __len__(self):
+        return len(self.heap)
+
+    def schedule(self, step, callback, *args):
+        """Schedules the callback to be called with the given arguments at the given step, and returns the event"""
+        event = ScheduledEvent(step, callback, args)
+        heapq.heappush(self.heap, (step, next(self.counter), event))
+        return event
+
+    def is_due(self, step):
+        """Returns True if an event is due at or before the given step"""
+        return bool(self.heap) and self.heap[0][0] <= step
+
+    def advance(self, step):
+        """Runs all events that are due at or before the given step (including events that are scheduled while
+        running them), and returns the number of events that have been run"""
+        heap = self.heap
+        run = 0
+        while heap and heap[0][0] <= step:
+            event = heapq.heappop(heap)[2]
+            if not event.cancelled:
+                event.callback(*event.args)
+                run += 1
+        return run
+
+    def clear(self):
+        self.heap = []
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+"""
+Sheaf routing
+
+Gates that carry more than the default sheaf spread their sheaves in two passes: the sheaves of gates with the
+"spreadsheaves" parameter are created in all slots of the linked nodes (except actors), and then the activation of
+every sheaf is added to the same sheaf of the target slot, or, if the target slot does not have it, to the sheaf it
+was derived from (sheaf uids that end in the uid of the target node name the sheaf they were opened in). If the
+target slot has neither, the activation of the sheaf is dropped.
+
+The sheaf router computes these routes once per gate, as a table from the positions in the sheaf array of the gate
+to the positions in the sheaf arrays of the target slots, so that propagating a gate is an indexed accumulation,
+without looking up sheaf uids or ids in every step. The route of a gate is computed again when the sheaves of the
+gate or of one of its target slots change, and all routes are dropped when the topology changes. Gates that only
+carry the default sheaf do not need a route, and add their activation to the default sheaf of their target slots.
+"""
+
+
+def has_default_sheaf_only(sheaves):
+    ids = sheaves.ids
+    return len(ids) == 1 and ids[0] == 0
+
+
+class GateRoute(object):
+    """The routes of the sheaves of one gate.
+
+    Attributes:
+        ids: a copy of the sheaf ids of the gate the route was computed for
+        existence: a list of (slot, sheaf id) tuples, the sheaves that a spreading gate creates in the target slots
+        transfers: a list of (link, target slot, copy of the sheaf ids of the target slot, list of (position in the
+            gate sheaves, position in the slot sheaves) tuples) tuples, one for every link of the gate, in the
+            order the activation is added to the slots
+    """
+
+    __slots__ = ('ids', 'existence', 'transfers')
+
+    def __init__(self, gate):
+        self.ids = gate.sheaves.ids[:]
+        self.existence = []
+        for sheaf_id in self.ids:
+            if sheaf_id == 0:
+                continue
+            for link in gate.outgoing.values():
+                if link.target_node.type != "Actor":
+                    for slot in link.target_node.slots.values():
+                        self.existence.append((slot, sheaf_id))
+        self.transfers = None
+
+    def resolve(self, gate):
+        """Computes the positions in the target slots, for the sheaves the slots currently have"""
+        table = gate.sheaves.table
+        self.transfers = []
+        for link in gate.outgoing.values():
+            target_uid = link.target_node.uid
+            slot = link.target_slot
+            slot_ids = slot.sheaves.ids
+            positions = []
+            for position, sheaf_id in enumerate(self.ids):
+                if sheaf_id not in slot_ids:
+                    sheaf = table.uids[sheaf_id]
+                    if not sheaf.endswith(target_uid):
+                        continue
+                    sheaf_id = table.ids.get(sheaf[:-(len(target_uid) + 1)])
+                    if sheaf_id is None or sheaf_id not in slot_ids:
+                        continue
+                positions.append((position, slot_ids.index(sheaf_id)))
+            self.transfers.append((link, slot, slot_ids[:], positions))
+
+    def is_resolved(self):
+        """Returns True if the target slots still have the sheaves the positions have been computed for"""
+        if self.transfers is None:
+            return False
+        for link, slot, slot_ids, positions in self.transfers:
+            if slot.sheaves.ids != slot_ids:
+                return False
+        return True
+
+
+class SheafRouter(object):
+    """Spreads the sheaves of gates along precomputed routes.
+
+    Attributes:
+        routes: a dict of gates and their GateRoutes
+    """
+
+    def __init__(self):
+        self.routes = {}
+
+    def invalidate(self):
+        """Drops all routes, because links have been created or deleted"""
+        self.routes = {}
+
+    def get_route(self, gate):
+        route = self.routes.get(gate)
+        if route is None or route.ids != gate.sheaves.ids:
+            route = self.routes[gate] = GateRoute(gate)
+        return route
+
+    def spread_sheaves(self, gates):
+        """Creates the sheaves of the given gates that spread sheaves in the slots of their target nodes"""
+        for gate in gates:
+            if len(gate.sheaves) > 1 and gate.parameters['spreadsheaves'] is True:
+                for slot, sheaf_id in self.get_route(gate).existence:
+                    slot.sheaves.add_id(sheaf_id)
+
+    def propagate(self, gates, default=True):
+        """Adds the activations of the sheaves of the given gates to the target slots. If default is False, the
+        default sheaf is left out"""
+        for gate in gates:
+            activations = gate.sheaves.activations
+            if has_default_sheaf_only(gate.sheaves):
+                if default:
+                    self.propagate_default(gate, activations[0])
+                continue
+            route = self.get_route(gate)
+            if not route.is_resolved():
+                route.resolve(gate)
+            ids = route.ids
+            for link, slot, slot_ids, positions in route.transfers:
+                weight = float(link.data['weight'])
+                slot_activations = slot.sheaves.activations
+                for position, target in positions:
+                    if default or ids[position] != 0:
+                        slot_activations[target] += activations[position] * weight
+
+    @staticmethod
+    def propagate_default(gate, activation):
+        """Adds the activation of a gate that only carries the default sheaf to the default sheaves of its target
+        slots"""
+        for link in gate.outgoing.values():
+            sheaves = link.target_slot.sheaves
+            ids = sheaves.ids
+            if ids and ids[0] == 0:
+                sheaves.activations[0] += activation * float(link.data['weight'])
+            elif 0 in ids:
+                sheaves.activations[ids.index(0)] += activation * float(link.data['weight'])
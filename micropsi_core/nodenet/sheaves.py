@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+
+"""
+Sheaf storage
+
+Every sheaf uid of a nodenet is interned once into the nodenet's sheaf table, which assigns it a small integer id
+and keeps its name. Gates, slots and nodes store their sheaves as an array of these ids and a parallel array of
+activations, instead of a dict of {'uid', 'name', 'activation'} dicts. The dict shape is still available: the
+Sheaves container behaves like the old dict, and returns SheafElement views into its arrays.
+"""
+
+from array import array
+
+
+class SheafTable(object):
+    """The sheaves of a nodenet.
+
+    Attributes:
+        ids: a dict of sheaf uids and their ids
+        uids: a list of sheaf uids, indexed by sheaf id
+        names: a list of sheaf names, indexed by sheaf id
+        typecode: the array typecode of the activations
+    """
+
+    def __init__(self, typecode='d'):
+        self.typecode = typecode
+        self.ids = {}
+        self.uids = []
+        self.names = []
+        self.intern("default", "default")
+
+    def intern(self, uid, name=None):
+        """Returns the id of the sheaf with the given uid, and adds the sheaf to the table if it is not known yet.
+        If a name is given, it replaces the stored name of the sheaf."""
+        sheaf_id = self.ids.get(uid)
+        if sheaf_id is None:
+            sheaf_id = len(self.uids)
+            self.ids[uid] = sheaf_id
+            self.uids.append(uid)
+            self.names.append(uid if name is None else name)
+        elif name is not None and self.names[sheaf_id] != name:
+            self.names[sheaf_id] = name
+        return sheaf_id
+
+
+class Sheaves(object):
+    """The activations of a gate, slot or node in all of its sheaves.
+
+    Sheaves behaves like a dict of sheaf uids and sheaf elements. Assigning a sheaf element (any mapping with
+    'uid', 'name' and 'activation') copies its values into the arrays, looking up a sheaf returns a SheafElement
+    view. The get_activation, set_activation and add_activation methods access the activations directly.
+
+    Attributes:
+        table: the sheaf table of the nodenet
+        ids: an array of the ids of the contained sheaves
+        activations: an array of the activations of the contained sheaves
+    """
+
+    __slots__ = ('table', 'ids', 'activations')
+
+    def __init__(self, table, sheaves=None):
+        """Creates a sheaf container with the sheaves of the given dict, or with the default sheaf if None"""
+        self.table = table
+        if sheaves is None:
+            self.ids = array('i', (0,))
+            self.activations = array(table.typecode, (0.0,))
+        else:
+            self.ids = array('i')
+            self.activations = array(table.typecode)
+            for uid in sheaves:
+                self[uid] = sheaves[uid]
+
+    def index(self, uid):
+        """Returns the position of the given sheaf in the arrays, raises a KeyError if the sheaf is not contained"""
+        try:
+            return self.ids.index(self.table.ids[uid])
+        except ValueError:
+            raise KeyError(uid)
+
+    def index_of_id(self, sheaf_id):
+        """Returns the position of the sheaf with the given id in the arrays, raises a KeyError if it is not
+        contained"""
+        try:
+            return self.ids.index(sheaf_id)
+        except ValueError:
+            raise KeyError(sheaf_id)
+
+    def add_id(self, sheaf_id, activation=0.0):
+        """Adds the sheaf with the given id from the sheaf table, unless it is already contained"""
+        if sheaf_id not in self.ids:
+            self.ids.append(sheaf_id)
+            self.activations.append(activation)
+
+    def add(self, uid, name=None, activation=0.0):
+        """Adds the given sheaf, or sets its activation if it is already contained"""
+        sheaf_id = self.table.intern(uid, name)
+        if sheaf_id in self.ids:
+            self.activations[self.ids.index(sheaf_id)] = activation
+        else:
+            self.ids.append(sheaf_id)
+            self.activations.append(activation)
+
+    def get_activation(self, uid):
+        return self.activations[self.index(uid)]
+
+    def set_activation(self, uid, activation):
+        self.activations[self.index(uid)] = activation
+
+    def add_activation(self, uid, activation):
+        self.activations[self.index(uid)] += activation
+
+    def reset(self, activation=0.0):
+        """Removes all sheaves but the default sheaf, and sets its activation"""
+        if len(self.ids) == 1 and self.ids[0] == 0:
+            self.activations[0] = activation
+        else:
+            self.ids = array('i', (0,))
+            self.activations = array(self.table.typecode, (activation,))
+
+    def clear(self):
+        del self.ids[:]
+        del self.activations[:]
+
+    def convert(self):
+        """Converts the activations to the typecode of the sheaf table, if it has been changed"""
+        if self.activations.typecode != self.table.typecode:
+            self.activations = array(self.table.typecode, self.activations)
+
+    def to_dict(self):
+        """Returns the sheaves in their serializable form, as a dict of sheaf uids and sheaf element dicts"""
+        uids = self.table.uids
+        names = self.table.names
+        return dict((uids[sheaf_id], {"uid": uids[sheaf_id], "name": names[sheaf_id], "activation": activation})
+                    for sheaf_id, activation in zip(self.ids, self.activations))
+
+    def keys(self):
+        uids = self.table.uids
+        return [uids[sheaf_id] for sheaf_id in self.ids]
+
+    def values(self):
+        return [SheafElement(self, sheaf_id) for sheaf_id in self.ids]
+
+    def items(self):
+        uids = self.table.uids
+        return [(uids[sheaf_id], SheafElement(self, sheaf_id)) for sheaf_id in self.ids]
+
+    def get(self, uid, default=None):
+        if uid in self:
+            return self[uid]
+        return default
+
+    def __getitem__(self, uid):
+        sheaf_id = self.table.ids.get(uid)
+        if sheaf_id is None or sheaf_id not in self.ids:
+            raise KeyError(uid)
+        return SheafElement(self, sheaf_id)
+
+    def __setitem__(self, uid, element):
+        activation = element['activation']
+        self.add(uid, element['name'], float(activation) if activation is not None else 0.0)
+
+    def __contains__(self, uid):
+        sheaf_id = self.table.ids.get(uid)
+        return sheaf_id is not None and sheaf_id in self.ids
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+class SheafElement(object):
+    """A view of one sheaf in a Sheaves container, which can be used like the old {'uid', 'name', 'activation'}
+    dict, or via its uid, name and activation attributes"""
+
+    __slots__ = ('sheaves', 'sheaf_id')
+
+    def __init__(self, sheaves, sheaf_id):
+        self.sheaves = sheaves
+        self.sheaf_id = sheaf_id
+
+    @property
+    def uid(self):
+        return self.sheaves.table.uids[self.sheaf_id]
+
+    @property
+    def name(self):
+        return self.sheaves.table.names[self.sheaf_id]
+
+    @property
+    def activation(self):
+        return self.sheaves.activations[self.sheaves.ids.index(self.sheaf_id)]
+
+    @activation.setter
+    def activation(self, activation):
+        self.sheaves.activations[self.sheaves.ids.index(self.sheaf_id)] = activation
+
+    def copy(self):
+        """Returns the sheaf element as a dict"""
+        return {"uid": self.uid, "name": self.name, "activation": self.activation}
+
+    def keys(self):
+        return ["uid", "name", "activation"]
+
+    def get(self, key, default=None):
+        if key in ("uid", "name", "activation"):
+            return self[key]
+        return default
+
+    def __getitem__(self, key):
+        if key == 'activation':
+            return self.activation
+        elif key == 'uid':
+            return self.uid
+        elif key == 'name':
+            return self.name
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == 'activation':
+            self.activation = value
+        elif key == 'name':
+            self.sheaves.table.intern(self.uid, value)
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __eq__(self, other):
+        try:
+            return self.copy() == dict((key, other[key]) for key in other)
+        except (KeyError, TypeError):
+            return False
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return repr(self.copy())
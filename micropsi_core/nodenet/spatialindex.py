@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+"""
+Spatial index of the node positions
+
+The nodes of every nodespace are sorted into a uniform grid of square cells, so that the nodes within an area of
+a nodespace can be found without looking at the nodes outside of it, or at the nodes of other nodespaces. The
+index is updated incrementally whenever a node is created, moved into another cell or nodespace, or deleted, and
+keeps track of the largest coordinates of all cells in use (max_coords), which the editor uses to size the canvas.
+"""
+
+CELL_SIZE = 100
+
+
+def get_cell(position, cell_size=CELL_SIZE):
+    """Returns the (x, y) key of the grid cell that contains the given position"""
+    return int(position[0] - (position[0] % cell_size)), int(position[1] - (position[1] % cell_size))
+
+
+class SpatialIndex(object):
+    """A uniform grid of node uids per nodespace.
+
+    Attributes:
+        cells: a dict of nodespace uids and dicts of (x, y) cell keys and the sets of node uids in these cells
+        entries: a dict of node uids and the (nodespace uid, cell key) they are filed under
+        max_coords: a dict with the largest x and y cell coordinates in use (at least 0)
+    """
+
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.entries = {}
+        self.max_coords = {'x': 0, 'y': 0}
+        self.columns = {}   # number of nodes per cell x coordinate
+        self.rows = {}      # number of nodes per cell y coordinate
+
+    def clear(self):
+        self.cells = {}
+        self.entries = {}
+        self.columns = {}
+        self.rows = {}
+        self.max_coords['x'] = self.max_coords['y'] = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, uid):
+        return uid in self.entries
+
+    def update(self, uid, nodespace, position):
+        """Files the node with the given uid under the cell of the given position in the given nodespace, and
+        moves it out of its previous cell, if it has been filed before"""
+        cell = get_cell(position, self.cell_size)
+        entry = self.entries.get(uid)
+        if entry == (nodespace, cell):
+            return
+        if entry is not None:
+            self.remove(uid)
+        self.entries[uid] = (nodespace, cell)
+        self.cells.setdefault(nodespace, {}).setdefault(cell, set()).add(uid)
+        x, y = cell
+        self.columns[x] = self.columns.get(x, 0) + 1
+        self.rows[y] = self.rows.get(y, 0) + 1
+        if x > self.max_coords['x']:
+            self.max_coords['x'] = x
+        if y > self.max_coords['y']:
+            self.max_coords['y'] = y
+
+    def remove(self, uid):
+        """Removes the node with the given uid from the index, if it has been filed"""
+        entry = self.entries.pop(uid, None)
+        if entry is None:
+            return
+        nodespace, cell = entry
+        cells = self.cells[nodespace]
+        cells[cell].discard(uid)
+        if not cells[cell]:
+            del cells[cell]
+            if not cells:
+                del self.cells[nodespace]
+        x, y = cell
+        if self._decrement(self.columns, x) and x == self.max_coords['x']:
+            self.max_coords['x'] = max([0] + list(self.columns.keys()))
+        if self._decrement(self.rows, y) and y == self.max_coords['y']:
+            self.max_coords['y'] = max([0] + list(self.rows.keys()))
+
+    @staticmethod
+    def _decrement(counts, key):
+        """Decrements the count of the given key, and returns True if it dropped to zero"""
+        counts[key] -= 1
+        if counts[key]:
+            return False
+        del counts[key]
+        return True
+
+    def get_area(self, nodespace, x1, x2, y1, y2):
+        """Returns the uids of the nodes of the given nodespace in all cells that overlap the given rectangle"""
+        cells = self.cells.get(nodespace)
+        if not cells:
+            return []
+        left, top = get_cell((x1, y1), self.cell_size)
+        right, bottom = get_cell((x2, y2), self.cell_size)
+        uids = []
+        area = ((right - left) // self.cell_size + 1) * ((bottom - top) // self.cell_size + 1)
+        if area > len(cells):
+            for (x, y), cell in cells.items():
+                if left <= x <= right and top <= y <= bottom:
+                    uids.extend(cell)
+        else:
+            for x in range(left, right + 1, self.cell_size):
+                for y in range(top, bottom + 1, self.cell_size):
+                    if (x, y) in cells:
+                        uids.extend(cells[(x, y)])
+        return uids
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+"""
+Step plan definition
+"""
+
+from .node import STANDARD_NODETYPES
+
+
+class StepPlan(object):
+    """The precomputed order of execution for a nodenet step.
+
+    Collecting the activators and native modules, and finding the linked gates, requires a walk over all nodes.
+    The nodenet caches a step plan and only builds a new one after operations that change the topology (creating
+    or deleting nodes and links). A plan is never changed after it has been built, so a node function that
+    creates or deletes nodes does not disturb the iteration of the current step.
+
+    Attributes:
+        activators: a dict of all activator nodes, which are calculated first
+        nativemodules: a dict of all native modules, which are calculated after the activators
+        everythingelse: a dict of all nodes that are not native modules (including the activators)
+        nodes_with_slots: a list of all nodes that have slots, which are reset before every propagation
+        linked_gates: a list of all gates with outgoing links, in node order
+    """
+
+    def __init__(self, nodenet):
+        self.activators = {}
+        self.nativemodules = {}
+        self.everythingelse = {}
+        self.nodes_with_slots = []
+        self.linked_gates = []
+        for uid, node in nodenet.nodes.items():
+            if node.type == "Activator":
+                self.activators[uid] = node
+            if node.type not in STANDARD_NODETYPES:
+                self.nativemodules[uid] = node
+            else:
+                self.everythingelse[uid] = node
+            if node.slots:
+                self.nodes_with_slots.append(node)
+            for gate_type, gate in node.gates.items():
+                if gate.outgoing:
+                    self.linked_gates.append(gate)
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+"""
+Vectorized activation spreading
+
+The engine compiles the gates, slots and links of a nodenet into index arrays and a sparse gate→slot weight
+matrix (in coordinate form), so that link propagation becomes one sparse matrix-vector product per step.
+Node, Gate and Slot objects stay the authoritative view of the net; the engine only reads gate activations
+from them and writes the summed activations back into the slots, so the NetAPI and native modules keep working.
+
+The engine is selected per nodenet, by setting "engine" to "numpy" in the nodenet settings. If the "precision"
+setting is "single", the weights and gate activations are held as float32, like the activations of the nodenet.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def is_available():
+    """Returns True if numpy can be imported, and the vectorized engine can be used"""
+    return np is not None
+
+
+class VectorizedEngine(object):
+    """Propagates the activation of the default sheaf with numpy, and all other sheaves in Python.
+
+    Attributes:
+        nodenet: the nodenet whose links are compiled
+        plan: the step plan the links were compiled from
+        gates: the list of gates that have outgoing links, in the order of the gate activation vector
+        slots: the list of slots that have incoming links, in the order of the slot activation vector
+        source_index: for every link, the index of its gate in the gate activation vector
+        target_index: for every link, the index of its slot in the slot activation vector
+        weights: for every link, its weight
+        link_positions: a dict of link uids and their positions in the weight vector
+        dtype: the numpy type of the weights and activations, float32 or float64 after the sheaf table of the nodenet
+    """
+
+    def __init__(self, nodenet):
+        if np is None:
+            raise ImportError("The vectorized engine needs numpy")
+        self.nodenet = nodenet
+        self.compiled = False
+        self.plan = None
+        self.gates = []
+        self.slots = []
+        self.source_index = None
+        self.target_index = None
+        self.weights = None
+        self.link_positions = {}
+        self.dtype = np.float64
+
+    def invalidate(self):
+        """Marks the compiled weights as outdated, they will be recompiled before the next propagation"""
+        self.compiled = False
+
+    def compile(self, plan):
+        """Builds the index arrays and the weight vector from the linked gates of the given step plan.
+
+        Links are ordered the same way the Python engine visits them (gate, link), so the slot sums are
+        accumulated in the same order."""
+        gates = []
+        slots = []
+        slot_indices = {}
+        source_index = []
+        target_index = []
+        weights = []
+        link_positions = {}
+        for gate in plan.linked_gates:
+            for link_uid, link in gate.outgoing.items():
+                link_positions[link_uid] = len(weights)
+                slot = link.target_slot
+                if slot not in slot_indices:
+                    slot_indices[slot] = len(slots)
+                    slots.append(slot)
+                source_index.append(len(gates))
+                target_index.append(slot_indices[slot])
+                weights.append(float(link.weight))
+            gates.append(gate)
+
+        self.plan = plan
+        self.dtype = np.float32 if self.nodenet.sheaf_table.typecode == 'f' else np.float64
+        self.gates = gates
+        self.slots = slots
+        self.source_index = np.array(source_index, dtype=np.intp)
+        self.target_index = np.array(target_index, dtype=np.intp)
+        self.weights = np.array(weights, dtype=self.dtype)
+        self.link_positions = link_positions
+        self.compiled = True
+
+    def update_weights(self, links):
+        """Writes the weights of the given links into the compiled weight vector. Returns False, and leaves the
+        vector unchanged, if the engine has to be compiled anyway, or if one of the links has not been compiled."""
+        if not self.compiled:
+            return False
+        try:
+            positions = [self.link_positions[link.uid] for link in links]
+        except KeyError:
+            return False
+        self.weights[positions] = [float(link.weight) for link in links]
+        return True
+
+    def propagate(self, plan):
+        """Propagates activation from all gates to the slots of all nodes of the given step plan"""
+        if not self.compiled or plan is not self.plan:
+            self.compile(plan)
+
+        for node in plan.nodes_with_slots:
+            node.reset_slots()
+
+        sheaf_gates = [gate for gate in self.gates if len(gate.sheaves) > 1]
+        self.nodenet.sheaf_router.spread_sheaves(sheaf_gates)
+
+        # propagate the default sheaf as a sparse matrix-vector product
+        if len(self.gates):
+            gate_activations = np.fromiter((gate.sheaves.get_activation('default') for gate in self.gates),
+                                           dtype=self.dtype, count=len(self.gates))
+            slot_activations = np.bincount(self.target_index,
+                                           weights=gate_activations[self.source_index] * self.weights,
+                                           minlength=len(self.slots))
+            for slot, activation in zip(self.slots, slot_activations.tolist()):
+                slot.sheaves.set_activation('default', activation)
+
+        # propagate all other sheaves
+        self.nodenet.sheaf_router.propagate(sheaf_gates, default=False)
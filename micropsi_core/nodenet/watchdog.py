@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+
+"""
+Native module watchdog
+
+The definition of a native module may give its node function a time budget (in seconds, "time_budget"). The
+watchdog measures the node functions of these modules, and records every call that exceeds the budget as a
+violation, with a warning in the nodenet log. If the definition also sets "disabled_steps", a node that exceeded
+the budget is not calculated for that many steps (its activations stay as they were). A node function that is
+calculated in the nodenet's process can not be interrupted: its violation is only recorded after it returned, so a
+time budget alone does not protect the nodenet runner from a module that loops or blocks.
+
+Native modules whose definition sets "isolated" are calculated in a worker process, which is killed when a call
+does not return within the time budget, so that a module that loops or blocks can not stall the nodenet runner
+(and with it, all other nodenets). The worker is forked from the server once, and forked again after it has been
+killed. Changes to the rest of the nodenet do not affect the worker: it is only forked again when an isolated node
+is calculated whose nodespace, gate parameters, gate functions or links differ from those of its replica, or that
+did not exist when the worker was forked. Every call sends the activations of the slots, the node and
+the gates of the node, and the node data besides its identity, position and activations (e.g. its state and
+parameters) to the worker, and the worker sends them back after the node function returned. An isolated node
+function therefore keeps its state (set_state, node.data) from call to call, but it should only read its own node:
+the rest of the nodenet it sees is the replica that was forked with the worker, and everything else it changes
+(e.g. creating nodes via the NetAPI) happens in the replica and is lost. If processes can not be forked on the
+platform, isolated modules are calculated in the nodenet's process, like all other native modules.
+"""
+
+import copy
+import multiprocessing
+import time
+import traceback
+from collections import deque
+
+from . import partitioned
+
+MAX_VIOLATIONS = 100
+
+# the node data that is owned by the nodenet, and never sent to or taken from the worker of isolated modules
+NODE_ENTITY_KEYS = ('uid', 'index', 'name', 'type', 'position', 'parent_nodespace', 'sheaves', 'gate_activations',
+                    'gate_parameters')
+
+
+class NativeModuleWatchdog(object):
+    """Time budgets for the node functions of the native modules of a nodenet.
+
+    Attributes:
+        nodenet: the nodenet whose native modules are watched
+        violations: the latest violations (at most MAX_VIOLATIONS), as dicts with the step, the node uid, the node
+            type, the time of the call, the budget, and whether an isolated call has been killed
+        counts: a dict of node types and their number of violations
+        disabled: a dict of the uids of disabled nodes, and the step at which they are calculated again
+        worker: the (process, connection) of the worker process of isolated modules, or None
+        replicated: a dict of the uids of the isolated nodes in the replica of the worker, and their signatures
+    """
+
+    def __init__(self, nodenet):
+        self.nodenet = nodenet
+        self.violations = deque(maxlen=MAX_VIOLATIONS)
+        self.counts = {}
+        self.disabled = {}
+        self.worker = None
+        self.replicated = {}
+
+    def clear(self):
+        self.violations.clear()
+        self.counts = {}
+        self.disabled = {}
+        self.stop_worker()
+
+    @staticmethod
+    def watches_type(nodetype):
+        """Returns True if the node function of the given nodetype has to be calculated by the watchdog"""
+        return nodetype is not None and (nodetype.time_budget is not None or nodetype.isolated)
+
+    def watches(self, node):
+        return self.watches_type(node.nodetype)
+
+    def calculate(self, node, profiler=None):
+        """Calculates the node function of the given node, unless the node has been disabled, and records a
+        violation if it exceeds the time budget of its type"""
+        step = self.nodenet.current_step
+        if node.uid in self.disabled:
+            if self.disabled[node.uid] > step:
+                return
+            del self.disabled[node.uid]
+        nodetype = node.nodetype
+        start = time.perf_counter()
+        killed = False
+        if nodetype.isolated and partitioned.is_available():
+            killed = not self.calculate_isolated(node, nodetype.time_budget)
+        else:
+            node.node_function()
+        seconds = time.perf_counter() - start
+        if profiler is not None:
+            profiler.add('node_function', (node,), seconds)
+        if killed or (nodetype.time_budget is not None and seconds > nodetype.time_budget):
+            self.record(node, seconds, killed)
+
+    def record(self, node, seconds, killed=False):
+        nodetype = node.nodetype
+        step = self.nodenet.current_step
+        self.violations.append({'step': step, 'uid': node.uid, 'type': node.type, 'time': seconds,
+                                'budget': nodetype.time_budget, 'killed': killed})
+        self.counts[node.type] = self.counts.get(node.type, 0) + 1
+        message = "Native module %s (%s) took %.3f seconds, its budget is %.3f seconds" % (
+            node.uid, node.type, seconds, nodetype.time_budget)
+        if killed:
+            message += ", the call has been stopped"
+        if nodetype.disabled_steps:
+            self.disabled[node.uid] = step + 1 + nodetype.disabled_steps
+            message += ", disabled for %d steps" % nodetype.disabled_steps
+        self.nodenet.logger.warning(message)
+
+    def calculate_isolated(self, node, timeout):
+        """Calculates the node function of the given node in the worker process, and applies the resulting
+        activations and node data. Returns False if the worker did not return in time, and has been killed."""
+        if (self.worker is None or not self.worker[0].is_alive() or
+                self.replicated.get(node.uid) != self.get_signature(node)):
+            self.start_worker()
+        process, connection = self.worker
+        connection.send((node.uid, self.get_node_data(node),
+                         dict((slottype, slot.sheaves.to_dict()) for slottype, slot in node.slots.items()),
+                         node.sheaves.to_dict(),
+                         dict((gatetype, gate.sheaves.to_dict()) for gatetype, gate in node.gates.items())))
+        if not connection.poll(timeout):
+            self.stop_worker()
+            return False
+        try:
+            result = connection.recv()
+        except EOFError:
+            self.stop_worker()
+            result = "The process of the node function exited unexpectedly"
+        if not isinstance(result, tuple):
+            self.nodenet.is_active = False
+            raise RuntimeError("Error in isolated native module %s:\n%s" % (node.uid, result))
+        self.apply(node, *result)
+        return True
+
+    def start_worker(self):
+        self.stop_worker()
+        context = multiprocessing.get_context('fork')
+        connection, worker_connection = context.Pipe()
+        process = context.Process(target=self.work, args=(worker_connection,))
+        process.daemon = True
+        process.start()
+        worker_connection.close()
+        self.worker = (process, connection)
+        self.replicated = dict((uid, self.get_signature(node)) for uid, node in self.nodenet.nodes.items()
+                               if node.nodetype is not None and node.nodetype.isolated)
+
+    def stop_worker(self):
+        """Stops the worker process, if there is one. The next isolated call forks a new one."""
+        if self.worker is None:
+            return
+        process, connection = self.worker
+        self.worker = None
+        self.replicated = {}
+        process.terminate()
+        process.join()
+        connection.close()
+
+    def work(self, connection):
+        """The main loop of the worker process, which calculates isolated node functions on its replica of the
+        nodenet"""
+        nodenet = self.nodenet
+        self.worker = None
+        while True:
+            try:
+                request = connection.recv()
+            except EOFError:
+                break
+            uid, data, slot_sheaves, sheaves, gate_sheaves = request
+            try:
+                node = nodenet.nodes[uid]
+                self.set_node_data(node, data)
+                for slottype, slot in node.slots.items():
+                    self.set_sheaves(slot.sheaves, slot_sheaves[slottype])
+                self.apply(node, sheaves, gate_sheaves)
+                node.node_function()
+                connection.send((node.sheaves.to_dict(),
+                                 dict((gatetype, gate.sheaves.to_dict()) for gatetype, gate in node.gates.items()),
+                                 self.get_node_data(node)))
+            except Exception:
+                connection.send(traceback.format_exc())
+
+    def get_signature(self, node):
+        """Returns what the replica of the given node has to agree on with the node, besides the data that is sent
+        with every call: its nodespace, gate parameters, gate functions and links"""
+        nodespace = self.nodenet.nodespaces[node.parent_nodespace]
+        return (node.parent_nodespace,
+                copy.deepcopy(node.get_gate_parameters()),
+                copy.deepcopy(nodespace.data.get('gatefunctions', {}).get(node.type)),
+                sorted((link.uid, link.source_node.uid, link.source_gate.type, link.target_node.uid,
+                        link.target_slot.type, link.weight, link.certainty)
+                       for gate in node.gates.values() for link in gate.outgoing.values()),
+                sorted((link.uid, link.source_node.uid, link.source_gate.type, link.target_node.uid,
+                        link.target_slot.type, link.weight, link.certainty)
+                       for slot in node.slots.values() for link in slot.incoming.values()))
+
+    @staticmethod
+    def get_node_data(node):
+        """Returns the node data that isolated node functions may change, as a copy"""
+        return copy.deepcopy(dict((key, value) for key, value in node.data.items() if key not in NODE_ENTITY_KEYS))
+
+    @staticmethod
+    def set_node_data(node, data):
+        for key in list(node.data.keys()):
+            if key not in NODE_ENTITY_KEYS and key not in data:
+                del node.data[key]
+        node.data.update(data)
+
+    @staticmethod
+    def set_sheaves(sheaves, elements):
+        sheaves.clear()
+        for uid, element in elements.items():
+            sheaves[uid] = element
+
+    def apply(self, node, sheaves, gate_sheaves, data=None):
+        """Sets the sheaves of the given node and its gates, and optionally the node data, to the result of an
+        isolated call"""
+        self.set_sheaves(node.sheaves, sheaves)
+        for gatetype, gate in node.gates.items():
+            self.set_sheaves(gate.sheaves, gate_sheaves[gatetype])
+        nodenet = self.nodenet
+        if data is not None:
+            if data.get('parameters') != node.data.get('parameters'):
+                nodenet.invalidate_frontier()
+            self.set_node_data(node, data)
+        if nodenet.touched_nodes is not None:
+            nodenet.touched_nodes.add(node.uid)
+        if nodenet.lazy_state:
+            nodenet.dirty_nodes.add(node.uid)
+        else:
+            node.materialize_data()
+
+    def get_report(self):
+        """Returns the violations, the number of violations per node type, and the disabled nodes"""
+        return {
+            'violations': list(self.violations),
+            'counts': dict(self.counts),
+            'disabled': dict(self.disabled)
+        }
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+"""
+World binding
+
+Sensors and actors exchange values with the world adapter of their nodenet. Instead of looking up the world, the
+world adapter and the bound datasource or datatarget for every sensor and actor in every step, the nodenet keeps a
+binding table: the world adapter is resolved once, and again only after the world or the world adapter of the
+nodenet changed, or its agent in the world has been spawned, removed or reverted; the datasources and datatargets of
+all sensors and actors are collected once, and again only after nodes or node parameters changed.
+The sensors and actors of a batch then read or write all of their values with one call to the world adapter.
+"""
+
+
+class WorldBinding(object):
+    """The binding table of the sensors and actors of a nodenet.
+
+    Attributes:
+        nodenet: the nodenet whose sensors and actors are bound
+        agent: the world adapter of the nodenet, or None if the nodenet is not connected to a world
+        datasources: a dict of sensor node uids and their datasources, None if outdated
+        datatargets: a dict of actor node uids and their datatargets, None if outdated
+    """
+
+    def __init__(self, nodenet):
+        self.nodenet = nodenet
+        self.agent = None
+        self.resolved = False
+        self.datasources = None
+        self.datatargets = None
+
+    def invalidate(self):
+        """Tells the binding that sensors or actors, or their parameters, may have changed"""
+        self.datasources = None
+        self.datatargets = None
+
+    def invalidate_agent(self):
+        """Tells the binding that the world or the world adapter of the nodenet may have changed"""
+        self.resolved = False
+
+    def get_agent(self):
+        """Returns the world adapter of the nodenet, or None"""
+        if not self.resolved:
+            world = self.nodenet.world
+            if world is not None and world.agents is not None:
+                self.agent = world.agents.get(self.nodenet.uid)
+            else:
+                self.agent = None
+            self.resolved = True
+        return self.agent
+
+    def rebuild(self):
+        by_type = self.nodenet.node_index.by_type
+        self.datasources = dict((uid, node.get_parameter('datasource'))
+                                for uid, node in by_type.get('Sensor', {}).items())
+        self.datatargets = dict((uid, node.get_parameter('datatarget'))
+                                for uid, node in by_type.get('Actor', {}).items())
+
+    def read(self, nodes):
+        """Returns the values of the datasources of the given sensors, as a list"""
+        agent = self.get_agent()
+        if agent is None:
+            return [None] * len(nodes)
+        if self.datasources is None:
+            self.rebuild()
+        datasources = self.datasources
+        return agent.get_datasources([datasources.get(node.uid) for node in nodes])
+
+    def write(self, nodes, values):
+        """Writes the given values into the datatargets of the given actors, and returns their feedback as a list,
+        or None if the nodenet is not connected to a world"""
+        agent = self.get_agent()
+        if agent is None:
+            return None
+        if self.datatargets is None:
+            self.rebuild()
+        datatargets = [self.datatargets.get(node.uid) for node in nodes]
+        agent.set_datatargets(datatargets, values)
+        return agent.get_datatarget_feedbacks(datatargets)
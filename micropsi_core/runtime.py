@@ -30,6 +30,7 @@ import threading
 from datetime import datetime, timedelta
 import time
 import signal
+import operator
 
 import logging
 
@@ -112,7 +113,8 @@ class NodenetRunner(MicropsiRunner):
                 if nodenets[uid].is_active:
                     log = True
                     try:
-                        nodenets[uid].step()
+                        if not nodenets[uid].idle_step():   # quiescent event-driven nodenets are skipped
+                            nodenets[uid].step()
                     except:
                         nodenets[uid].is_active = False
                         logging.getLogger("nodenet").error("Exception in NodenetRunner:", exc_info=1)
@@ -293,6 +295,7 @@ def get_nodenet_data(nodenet_uid, **coordinates):
     """ returns the current state of the nodenet """
     nodenet = get_nodenet(nodenet_uid)
     with nodenet.netlock:
+        nodenet.materialize_state()
         data = nodenet.state.copy()
     data.update(get_nodenet_area(nodenet_uid, **coordinates))
     data.update({
@@ -313,6 +316,7 @@ def unload_nodenet(nodenet_uid):
         return False
     if nodenets[nodenet_uid].world:
         nodenets[nodenet_uid].world.unregister_nodenet(nodenet_uid)
+    nodenets[nodenet_uid].release_workers()
     del nodenets[nodenet_uid]
     return True
 
@@ -348,6 +352,7 @@ def new_nodenet(nodenet_name, worldadapter, template=None, owner="", world_uid=N
     """
     if template is not None and template in nodenet_data:
         if template in nodenets:
+            nodenets[template].materialize_state()
             data = nodenets[template].state.copy()
         else:
             data = nodenet_data[template].copy()
@@ -467,6 +472,119 @@ def step_nodenet(nodenet_uid):
     return nodenets[nodenet_uid].current_step
 
 
+RUN_NODENET_MAX_STEPS = 10000
+RUN_NODENET_MAX_SECONDS = 10
+
+CONDITION_OPERATORS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne
+}
+
+
+def run_nodenet(nodenet_uid, steps=RUN_NODENET_MAX_STEPS, until=None, timeout=RUN_NODENET_MAX_SECONDS, monitors=None):
+    """Advances the given nodenet by several simulation steps at once, without waiting for the nodenet runner.
+    The run stops after the given number of steps, when the condition holds, when a node prompts the user, or when
+    the timeout has passed, whichever comes first. Monitors only record the values of the last step.
+
+    Arguments:
+        nodenet_uid: The uid of the nodenet
+        steps: the maximum number of steps, at most RUN_NODENET_MAX_STEPS
+        until (optional): a condition that is checked after every step. Either a function that is called with the
+            nodenet, or a dict that compares a value of the nodenet, using an operator (one of >, >=, <, <=, ==, !=)
+            and a value:
+                {"monitor": <monitor uid>, "operator": ">=", "value": 1}
+                {"node": <node uid>, "gate": <gate type>, "operator": ">=", "value": 1}
+                {"node": <node uid>, "slot": <slot type>, "operator": ">=", "value": 1}
+                {"node": <node uid>, "operator": ">=", "value": 1}   (compares the node activation)
+        timeout: the number of seconds after which the run stops, at most RUN_NODENET_MAX_SECONDS
+        monitors (optional): a list of the uids of the monitors to report, all monitors if None
+
+    Returns True and a dict with the number of steps performed, the current step, the elapsed time in seconds,
+    whether the condition was met, and the current values of the monitors, or False and an error message if the
+    condition is invalid (in which case no step is performed).
+    """
+    nodenet = nodenets[nodenet_uid]
+    valid, condition = _get_run_condition(nodenet, until)
+    if not valid:
+        return False, condition
+    steps = max(0, min(int(steps), RUN_NODENET_MAX_STEPS))
+    timeout = min(float(timeout), RUN_NODENET_MAX_SECONDS)
+    start = time.time()
+    result = nodenet.run(steps, condition=condition, timeout=timeout, monitors=monitors)
+    result['time'] = time.time() - start
+    return True, result
+
+
+def get_nodenet_profile(nodenet_uid, top=10, reset=False):
+    """Returns the node types and nodes that took the most time in their node functions and in the propagation of
+    their gate activations, since the last reset. The nodenet only measures these times if its "profiling" setting
+    is True.
+
+    Arguments:
+        nodenet_uid: The uid of the nodenet
+        top: the number of node types and nodes to report per phase
+        reset: if True, the measurements are dropped after they have been reported
+    """
+    profiler = nodenets[nodenet_uid].profiler
+    profile = profiler.get_profile(int(top))
+    profile['enabled'] = profiler.enabled
+    if reset:
+        profiler.reset()
+    return profile
+
+
+def get_native_module_violations(nodenet_uid):
+    """Returns the latest calls of native module node functions that exceeded the time budget of their type, the
+    number of violations per native module type, and the nodes that are disabled because of a violation (with the
+    step at which they are calculated again). Calls of modules that are not isolated are only reported after they
+    returned; a time budget alone does not stop a module that hangs."""
+    return nodenets[nodenet_uid].watchdog.get_report()
+
+
+def _get_run_condition(nodenet, until):
+    """Resolves the given run condition of run_nodenet. Returns True and a function that checks the condition, or
+    False and an error message if the condition refers to an unknown monitor, node, gate, slot or operator."""
+    if until is None or callable(until):
+        return True, until
+    if not isinstance(until, dict):
+        return False, "Invalid condition %s" % (until,)
+    operator_name = until.get('operator', '>=')
+    if operator_name not in CONDITION_OPERATORS:
+        return False, "Unknown operator %s" % operator_name
+    compare = CONDITION_OPERATORS[operator_name]
+    value = until.get('value')
+    if not isinstance(value, (int, float)):
+        return False, "Invalid value %s" % (value,)
+    if 'monitor' in until:
+        monitor = nodenet.monitors.get(until['monitor'])
+        if monitor is None:
+            return False, "Monitor %s not found" % until['monitor']
+        return True, lambda nodenet: _compare(compare, monitor.get_value(), value)
+    node = nodenet.nodes.get(until.get('node'))
+    if node is None:
+        return False, "Node %s not found" % until.get('node')
+    if 'gate' in until:
+        if until['gate'] not in node.gates:
+            return False, "Gate %s not found on node %s" % (until['gate'], node.uid)
+        gate = node.get_gate(until['gate'])
+        return True, lambda nodenet: _compare(compare, gate.activation, value)
+    elif 'slot' in until:
+        if until['slot'] not in node.slots:
+            return False, "Slot %s not found on node %s" % (until['slot'], node.uid)
+        slot = node.get_slot(until['slot'])
+        return True, lambda nodenet: _compare(compare, slot.activation, value)
+    else:
+        return True, lambda nodenet: _compare(compare, node.activation, value)
+
+
+def _compare(compare, current, value):
+    return current is not None and compare(current, value)
+
+
 def revert_nodenet(nodenet_uid):
     """Returns the nodenet to the last saved state."""
     unload_nodenet(nodenet_uid)
@@ -477,6 +595,7 @@ def revert_nodenet(nodenet_uid):
 def save_nodenet(nodenet_uid):
     """Stores the nodenet on the server (but keeps it open)."""
     nodenet = nodenets[nodenet_uid]
+    nodenet.materialize_state()
     with open(os.path.join(RESOURCE_PATH, NODENET_DIRECTORY, nodenet_uid + '.json'), 'w+') as fp:
         fp.write(json.dumps(nodenet.state, sort_keys=True, indent=4))
     fp.close()
@@ -488,6 +607,7 @@ def export_nodenet(nodenet_uid):
 
     Returns a string that contains the nodenet state in JSON format.
     """
+    nodenets[nodenet_uid].materialize_state()
     return json.dumps(nodenets[nodenet_uid].state, sort_keys=True, indent=4)
 
 
@@ -647,10 +767,61 @@ def add_node(nodenet_uid, type, pos, nodespace="Root", state=None, uid=None, nam
     else:
         node = Node(nodenet, nodespace, pos, name=name, type=type, uid=uid, parameters=parameters)
         uid = node.uid
-        nodenet.update_node_positions()
     return True, uid
 
 
+def add_nodes(nodenet_uid, nodes):
+    """Creates many nodes (including nodespaces and native modules) at once, and updates the node positions
+    only once. Nodespaces are created in the given order, so nodes may be placed in nodespaces of the same batch.
+    Either all or none of the nodes are created: the types, nodespaces, positions and uids of the whole batch are
+    checked first, and if creating a node fails nonetheless, the nodes of the batch created before are removed.
+
+    Arguments:
+        nodenet_uid: uid of the nodespace manager
+        nodes: a list of dicts with the arguments of add_node (type, pos, and optionally nodespace, uid, name
+            and parameters)
+
+    Returns:
+        True and the list of node uids if successful,
+        False and an error message if failure
+    """
+    nodenet = get_nodenet(nodenet_uid)
+    nodespaces = set(nodenet.nodespaces.keys())
+    batch_uids = set()
+    for data in nodes:
+        if data.get('type') != "Nodespace" and data.get('type') not in nodenet.nodetypes and \
+                data.get('type') not in nodenet.native_modules:
+            return False, "Unknown node type %s" % data.get('type')
+        if data.get('nodespace', "Root") not in nodespaces:
+            return False, "Nodespace %s not found" % data.get('nodespace')
+        pos = data.get('pos')
+        if not isinstance(pos, (list, tuple)) or len(pos) < 2 or \
+                not all(isinstance(value, (int, float)) for value in pos[:2]):
+            return False, "Invalid position %s" % (pos,)
+        uid = data.get('uid')
+        if uid:
+            if uid in batch_uids or uid in nodenet.nodes or uid in nodenet.nodespaces:
+                return False, "Node %s already exists" % uid
+            batch_uids.add(uid)
+            if data.get('type') == "Nodespace":
+                nodespaces.add(uid)
+    uids = []
+    with nodenet.deferred_updates():
+        try:
+            for data in nodes:
+                result, uid = add_node(nodenet_uid, data['type'], data['pos'],
+                                       nodespace=data.get('nodespace', "Root"), uid=data.get('uid'),
+                                       name=data.get('name', ""), parameters=data.get('parameters'))
+                uids.append(uid)
+        except Exception as err:
+            # remove the nodes of this batch again, nodespaces remove their contents with them
+            for uid in reversed(uids):
+                if uid in nodenet.nodes or uid in nodenet.nodespaces:
+                    nodenet.delete_node(uid)
+            return False, "Could not create the nodes: %s" % err
+    return True, uids
+
+
 def clone_nodes(nodenet_uid, node_uids, clonemode, nodespace=None, offset=[50, 50]):
     """
     Clones a bunch of nodes. The nodes will get new unique node ids,
@@ -682,14 +853,15 @@ def clone_nodes(nodenet_uid, node_uids, clonemode, nodespace=None, offset=[50, 5
                         if uid not in copylinks:
                             copylinks[uid] = nodenet.links[uid]
 
-    for _, n in copynodes.items():
-        target_nodespace = nodespace if nodespace is not None else n.parent_nodespace
-        success, uid = add_node(nodenet_uid, n.type, (n.position[0] + offset[0], n.position[1] + offset[1]), nodespace=target_nodespace, state=n.state, uid=None, name=n.name + '_copy', parameters=n.parameters)
-        if success:
-            uidmap[n.uid] = uid
-            result['nodes'].append(nodenet.nodes[uid].data)
-        else:
-            logger.warning('Could not clone node: ' + uid)
+    with nodenet.deferred_updates():
+        for _, n in copynodes.items():
+            target_nodespace = nodespace if nodespace is not None else n.parent_nodespace
+            success, uid = add_node(nodenet_uid, n.type, (n.position[0] + offset[0], n.position[1] + offset[1]), nodespace=target_nodespace, state=n.state, uid=None, name=n.name + '_copy', parameters=n.parameters)
+            if success:
+                uidmap[n.uid] = uid
+                result['nodes'].append(nodenet.nodes[uid].data)
+            else:
+                logger.warning('Could not clone node: ' + uid)
 
     for uid, l in copylinks.items():
         source_uid = uidmap.get(l.source_node.uid, l.source_node.uid)
@@ -700,6 +872,7 @@ def clone_nodes(nodenet_uid, node_uids, clonemode, nodespace=None, offset=[50, 5
         else:
             logger.warning('Could not duplicate link: ' + l_uid)
 
+    nodenet.materialize_state()
     if len(result['nodes']) or len(nodes) == 0:
         return True, result
     else:
@@ -713,7 +886,6 @@ def set_node_position(nodenet_uid, node_uid, pos):
         nodenet.nodes[node_uid].position = pos
     elif node_uid in nodenet.nodespaces:
         nodenet.nodespaces[node_uid].position = pos
-    nodenet.update_node_positions()
     return True
 
 
@@ -868,7 +1040,7 @@ def bind_datasource_to_sensor(nodenet_uid, sensor_uid, datasource):
     """Associates the datasource type to the sensor node with the given uid."""
     node = nodenets[nodenet_uid].nodes[sensor_uid]
     if node.type == "Sensor":
-        node.parameters.update({'datasource': datasource})
+        node.set_parameter('datasource', datasource)
         return True
     return False
 
@@ -877,7 +1049,7 @@ def bind_datatarget_to_actor(nodenet_uid, actor_uid, datatarget):
     """Associates the datatarget type to the actor node with the given uid."""
     node = nodenets[nodenet_uid].nodes[actor_uid]
     if node.type == "Actor":
-        node.parameters.update({'datatarget': datatarget})
+        node.set_parameter('datatarget', datatarget)
         return True
     return False
 
@@ -903,12 +1075,47 @@ def add_link(nodenet_uid, source_node_uid, gate_type, target_node_uid, slot_type
     return nodenet.create_link(source_node_uid, gate_type, target_node_uid, slot_type, weight, certainty, uid)
 
 
+def add_links(nodenet_uid, links):
+    """Creates many links at once. Either all or none of the links are created.
+
+    Arguments.
+        links: a list of dicts with the arguments of add_link (source_node_uid, gate_type, target_node_uid,
+            slot_type, and optionally weight, certainty and uid)
+
+    Returns:
+        True and the list of link uids if successful,
+        False and an error message if failure
+    """
+    nodenet = nodenets[nodenet_uid]
+    return nodenet.create_links(links)
+
+
 def set_link_weight(nodenet_uid, link_uid, weight, certainty=1):
     """Set weight of the given link."""
     nodenet = nodenets[nodenet_uid]
     return nodenet.set_link_weight(link_uid, weight, certainty)
 
 
+def set_link_weights(nodenet_uid, links):
+    """Sets the weights of many links at once. Either all or none of the weights are set.
+
+    Arguments:
+        links: a list of dicts with the arguments of set_link_weight (link_uid, weight, and optionally certainty)
+
+    Returns:
+        True and the number of links if successful,
+        False and an error message if failure
+    """
+    nodenet = nodenets[nodenet_uid]
+    for link in links:
+        if link.get('link_uid') not in nodenet.links:
+            return False, "Link %s not found" % link.get('link_uid')
+    nodenet.set_link_weights([nodenet.links[link['link_uid']] for link in links],
+                             [link['weight'] for link in links],
+                             [link.get('certainty', 1) for link in links])
+    return True, len(links)
+
+
 def get_link(nodenet_uid, link_uid):
     """Returns a dictionary of the parameters of the given link, or None if it does not exist. It is
     structured as follows:
@@ -1046,6 +1253,7 @@ def load_user_files(do_reload=False):
 
 def reload_native_modules(nodenet_uid=None):
     load_user_files(True)
+    tools.clear_function_cache()
     if nodenet_uid:
         nodenets[nodenet_uid].native_modules = {}
         for key in native_modules:
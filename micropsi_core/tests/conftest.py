@@ -1,7 +1,8 @@
 """
-Central initialization of fixtures for Runtime etc.
+Central initialization of fixtures for Runtime etc., and helpers to build and compare random nodenets
 """
 import os
+import random
 import pytest
 import logging
 
@@ -94,3 +95,51 @@ def fixed_nodenet(request, test_world):
     return uid
 
 #test_nodenet(micropsi())
+
+
+def build_random_nodenet(uid, engine="python", nodes=40, links=160, seed=42,
+                         nodetypes=("Register", "Concept", "Pipe", "Pipe")):
+    """Creates a nodenet with the given uid, filled with a reproducible random net of nodes of the given types
+    (registers, concepts and pipes by default), and a self-exciting source register"""
+    micropsi.new_nodenet(uid, "Default", owner="Pytest User", uid=uid)
+    net = micropsi.get_nodenet(uid)
+    net.state['settings']['engine'] = engine
+    rng = random.Random(seed)
+    netapi = net.netapi
+    source = net.nodes[micropsi.add_node(uid, "Register", (10, 10), uid="source", name="source")[1]]
+    netapi.link(source, "gen", source, "gen")
+    source.activation = 1
+    uids = []
+    for i in range(nodes):
+        nodetype = rng.choice(nodetypes)
+        uids.append(micropsi.add_node(uid, nodetype, (100 + 20 * i, 100), uid="n%d" % i, name="n%d" % i)[1])
+    for i in range(links):
+        source_node = net.nodes[rng.choice(uids)]
+        target_node = net.nodes[rng.choice(uids)]
+        gate = rng.choice(list(source_node.gates.keys()))
+        slot = rng.choice(list(target_node.slots.keys()))
+        netapi.link(source_node, gate, target_node, slot, weight=rng.choice([1, 0.5, -0.3, 0.8]))
+    for i in range(nodes // 4):
+        netapi.link(source, "gen", net.nodes[rng.choice(uids)], "gen")
+    return net
+
+
+def get_activations(net):
+    """Returns a dict of all gate, slot and node activations of all sheaves in the given nodenet"""
+    activations = {}
+    for uid, node in net.nodes.items():
+        for sheaf in node.sheaves:
+            activations[(uid, 'node', sheaf)] = node.sheaves[sheaf]['activation']
+        for name, gate in node.gates.items():
+            for sheaf in gate.sheaves:
+                activations[(uid, 'gate', name, sheaf)] = gate.sheaves[sheaf]['activation']
+        for name, slot in node.slots.items():
+            for sheaf in slot.sheaves:
+                activations[(uid, 'slot', name, sheaf)] = slot.sheaves[sheaf]['activation']
+    return activations
+
+
+def assert_same_activations(reference, candidate, tolerance=1e-9):
+    assert set(reference.keys()) == set(candidate.keys())
+    for key in reference:
+        assert abs(reference[key] - candidate[key]) <= tolerance, key
@@ -0,0 +1,167 @@
+#!/usr/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for event-driven stepping, against full stepping
+"""
+
+import time
+
+from micropsi_core import runtime as micropsi
+from micropsi_core.tests.conftest import build_random_nodenet, get_activations, assert_same_activations
+
+
+def test_event_driven_stepping_matches_full_stepping():
+    nodetypes = ("Register", "Concept", "Pipe", "Pipe", "Script", "Script")
+    reference = build_random_nodenet("full_stepping_net", nodetypes=nodetypes, seed=8)
+    candidate = build_random_nodenet("event_driven_net", nodetypes=nodetypes, seed=8)
+    candidate.state['settings']['stepping'] = 'event_driven'
+    try:
+        for i in range(20):
+            reference.step()
+            candidate.step()
+            assert_same_activations(get_activations(reference), get_activations(candidate), tolerance=0)
+    finally:
+        micropsi.delete_nodenet("full_stepping_net")
+        micropsi.delete_nodenet("event_driven_net")
+
+
+def test_event_driven_stepping_skips_quiet_nodes():
+    micropsi.new_nodenet("quiet_net", "Default", owner="Pytest User", uid="quiet_net")
+    nodenet = micropsi.get_nodenet("quiet_net")
+    nodenet.state['settings']['stepping'] = 'event_driven'
+    netapi = nodenet.netapi
+    source = netapi.create_node("Register", "Root", "Source")
+    register = netapi.create_node("Register", "Root", "Register")
+    netapi.link(source, "gen", register, "gen")
+
+    calculated = []
+    calculate_node_functions = nodenet.calculate_node_functions
+
+    def count_node_functions(nodes):
+        calculated.extend(nodes.keys())
+        calculate_node_functions(nodes)
+    nodenet.calculate_node_functions = count_node_functions
+
+    try:
+        for i in range(3):
+            nodenet.step()
+        assert nodenet.is_quiescent
+        del calculated[:]
+        nodenet.step()
+        assert calculated == []
+
+        source.activation = 1
+        assert not nodenet.is_quiescent
+        nodenet.step()
+        assert source.uid in calculated
+        assert register.activation == 1
+        assert source.activation == 0
+        nodenet.step()
+        assert register.activation == 0
+        for i in range(3):
+            nodenet.step()
+        assert nodenet.is_quiescent
+    finally:
+        micropsi.delete_nodenet("quiet_net")
+
+
+def test_event_driven_stepping_makes_a_full_step_after_changes():
+    micropsi.new_nodenet("changed_net", "Default", owner="Pytest User", uid="changed_net")
+    nodenet = micropsi.get_nodenet("changed_net")
+    nodenet.state['settings']['stepping'] = 'event_driven'
+    netapi = nodenet.netapi
+    source = netapi.create_node("Register", "Root", "Source")
+    register = netapi.create_node("Register", "Root", "Register")
+    bystander = netapi.create_node("Register", "Root", "Bystander")
+    netapi.link(source, "gen", source, "gen")
+    netapi.link(source, "gen", register, "gen")
+    source.activation = 1
+
+    calculated = []
+    calculate_node_functions = nodenet.calculate_node_functions
+
+    def count_node_functions(nodes):
+        calculated.extend(nodes.keys())
+        calculate_node_functions(nodes)
+    nodenet.calculate_node_functions = count_node_functions
+
+    def step():
+        del calculated[:]
+        nodenet.step()
+        return set(calculated)
+
+    try:
+        for i in range(3):
+            nodenet.step()
+        assert bystander.uid not in step()
+        assert register.activation == 1
+
+        # a new link weight is spread in a full step
+        netapi.link(source, "gen", register, "gen", weight=0.5)
+        assert bystander.uid in step()
+        assert register.activation == 0.5
+        assert bystander.uid not in step()
+
+        # so is a new gate parameter
+        register.set_gate_parameters("gen", {"amplification": 2})
+        assert bystander.uid in step()
+        assert register.get_gate("gen").activation == 1
+        assert bystander.uid not in step()
+    finally:
+        micropsi.delete_nodenet("changed_net")
+
+
+def test_quiescent_nets_are_not_stepped():
+    micropsi.new_nodenet("idle_net", "Default", owner="Pytest User", uid="idle_net")
+    nodenet = micropsi.get_nodenet("idle_net")
+    nodenet.state['settings']['stepping'] = 'event_driven'
+    netapi = nodenet.netapi
+    source = netapi.create_node("Register", "Root", "Source")
+    register = netapi.create_node("Register", "Root", "Register")
+    netapi.link(source, "gen", register, "gen")
+
+    steps = []
+    step = nodenet.step
+
+    def count_steps():
+        steps.append(nodenet.current_step)
+        step()
+    nodenet.step = count_steps
+
+    timestep = micropsi.get_nodenetrunner_timestep()
+    try:
+        assert not nodenet.idle_step()
+        for i in range(3):
+            nodenet.step()
+        assert nodenet.is_quiescent
+        current_step = nodenet.current_step
+        assert nodenet.idle_step()
+        assert nodenet.current_step == current_step + 1
+
+        # scheduled events are run in a real step
+        nodenet.scheduler.schedule(nodenet.current_step + 2, setattr, source, 'activation', 1)
+        assert nodenet.idle_step()
+        assert nodenet.idle_step()
+        assert not nodenet.idle_step()
+        nodenet.step()
+        assert not nodenet.is_quiescent
+        for i in range(4):
+            nodenet.step()
+        assert register.activation == 0
+
+        # the runner only advances the step counter of the quiescent net
+        del steps[:]
+        current_step = nodenet.current_step
+        micropsi.set_nodenetrunner_timestep(1)
+        micropsi.start_nodenetrunner("idle_net")
+        deadline = time.time() + 5
+        while nodenet.current_step < current_step + 5 and time.time() < deadline:
+            time.sleep(0.01)
+        micropsi.stop_nodenetrunner("idle_net")
+        assert nodenet.current_step >= current_step + 5
+        assert steps == []
+    finally:
+        micropsi.stop_nodenetrunner("idle_net")
+        micropsi.set_nodenetrunner_timestep(timestep)
+        micropsi.delete_nodenet("idle_net")
@@ -0,0 +1,116 @@
+#!/usr/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the time budgets of native modules
+"""
+
+import os
+import time
+import pytest
+
+from micropsi_core import runtime as micropsi
+from micropsi_core.nodenet import partitioned
+from micropsi_core.nodenet.node import Node, Nodetype
+
+
+def create_module(nodenet, nodefunction, **definition):
+    nodetype = Nodetype("Watched", nodenet, **definition)
+    nodetype.nodefunction = nodefunction
+    nodenet.native_modules["Watched"] = nodetype
+    return Node(nodenet, "Root", (10, 10), name="Watched", type="Watched", uid="watched")
+
+
+def test_time_budget_violations_disable_the_module(fixed_nodenet):
+    nodenet = micropsi.get_nodenet(fixed_nodenet)
+    calls = []
+
+    def slow(netapi, node=None, **params):
+        calls.append(nodenet.current_step)
+        time.sleep(0.02)
+
+    node = create_module(nodenet, slow, time_budget=0.005, disabled_steps=2)
+    start = nodenet.current_step
+    for i in range(4):
+        nodenet.step()
+    assert calls == [start, start + 3]
+
+    report = micropsi.get_native_module_violations(fixed_nodenet)
+    assert report['counts'] == {'Watched': 2}
+    assert [violation['step'] for violation in report['violations']] == [start, start + 3]
+    assert report['violations'][0]['time'] > 0.005
+    assert not report['violations'][0]['killed']
+    assert report['disabled'] == {node.uid: start + 6}
+
+
+def test_isolated_modules_are_stopped_after_their_budget(fixed_nodenet):
+    if not partitioned.is_available():
+        pytest.skip("processes can not be forked on this platform")
+    nodenet = micropsi.get_nodenet(fixed_nodenet)
+
+    def stuck(netapi, node=None, stuck=None, **params):
+        if stuck:
+            while True:
+                pass
+        node.activation = 0.5
+        node.get_gate("gen").gate_function(0.5)
+
+    node = create_module(nodenet, stuck, parameters=["stuck"], time_budget=0.5, isolated=True)
+    nodenet.step()
+    assert node.activation == 0.5
+    assert node.get_gate("gen").activation == 0.5
+    assert nodenet.state['nodes'][node.uid]['sheaves']['default']['activation'] == 0.5
+    assert micropsi.get_native_module_violations(fixed_nodenet)['counts'] == {}
+
+    node.set_parameter("stuck", True)
+    start = time.time()
+    nodenet.step()
+    assert time.time() - start < 5
+    violation = micropsi.get_native_module_violations(fixed_nodenet)['violations'][-1]
+    assert violation['killed']
+    assert violation['uid'] == node.uid
+
+
+def test_isolated_modules_keep_their_state(fixed_nodenet):
+    if not partitioned.is_available():
+        pytest.skip("processes can not be forked on this platform")
+    nodenet = micropsi.get_nodenet(fixed_nodenet)
+
+    def count(netapi, node=None, **params):
+        calls = (node.get_state("calls") or 0) + 1
+        node.set_state("calls", calls)
+        node.set_state("pid", os.getpid())
+        node.data["last_sheaf"] = "default"
+        node.activation = calls
+        node.get_gate("gen").gate_function(calls / 10)
+
+    node = create_module(nodenet, count, time_budget=5, isolated=True)
+    node.set_state("calls", 0)
+    for i in range(3):
+        nodenet.step()
+    assert node.get_state("calls") == 3
+    assert node.activation == 3
+    assert abs(node.get_gate("gen").activation - 0.3) < 1e-9
+    assert node.data["last_sheaf"] == "default"
+    pid = node.get_state("pid")
+    assert pid != os.getpid()
+
+    # the worker is kept, and the state is sent to it with every call
+    node.set_state("calls", 10)
+    nodenet.step()
+    assert node.get_state("calls") == 11
+    assert node.get_state("pid") == pid
+
+    # the worker is kept when the rest of the nodenet changes
+    other = nodenet.netapi.create_node("Register", "Root", "Other")
+    nodenet.step()
+    assert node.get_state("calls") == 12
+    assert node.get_state("pid") == pid
+
+    # and forked again when the links of the node change
+    nodenet.netapi.link(other, "gen", node, "gen")
+    nodenet.step()
+    assert node.get_state("calls") == 13
+    assert node.get_state("pid") != pid
+    nodenet.release_workers()
+    assert nodenet.watchdog.worker is None
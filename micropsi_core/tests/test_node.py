@@ -20,3 +20,118 @@ def test_nodetype_function_definition_overwrites_default_function_name(fixed_nod
     assert foo.nodefunction != concept
     assert foo.nodefunction(nodenet, None) == 17
 
+
+
+def test_sheaves_are_interned_in_the_sheaf_table(fixed_nodenet):
+    nodenet = micropsi.get_nodenet(fixed_nodenet)
+    node = nodenet.nodes['A1']
+    gate = node.get_gate('sub')
+    gate.open_sheaf(1, 'default')
+    sheaf_uid = 'default-' + node.uid
+    assert sheaf_uid in gate.sheaves
+    assert gate.sheaves[sheaf_uid]['name'] == node.name
+    assert gate.sheaves[sheaf_uid] == {'uid': sheaf_uid, 'name': node.name, 'activation': 1}
+    sheaf_id = nodenet.sheaf_table.ids[sheaf_uid]
+    assert nodenet.sheaf_table.uids[sheaf_id] == sheaf_uid
+    gate.sheaves[sheaf_uid]['activation'] = 0.5
+    assert gate.sheaves.get_activation(sheaf_uid) == 0.5
+    assert node.get_gate('gen').sheaves.to_dict() == {'default': {'uid': 'default', 'name': 'default', 'activation': 0}}
+
+    # sheaves opened within other sheaves are named after both
+    gate.open_sheaf(1, sheaf_uid)
+    assert gate.sheaves[sheaf_uid + '-' + node.uid]['name'] == node.name + '-' + node.name
+
+
+def test_sheaf_routes_follow_sheaves_and_links(fixed_nodenet):
+    nodenet = micropsi.get_nodenet(fixed_nodenet)
+    source, target, other = nodenet.nodes['B1'], nodenet.nodes['B2'], nodenet.nodes['A2']
+    gate = source.get_gate('sub')
+    gate.parameters['spreadsheaves'] = True
+    gate.sheaves.set_activation('default', 1)
+    gate.sheaves.add('foo', 'foo', 0.5)
+    nodenet.propagate_gate_activation([target], [gate])
+    assert target.get_slot('gen').sheaves.to_dict()['foo']['activation'] == 0.5
+
+    # the route is computed again when the sheaves of the gate change
+    gate.sheaves.add('bar', 'bar', 0.25)
+    nodenet.propagate_gate_activation([target], [gate])
+    assert target.get_slot('gen').sheaves.get_activation('bar') == 0.25
+    assert target.get_slot('gen').sheaves.get_activation('default') == 1
+
+    # sheaves that end in the uid of the target node fall back to the sheaf they were opened in
+    gate.parameters['spreadsheaves'] = False
+    gate.sheaves.add('foo-' + target.uid, 'foo-' + target.name, 0.125)
+    target.reset_slots()
+    target.get_slot('gen').sheaves.add('foo', 'foo')
+    nodenet.propagate_gate_activation([], [gate])
+    assert target.get_slot('gen').sheaves.get_activation('foo') == 0.625
+    assert 'bar' not in target.get_slot('gen').sheaves
+
+    # the positions in the target slot are computed again when the sheaves of the slot change, and sheaves that
+    # have neither their own nor their fallback sheaf in the target slot are dropped
+    target.reset_slots()
+    target.get_slot('gen').sheaves.add('bar', 'bar')
+    target.get_slot('gen').sheaves.add('foo', 'foo')
+    nodenet.propagate_gate_activation([], [gate])
+    assert target.get_slot('gen').sheaves.get_activation('foo') == 0.625
+    assert target.get_slot('gen').sheaves.get_activation('bar') == 0.25
+    target.reset_slots()
+    nodenet.propagate_gate_activation([], [gate])
+    assert target.get_slot('gen').sheaves.to_dict().keys() == {'default'}
+    assert target.get_slot('gen').sheaves.get_activation('default') == 1
+
+    # and all routes are dropped when links change
+    nodenet.create_link(source.uid, 'sub', other.uid, 'gen')
+    gate.parameters['spreadsheaves'] = True
+    nodenet.propagate_gate_activation([target, other], [gate])
+    assert other.get_slot('gen').sheaves.get_activation('bar') == 0.25
+    assert target.get_slot('gen').sheaves.get_activation('bar') == 0.25
+
+
+def test_nodetypes_share_compiled_nodefunctions(fixed_nodenet):
+    nodenet = micropsi.get_nodenet(fixed_nodenet)
+    nodetype = STANDARD_NODETYPES['Concept'].copy()
+    nodetype['nodefunction_definition'] = 'return 23'
+    foo = Nodetype(nodenet=nodenet, **nodetype)
+    bar = Nodetype(nodenet=nodenet, **nodetype)
+    assert foo.nodefunction is bar.nodefunction
+    micropsi.reload_native_modules()
+    baz = Nodetype(nodenet=nodenet, **nodetype)
+    assert baz.nodefunction is not foo.nodefunction
+    assert baz.nodefunction(nodenet, None) == 23
+
+
+def test_node_function_reuses_default_sheaves(fixed_nodenet):
+    nodenet = micropsi.get_nodenet(fixed_nodenet)
+    node = nodenet.nodes['A2']
+    gate = node.get_gate('gen')
+    node.get_slot('gen').sheaves.set_activation('default', 0.5)
+    node.node_function()
+    activations, gate_data = gate.sheaves.activations, nodenet.state['nodes']['A2']['gate_activations']['gen']
+    assert gate.activation == 0.5
+    assert gate_data == {'default': {'uid': 'default', 'name': 'default', 'activation': 0.5}}
+
+    node.get_slot('gen').sheaves.set_activation('default', 0.25)
+    node.node_function()
+    assert gate.sheaves.activations is activations
+    assert nodenet.state['nodes']['A2']['gate_activations']['gen'] is gate_data
+    assert gate_data['default']['activation'] == 0.25
+
+    # sheaves that have been opened are dropped when no slot carries them anymore
+    gate.open_sheaf(1)
+    node.node_function()
+    assert list(gate.sheaves.keys()) == ['default']
+    assert list(nodenet.state['nodes']['A2']['gate_activations']['gen'].keys()) == ['default']
+
+
+def test_gate_parameters_are_not_shared(fixed_nodenet):
+    # write to the parameters of one gate, expect other nodes, new nodes and the gate defaults to be unchanged
+    nodenet = micropsi.get_nodenet(fixed_nodenet)
+    netapi = nodenet.netapi
+    a = netapi.create_node("Concept", "Root", "a")
+    b = netapi.create_node("Concept", "Root", "b")
+    a.get_gate('sub').parameters['threshold'] = 0.7
+    assert b.get_gate('sub').parameters['threshold'] == 0
+    assert nodenet.get_nodetype("Concept").gate_defaults['sub']['threshold'] == 0
+    assert netapi.create_node("Concept", "Root", "c").get_gate('sub').parameters['threshold'] == 0
+    assert nodenet.state['nodes'][b.uid]['gate_parameters']['sub']['threshold'] == 0
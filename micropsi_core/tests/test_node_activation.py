@@ -5,6 +5,8 @@
 Tests for node activation propagation and gate arithmetic
 """
 
+import pytest
+
 from micropsi_core import runtime as micropsi
 
 
@@ -115,3 +117,85 @@ def test_gate_arithmetics_gatefunction(fixed_nodenet):
     nodespace.set_gate_function("Register", "gen", "return 0.9")
     net.step()
     assert register.get_gate("gen").activation == 0.9
+
+
+def test_gate_pipeline_is_refreshed_on_changes(fixed_nodenet):
+    # step with cached gate pipelines, then change gatefunctions and parameters, expect the changes to be used
+    net, netapi, source, register = prepare(fixed_nodenet)
+    net.step()
+    assert register.get_gate("gen").pipeline is not None
+    nodespace = net.nodespaces["Root"]
+    nodespace.set_gate_function("Register", "gen", "return 0.9")
+    net.step()
+    assert register.get_gate("gen").activation == 0.9
+    register.set_gate_parameters("gen", {"maximum": 0.5})
+    net.step()
+    assert register.get_gate("gen").activation == 0.5
+    nodespace.set_gate_function("Register", "gen", None)
+    net.step()
+    assert register.get_gate("gen").activation == 0.5
+    register.set_gate_parameters("gen", {"threshold": 2})
+    net.step()
+    assert register.get_gate("gen").activation == 0
+
+
+def test_gate_pipeline_is_refreshed_when_the_node_moves(fixed_nodenet):
+    # move a node with a cached gate pipeline into a nodespace with its own gatefunction, expect that one to be used
+    net, netapi, source, register = prepare(fixed_nodenet)
+    nodespace = netapi.create_node("Nodespace", "Root", "NestedNodespace")
+    nodespace.set_gate_function("Register", "gen", "return 0.25")
+    net.step()
+    assert register.get_gate("gen").activation == 1
+    register.parent_nodespace = nodespace.uid
+    net.step()
+    assert register.get_gate("gen").activation == 0.25
+    register.parent_nodespace = "Root"
+    net.step()
+    assert register.get_gate("gen").activation == 1
+
+
+def test_vectorized_gatefunction(fixed_nodenet):
+    # set a vectorizable gatefunction for many registers, expect the activations of the scalar function (numpy
+    # and math may differ in the last bit)
+    pytest.importorskip("numpy")
+    from micropsi_core.nodenet import gatefunctions
+    import math
+    net, netapi, source, register = prepare(fixed_nodenet)
+    registers = [register]
+    for i in range(7):
+        node = netapi.create_node("Register", "Root")
+        netapi.link(source, "gen", node, "gen", weight=0.1 * i)
+        node.set_gate_parameters("gen", {"theta": i - 3})
+        registers.append(node)
+    nodespace = net.nodespaces["Root"]
+    nodespace.set_gate_function("Register", "gen", "return 1 / (1 + math.exp(-t * x))")
+    source = gatefunctions.get_source(nodespace.get_gatefunction("Register", "gen"))
+    assert source == "return 1 / (1 + math.exp(-t * x))"
+    assert gatefunctions.vectorize(source) is not None
+    net.step()
+    for node in registers:
+        gate = node.get_gate("gen")
+        x = node.get_slot("gen").activation
+        expected = 1 / (1 + math.exp(-gate.parameters["theta"] * x))
+        assert abs(gate.activation - expected) < 1e-12
+
+    # constant expressions are calculated for the whole group, too
+    nodespace.set_gate_function("Register", "gen", "return 0.25 * math.pi")
+    net.step()
+    for node in registers:
+        assert abs(node.get_gate("gen").activation - 0.25 * math.pi) < 1e-12
+
+
+def test_not_vectorizable_gatefunction(fixed_nodenet):
+    # set a gatefunction with statements, expect it to be calculated with the scalar function
+    from micropsi_core.nodenet import gatefunctions
+    net, netapi, source, register = prepare(fixed_nodenet)
+    for i in range(4):
+        netapi.link(source, "gen", netapi.create_node("Register", "Root"), "gen")
+    source_code = "if x > 0.5:\n    return 0.7\nreturn 0.1"
+    assert gatefunctions.vectorize(source_code) is None
+    assert gatefunctions.vectorize("return os.getcwd()") is None
+    assert gatefunctions.get_source(lambda x, r, t: x) is None
+    net.nodespaces["Root"].set_gate_function("Register", "gen", source_code)
+    net.step()
+    assert register.get_gate("gen").activation == 0.7
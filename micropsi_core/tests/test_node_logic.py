@@ -5,9 +5,12 @@
 Tests for node activation propagation and gate arithmetic
 """
 
+import mock
+
 from micropsi_core import runtime as micropsi
 from micropsi_core.world.world import World
 from micropsi_core.world.worldadapter import WorldAdapter, WorldObject
+from micropsi_core.tests.conftest import build_random_nodenet, get_activations, assert_same_activations
 
 
 class DummyWorld(World):
@@ -175,3 +178,82 @@ def test_node_logic_actor(fixed_nodenet):
     assert world.test_target_value == 0.5
     net.step()
     assert register.get_gate("gen").activation == 0.3
+
+
+def test_node_logic_sensor_binding_follows_changes(fixed_nodenet):
+    # rebinding a sensor, or disconnecting the world adapter, is picked up by the next step
+    net, netapi, source = prepare(fixed_nodenet)
+    world = add_dummyworld(fixed_nodenet)
+
+    register = netapi.create_node("Register", "Root")
+    netapi.link_sensor(register, "test_source", "gen")
+    sensor = netapi.get_nodes("Root", "test_source")[0]
+    world.step()
+    net.step()
+    assert sensor.activation == 0.7
+    assert netapi.read_sensors([sensor, sensor]) == [0.7, 0.7]
+
+    micropsi.bind_datasource_to_sensor(fixed_nodenet, sensor.uid, "unknown_source")
+    net.step()
+    assert sensor.activation == 0
+
+    micropsi.bind_datasource_to_sensor(fixed_nodenet, sensor.uid, "test_source")
+    net.step()
+    assert sensor.activation == 0.7
+
+    world.unregister_nodenet(net.uid)
+    net.step()
+    assert sensor.activation == 0
+    assert netapi.write_actors([], []) is None
+
+
+def test_node_logic_world_adapter_is_resolved_once(fixed_nodenet):
+    # steps keep the resolved world adapter, agents that are spawned or reverted in the world replace it
+    net, netapi, source = prepare(fixed_nodenet)
+    world = add_dummyworld(fixed_nodenet)
+    register = netapi.create_node("Register", "Root")
+    netapi.link_sensor(register, "test_source", "gen")
+    sensor = netapi.get_nodes("Root", "test_source")[0]
+    agent = world.agents[net.uid]
+    net.step()
+    assert net.world_binding.resolved
+    assert net.world_binding.agent is agent
+
+    world.agents = mock.Mock(wraps=world.agents)
+    net.step()
+    net.step()
+    assert not world.agents.get.called
+    assert sensor.activation == 0.7
+    world.agents = world.agents._mock_wraps
+
+    world.spawn_agent("DummyWorldAdapter", net.uid)
+    net.step()
+    assert net.world_binding.agent is world.agents[net.uid]
+    assert net.world_binding.agent is not agent
+
+    micropsi.save_world(world.uid)
+    micropsi.revert_world(world.uid)
+    net.step()
+    assert net.world_binding.agent is micropsi.worlds[world.uid].agents[net.uid]
+    assert net.world_binding.agent is not world.agents[net.uid]
+
+
+def test_batched_node_functions_match_node_functions():
+    # this seed yields pipes that open sheaves, so the batches fall back to the node functions for some nodes
+    nodetypes = ("Register", "Concept", "Pipe", "Pipe", "Script", "Script")
+    reference = build_random_nodenet("scalar_nodefunction_net", nodetypes=nodetypes, seed=8)
+    candidate = build_random_nodenet("batched_nodefunction_net", nodetypes=nodetypes, seed=8)
+    for nodetype in reference.nodetypes.values():
+        nodetype.batch_nodefunction = None
+    try:
+        for i in range(15):
+            reference.step()
+            candidate.step()
+            assert_same_activations(get_activations(reference), get_activations(candidate), tolerance=0)
+            for uid in reference.nodes:
+                assert reference.nodes[uid].data['gate_activations'] == candidate.nodes[uid].data['gate_activations']
+                assert reference.nodes[uid].data['sheaves'] == candidate.nodes[uid].data['sheaves']
+        assert candidate.nodetypes["Pipe"].batch_nodefunction is not None
+    finally:
+        micropsi.delete_nodenet("scalar_nodefunction_net")
+        micropsi.delete_nodenet("batched_nodefunction_net")
@@ -182,6 +182,43 @@ def test_node_netapi_get_nodes_by_name_and_nodespace(fixed_nodenet):
     assert node2 in nodes
 
 
+def test_node_netapi_get_nodes_by_type_follows_changes(fixed_nodenet):
+    # test the node index after renaming, moving and deleting nodes
+    net, netapi, source = prepare(fixed_nodenet)
+    nodespace = netapi.create_node("Nodespace", "Root", "NestedNodespace")
+    node1 = netapi.create_node("Register", "Root", "TestName1")
+    node2 = netapi.create_node("Concept", "Root", "TestName2")
+
+    assert netapi.get_nodes("Root", "TestName", "Concept") == [node2]
+    assert node1 in netapi.get_nodes(nodetype="Register")
+    assert node2 not in netapi.get_nodes(nodetype="Register")
+
+    node1.name = "Renamed"
+    assert netapi.get_nodes(node_name_prefix="TestName") == [node2]
+    assert netapi.get_nodes(node_name_prefix="Ren") == [node1]
+
+    node2.parent_nodespace = nodespace.uid
+    assert netapi.get_nodes(nodespace.uid) == [node2]
+    assert node2 not in netapi.get_nodes("Root")
+
+    netapi.delete_node(node2)
+    assert netapi.get_nodes(nodespace.uid) == []
+    assert netapi.get_nodes(node_name_prefix="TestName") == []
+
+
+def test_node_netapi_get_nodes_keeps_the_order_of_the_nodenet(fixed_nodenet):
+    # query nodes whose names are not in creation order, expect them in creation order, also after renaming
+    net, netapi, source = prepare(fixed_nodenet)
+    node1 = netapi.create_node("Register", "Root", "TestNameB")
+    node2 = netapi.create_node("Register", "Root", "TestNameA")
+    node3 = netapi.create_node("Register", "Root", "TestNameC")
+    assert netapi.get_nodes(node_name_prefix="TestName") == [node1, node2, node3]
+    node3.name = "TestName0"
+    assert netapi.get_nodes(node_name_prefix="TestName") == [node1, node2, node3]
+    assert netapi.get_nodes("Root", nodetype="Register") == [node for node in net.nodes.values()
+                                                             if node.type == "Register"]
+
+
 def test_node_netapi_get_nodes_in_gate_field(fixed_nodenet):
     # test get_nodes_in_gate_field
     net, netapi, source = prepare(fixed_nodenet)
@@ -401,6 +438,26 @@ def test_node_netapi_delete_node_for_nodespace(fixed_nodenet):
         netapi.get_node(node4uid)
 
 
+def test_node_netapi_create_nodes(fixed_nodenet):
+    # test creating many nodes with a single update of the node positions
+    net, netapi, source = prepare(fixed_nodenet)
+    nodespace = netapi.create_node("Nodespace", "Root", "NestedNodespace")
+    nodes = netapi.create_nodes([("Register", "Root", "TestName1"), ("Concept", nodespace.uid)])
+    assert [node.type for node in nodes] == ["Register", "Concept"]
+    assert nodes[0].name == "TestName1"
+    assert nodes[1].parent_nodespace == nodespace.uid
+    assert nodes[0].uid in net.node_positions and nodes[1].uid in net.node_positions
+
+    with netapi.deferred_updates():
+        with netapi.deferred_updates():
+            net.update_node_positions()
+            node = netapi.create_node("Register", "Root")
+        assert net._node_positions_outdated
+    assert not net._node_positions_outdated
+    assert node.uid in net.node_positions
+    assert netapi.get_nodes(node_name_prefix="TestName1") == [nodes[0]]
+
+
 def test_node_netapi_link(fixed_nodenet):
     # test linking nodes
     net, netapi, source = prepare(fixed_nodenet)
@@ -510,6 +567,80 @@ def test_node_netapi_link_full(fixed_nodenet):
     assert len(n_d.get_slot('por').incoming) == 4
 
 
+def test_node_netapi_link_many(fixed_nodenet):
+    # test creating links in bulk, and finding them in the link index
+    net, netapi, source = prepare(fixed_nodenet)
+    n_a = netapi.create_node("Pipe", "Root", "A")
+    n_b = netapi.create_node("Pipe", "Root", "B")
+    n_c = netapi.create_node("Concept", "Root", "C")
+
+    netapi.link_many([(n_a, "por", n_b, "por"), (n_b, "ret", n_a, "ret", 0.5), (n_a, "sub", n_c, "gen")], weight=0.8)
+
+    uid = net.get_link_uid(n_b.uid, "ret", n_a.uid, "ret")
+    assert net.links[uid].weight == 0.5
+    assert net.links[net.get_link_uid(n_a.uid, "por", n_b.uid, "por")].weight == 0.8
+    assert len(n_c.get_slot("gen").incoming) == 1
+
+    # existing links are updated, not duplicated
+    netapi.link_many([(n_b, "ret", n_a, "ret", 0.2)])
+    assert len(n_b.get_gate("ret").outgoing) == 1
+    assert net.links[uid].weight == 0.2
+
+    # an invalid link is reported before anything is created
+    links = len(net.links)
+    with pytest.raises(KeyError):
+        netapi.link_many([(n_b, "sub", n_c, "gen"), (n_c, "gen", n_a, "nonexistent")])
+    assert len(net.links) == links
+
+    netapi.unlink(n_b, "ret")
+    assert net.get_link_uid(n_b.uid, "ret", n_a.uid, "ret") is None
+
+
+def test_node_netapi_set_weights(fixed_nodenet):
+    # test reading and writing link weights in bulk
+    net, netapi, source = prepare(fixed_nodenet)
+    n_a = netapi.create_node("Register", "Root", "A")
+    n_b = netapi.create_node("Register", "Root", "B")
+    netapi.link_many([(source, "gen", n_a, "gen", 0.5), (source, "gen", n_b, "gen", 0.2)])
+    links = list(source.get_gate("gen").outgoing.values())
+    weights = dict((link.target_node.uid, weight) for link, weight in zip(links, netapi.get_weights(links)))
+    assert weights[n_a.uid] == 0.5
+    assert weights[n_b.uid] == 0.2
+
+    netapi.set_weights(links, [0.1] * len(links), [0.9] * len(links))
+    assert netapi.get_weights(links) == [0.1] * len(links)
+    assert net.state['links'][links[0].uid]['certainty'] == 0.9
+    with pytest.raises(ValueError):
+        netapi.set_weights(links, [1])
+
+
+def test_node_netapi_apply_weight_rule(fixed_nodenet):
+    # test changing the weights of all links of a gate type in a nodespace with array arithmetic
+    pytest.importorskip("numpy")
+    net, netapi, source = prepare(fixed_nodenet)
+    net.state['settings']['engine'] = 'numpy'
+    n_a = netapi.create_node("Register", "Root", "A")
+    n_b = netapi.create_node("Register", "Root", "B")
+    netapi.link_many([(source, "gen", n_a, "gen", 0.5), (n_a, "gen", n_b, "gen", 0.5)])
+    net.step()
+    net.step()
+    assert n_b.activation == 0.5 * 0.5
+
+    links = netapi.apply_weight_rule("Root", "gen", lambda w, pre, post: w + 0.25 * pre * post)
+    assert set(link.uid for link in links) == set(link.uid for node in net.nodes.values()
+                                                  for link in node.get_gate("gen").outgoing.values()
+                                                  if node.parent_nodespace == "Root")
+    # the rule sees the gate activations and the slot activations the gates caused
+    assert net.links[net.get_link_uid(source.uid, "gen", n_a.uid, "gen")].weight == 0.5 + 0.25 * 1 * 0.5
+    assert net.links[net.get_link_uid(n_a.uid, "gen", n_b.uid, "gen")].weight == 0.5 + 0.25 * 0.5 * 0.25
+
+    # the numpy engine takes the new weights without being compiled again
+    assert net.vectorized_engine.compiled
+    net.step()
+    assert n_a.activation == 0.625
+    assert n_b.activation == 0.5 * 0.53125
+
+
 def test_node_netapi_unlink(fixed_nodenet):
     # test completely unlinking a node
     net, netapi, source = prepare(fixed_nodenet)
@@ -651,4 +782,51 @@ def test_set_gate_function(fixed_nodenet):
     assert some_other_node_type.get_gate("gen").activation == 0
 
 
+def test_node_netapi_locks_time_out_per_nodenet(fixed_nodenet):
+    # locks time out after the given number of steps, and unlocking only affects the own nodenet
+    net, netapi, source = prepare(fixed_nodenet)
+    micropsi.new_nodenet("other_locking_net", "Default", owner="Pytest User", uid="other_locking_net")
+    other = micropsi.get_nodenet("other_locking_net")
+    try:
+        netapi.lock("timed", "key", 2)
+        net.step()
+        net.step()
+        assert netapi.is_locked_by("timed", "key")
+        net.step()
+        assert not netapi.is_locked("timed")
+
+        netapi.lock("shared", "key")
+        other.netapi.lock("shared", "key")
+        netapi.unlock("shared")
+        assert netapi.is_locked("shared")
+        other.step()
+        net.step()
+        assert not netapi.is_locked("shared")
+        assert other.netapi.is_locked("shared")
+    finally:
+        micropsi.delete_nodenet("other_locking_net")
+
+
+def test_node_netapi_schedule_activation(fixed_nodenet):
+    # activate a node at a later step, and cancel a scheduled callback
+    net, netapi, source = prepare(fixed_nodenet)
+    register = netapi.create_node("Register", "Root", "Scheduled")
+    target = netapi.create_node("Register", "Root", "Target")
+    netapi.link(register, "gen", target, "gen")
+    calls = []
+    netapi.schedule_activation(register, 1, net.current_step + 1)
+    event = netapi.schedule(net.current_step, calls.append, "cancelled")
+    netapi.schedule(net.current_step, calls.append, "called")
+    event.cancel()
+
+    net.step()
+    assert calls == ["called"]
+    assert target.get_gate("gen").activation == 0
+    net.step()
+    assert target.get_gate("gen").activation == 1
+    net.step()
+    assert target.get_gate("gen").activation == 0
+    assert len(net.scheduler) == 0
+
+
 #TODO: Add locking tests once we're sure we'll keep locking, and like it is implemented now
\ No newline at end of file
@@ -0,0 +1,80 @@
+#!/usr/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for partitioned stepping in worker processes, against single-process stepping
+"""
+
+import pytest
+
+from micropsi_core import runtime as micropsi
+from micropsi_core.nodenet import partitioned
+from micropsi_core.tests.conftest import build_random_nodenet, get_activations, assert_same_activations
+
+
+@pytest.mark.skipif(not partitioned.is_available(), reason="worker processes can not be forked on this platform")
+def test_partitioned_stepping_matches_single_process_stepping():
+    nodetypes = ("Register", "Concept", "Pipe", "Pipe", "Script", "Script")
+    reference = build_random_nodenet("single_process_net", nodetypes=nodetypes, seed=8)
+    candidate = build_random_nodenet("partitioned_net", nodetypes=nodetypes, seed=8)
+    candidate.state['settings']['stepping'] = 'partitioned'
+    candidate.state['settings']['processes'] = 2
+    try:
+        for i in range(20):
+            reference.step()
+            candidate.step()
+            assert_same_activations(get_activations(reference), get_activations(candidate), tolerance=0)
+        stepper = candidate.partitioned_stepper
+        assert len(stepper.partitions) == 2
+        processes = [partition.process for partition in stepper.partitions]
+        assert all(process.is_alive() for process in processes)
+    finally:
+        micropsi.delete_nodenet("single_process_net")
+        micropsi.delete_nodenet("partitioned_net")
+    assert not any(process.is_alive() for process in processes)
+
+
+@pytest.mark.skipif(not partitioned.is_available(), reason="worker processes can not be forked on this platform")
+def test_partitioned_stepping_forks_the_workers_again_after_topology_changes():
+    net = build_random_nodenet("partitioned_net", seed=8)
+    net.state['settings']['stepping'] = 'partitioned'
+    net.state['settings']['processes'] = 2
+    try:
+        net.step()
+        processes = [partition.process for partition in net.partitioned_stepper.partitions]
+        net.step()
+        assert [partition.process for partition in net.partitioned_stepper.partitions] == processes
+        net.netapi.link(net.nodes['n1'], 'gen', net.nodes['n2'], 'gen')
+        assert not any(process.is_alive() for process in processes)
+        net.step()
+        processes = [partition.process for partition in net.partitioned_stepper.partitions]
+        assert all(process.is_alive() for process in processes)
+
+        # the replicas of the workers are forked again when a parameter changes, too
+        source = net.nodes['source']
+        source.set_gate_parameters("gen", {"amplification": 0.5})
+        assert not any(process.is_alive() for process in processes)
+        net.step()
+        assert source.get_gate("gen").activation == 0.5
+        assert all(partition.process.is_alive() for partition in net.partitioned_stepper.partitions)
+    finally:
+        micropsi.delete_nodenet("partitioned_net")
+
+
+@pytest.mark.skipif(not partitioned.is_available(), reason="worker processes can not be forked on this platform")
+def test_partitioned_stepping_reports_dead_workers_and_recovers():
+    net = build_random_nodenet("partitioned_net", seed=8)
+    net.state['settings']['stepping'] = 'partitioned'
+    net.state['settings']['processes'] = 2
+    try:
+        net.step()
+        process = net.partitioned_stepper.partitions[0].process
+        process.terminate()
+        process.join()
+        with pytest.raises(RuntimeError) as excinfo:
+            net.step()
+        assert "died" in str(excinfo.value)
+        net.step()
+        assert all(partition.process.is_alive() for partition in net.partitioned_stepper.partitions)
+    finally:
+        micropsi.delete_nodenet("partitioned_net")
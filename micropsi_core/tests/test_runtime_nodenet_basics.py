@@ -81,6 +81,95 @@ def test_nodespace_removal(fixed_nodenet):
     assert sub_uid not in micropsi.nodenets[fixed_nodenet].state['nodespaces']
 
 
+def test_add_nodes(fixed_nodenet):
+    res, uids = micropsi.add_nodes(fixed_nodenet, [
+        {'type': 'Nodespace', 'pos': [100, 100], 'uid': 'ns1'},
+        {'type': 'Register', 'pos': [100, 100], 'nodespace': 'ns1', 'name': 'sub1', 'uid': 'sub1'},
+        {'type': 'Concept', 'pos': [300, 300]}])
+    assert res
+    assert uids[:2] == ['ns1', 'sub1']
+    nodenet = micropsi.nodenets[fixed_nodenet]
+    assert nodenet.nodes['sub1'].parent_nodespace == 'ns1'
+    assert uids[2] in nodenet.node_positions.cells['Root'][(300, 300)]
+
+    res, msg = micropsi.add_nodes(fixed_nodenet, [
+        {'type': 'Register', 'pos': [100, 100], 'uid': 'new'},
+        {'type': 'Nonexistent', 'pos': [100, 100]}])
+    assert not res
+    assert 'new' not in nodenet.nodes
+
+    nodes = set(nodenet.nodes.keys())
+    nodespaces = set(nodenet.nodespaces.keys())
+    for batch in (
+            [{'type': 'Register', 'pos': [100, 100], 'uid': 'new'},
+             {'type': 'Register', 'pos': [100, 100], 'uid': 'new'}],
+            [{'type': 'Register', 'pos': [100, 100], 'uid': 'new'},
+             {'type': 'Register', 'pos': [100, 100], 'uid': 'sub1'}],
+            [{'type': 'Nodespace', 'pos': [100, 100], 'uid': 'ns2'},
+             {'type': 'Register', 'pos': [100, 100], 'nodespace': 'ns2', 'uid': 'new'},
+             {'type': 'Register', 'nodespace': 'ns2'}],
+            [{'type': 'Register', 'pos': [100, 100], 'uid': 'new'},
+             {'type': 'Register', 'pos': [100, 100], 'nodespace': 'ns3'},
+             {'type': 'Nodespace', 'pos': [100, 100], 'uid': 'ns3'}]):
+        res, msg = micropsi.add_nodes(fixed_nodenet, batch)
+        assert not res
+        assert set(nodenet.nodes.keys()) == nodes
+        assert set(nodenet.nodespaces.keys()) == nodespaces
+
+    # errors while creating the nodes remove the nodes that have already been created
+    node_class = micropsi.Node
+
+    def create_node(*args, **kwargs):
+        if kwargs.get('uid') == 'new2':
+            raise ValueError("broken")
+        return node_class(*args, **kwargs)
+
+    with mock.patch.object(micropsi, 'Node', side_effect=create_node):
+        res, msg = micropsi.add_nodes(fixed_nodenet, [
+            {'type': 'Nodespace', 'pos': [100, 100], 'uid': 'ns2'},
+            {'type': 'Register', 'pos': [100, 100], 'nodespace': 'ns2', 'uid': 'new'},
+            {'type': 'Register', 'pos': [100, 100], 'nodespace': 'ns2', 'uid': 'new2'}])
+    assert not res
+    assert "broken" in msg
+    assert set(nodenet.nodes.keys()) == nodes
+    assert set(nodenet.nodespaces.keys()) == nodespaces
+    assert 'new' not in nodenet.state['nodes']
+    assert 'ns2' not in nodenet.state['nodespaces']
+
+
+def test_add_links(fixed_nodenet):
+    links = [
+        {'source_node_uid': 'A1', 'gate_type': 'gen', 'target_node_uid': 'ACTA', 'slot_type': 'gen'},
+        {'source_node_uid': 'A1', 'gate_type': 'gen', 'target_node_uid': 'ACTB', 'slot_type': 'gen',
+         'weight': 0.5, 'uid': 'a1-actb'}]
+    res, uids = micropsi.add_links(fixed_nodenet, links)
+    assert res
+    assert uids[1] == 'a1-actb'
+    nodenet = micropsi.nodenets[fixed_nodenet]
+    assert nodenet.links['a1-actb'].weight == 0.5
+    assert nodenet.get_link_uid('A1', 'gen', 'ACTA', 'gen') == uids[0]
+
+    res, msg = micropsi.add_links(fixed_nodenet, [
+        {'source_node_uid': 'A1', 'gate_type': 'gen', 'target_node_uid': 'ACTA', 'slot_type': 'gen', 'uid': 'new'},
+        {'source_node_uid': 'A1', 'gate_type': 'gen', 'target_node_uid': 'nonexistent', 'slot_type': 'gen'}])
+    assert not res
+    assert 'new' not in nodenet.links
+
+
+def test_set_link_weights(fixed_nodenet):
+    res, msg = micropsi.set_link_weights(fixed_nodenet, [{'link_uid': 'A1A2', 'weight': 0.5},
+                                                         {'link_uid': 'B1B2', 'weight': 0.3, 'certainty': 0.7}])
+    assert res
+    nodenet = micropsi.nodenets[fixed_nodenet]
+    assert nodenet.links['A1A2'].weight == 0.5
+    assert nodenet.links['B1B2'].certainty == 0.7
+
+    res, msg = micropsi.set_link_weights(fixed_nodenet, [{'link_uid': 'A1A2', 'weight': 1},
+                                                         {'link_uid': 'nonexistent', 'weight': 1}])
+    assert not res
+    assert nodenet.links['A1A2'].weight == 0.5
+
+
 def test_clone_nodes_nolinks(fixed_nodenet):
     nodenet = micropsi.get_nodenet(fixed_nodenet)
     success, result = micropsi.clone_nodes(fixed_nodenet, ['A1', 'A2'], 'none', offset=[10, 20])
@@ -187,6 +276,124 @@ def test_clone_nodes_to_new_nodespace(fixed_nodenet):
     assert a1_copy.parent_nodespace == 'ns1'
     assert a2_copy.parent_nodespace == 'ns1'
 
+
+def test_step_plan_is_rebuilt_only_after_topology_changes(fixed_nodenet):
+    nodenet = micropsi.get_nodenet(fixed_nodenet)
+    nodenet.step()
+    plan = nodenet.get_step_plan()
+    nodenet.step()
+    assert nodenet.get_step_plan() is plan
+    assert set(plan.activators.keys()) == {"ACTA", "ACTB"}
+    assert "ACTA" in plan.everythingelse
+
+    node = nodenet.netapi.create_node("Concept", "Root", "New")
+    assert nodenet.get_step_plan() is not plan
+    assert node.uid in nodenet.get_step_plan().everythingelse
+
+    plan = nodenet.get_step_plan()
+    nodenet.netapi.link(node, "gen", nodenet.nodes["A1"], "gen")
+    assert nodenet.get_step_plan() is not plan
+    assert node.get_gate("gen") in nodenet.get_step_plan().linked_gates
+
+    plan = nodenet.get_step_plan()
+    nodenet.delete_node(node.uid)
+    assert nodenet.get_step_plan() is not plan
+    assert node.uid not in nodenet.get_step_plan().everythingelse
+
+
+def test_lazy_state_is_materialized_on_demand(fixed_nodenet):
+    nodenet = micropsi.get_nodenet(fixed_nodenet)
+    nodenet.state['settings']['state_updates'] = 'on_demand'
+    netapi = nodenet.netapi
+    source = netapi.create_node("Register", "Root", "Source")
+    netapi.link(source, "gen", source, "gen")
+    source.activation = 1
+    netapi.link(source, "gen", nodenet.nodes['A1'], "gen")
+    micropsi.get_nodenet_area(fixed_nodenet)
+    nodenet.step()
+    assert nodenet.nodes['A1'].get_gate('gen').activation == 1
+    assert nodenet.state['nodes']['A1']['gate_activations']['gen']['default']['activation'] == 0
+    assert 'A1' in nodenet.dirty_nodes
+
+    data = micropsi.get_nodenet_area(fixed_nodenet)
+    assert data['nodes']['A1']['gate_activations']['gen']['default']['activation'] == 1
+    assert data['nodes']['A1']['sheaves']['default']['activation'] == 1
+    assert len(nodenet.dirty_nodes) == 0
+
+
+def test_run_nodenet_stops_after_steps_or_condition(fixed_nodenet):
+    nodenet = micropsi.get_nodenet(fixed_nodenet)
+    netapi = nodenet.netapi
+    source = netapi.create_node("Register", "Root", "Source")
+    netapi.link(source, "gen", source, "gen")
+    monitor = micropsi.add_gate_monitor(fixed_nodenet, 'A1', 'gen')
+    start = nodenet.current_step
+
+    success, result = micropsi.run_nodenet(fixed_nodenet, steps=5, until={"node": "A1", "gate": "gen", "value": 1})
+    assert success
+    assert result['steps'] == 5
+    assert result['current_step'] == start + 5
+    assert not result['condition_met']
+    assert result['monitors'] == {monitor['uid']: 0}
+    assert list(nodenet.monitors[monitor['uid']].values.keys()) == [start + 5]
+
+    source.activation = 1
+    netapi.link(source, "gen", nodenet.nodes['A1'], "gen")
+    success, result = micropsi.run_nodenet(fixed_nodenet, steps=5, until={"node": "A1", "gate": "gen", "value": 1})
+    assert result['steps'] == 1
+    assert result['condition_met']
+    assert result['monitors'] == {monitor['uid']: 1}
+
+    success, result = micropsi.run_nodenet(fixed_nodenet, steps=1000, timeout=0)
+    assert result['steps'] == 1
+
+    # the condition is only evaluated after the steps, under the netlock of the steps
+    locked = []
+    success, result = micropsi.run_nodenet(fixed_nodenet, steps=3,
+                                           until=lambda net: locked.append(net.netlock.locked()))
+    assert result['steps'] == 3
+    assert not result['condition_met']
+    assert locked == [True, True, True]
+
+
+def test_run_nodenet_rejects_invalid_conditions(fixed_nodenet):
+    nodenet = micropsi.get_nodenet(fixed_nodenet)
+    start = nodenet.current_step
+    for until, message in (({"monitor": "unknown", "value": 1}, "Monitor unknown not found"),
+                           ({"node": "unknown", "value": 1}, "Node unknown not found"),
+                           ({"node": "A1", "gate": "unknown", "value": 1}, "Gate unknown not found on node A1"),
+                           ({"node": "A1", "slot": "unknown", "value": 1}, "Slot unknown not found on node A1"),
+                           ({"node": "A1", "operator": "=>", "value": 1}, "Unknown operator =>"),
+                           ({"node": "A1"}, "Invalid value None")):
+        assert micropsi.run_nodenet(fixed_nodenet, steps=5, until=until) == (False, message)
+    assert nodenet.current_step == start
+
+
+def test_get_nodenet_profile(fixed_nodenet):
+    nodenet = micropsi.get_nodenet(fixed_nodenet)
+    nodenet.step()
+    profile = micropsi.get_nodenet_profile(fixed_nodenet)
+    assert not profile['enabled']
+    assert profile['steps'] == 0
+    assert profile['node_function'] == {'nodetypes': [], 'nodes': []}
+
+    nodenet.state['settings']['profiling'] = True
+    assert micropsi.run_nodenet(fixed_nodenet, steps=3)[0]
+    profile = micropsi.get_nodenet_profile(fixed_nodenet, top=2, reset=True)
+    assert profile['enabled']
+    assert profile['steps'] == 3
+    assert len(profile['node_function']['nodetypes']) == 2
+    assert len(profile['node_function']['nodes']) == 2
+    assert micropsi.get_nodenet_profile(fixed_nodenet)['steps'] == 0
+    nodenet.step()
+    profile = micropsi.get_nodenet_profile(fixed_nodenet, top=100)
+    nodetypes = dict((entry['type'], entry) for entry in profile['node_function']['nodetypes'])
+    assert nodetypes['Concept']['calls'] == len(nodenet.netapi.get_nodes(nodetype='Concept'))
+    nodes = dict((entry['uid'], entry) for entry in profile['propagation']['nodes'])
+    assert nodes['A1']['calls'] == 1     # only the linked por gate propagates
+    assert profile['node_function']['nodes'][0]['time'] >= profile['node_function']['nodes'][-1]['time']
+
+
 """
 def test_set_nodenet_properties(micropsi, test_nodenet):
     assert 0
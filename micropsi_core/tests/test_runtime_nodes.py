@@ -43,6 +43,30 @@ def test_get_nodespace(test_nodenet):
     assert node1["position"] == (200, 250)
 
 
+def test_get_nodenet_area_follows_node_changes(fixed_nodenet):
+    nodenet = micropsi.get_nodenet(fixed_nodenet)
+    micropsi.add_node(fixed_nodenet, "Nodespace", (100, 100), "Root", uid="ns1", name="NS1")
+    micropsi.add_node(fixed_nodenet, "Register", (1050, 1050), "Root", uid="far", name="Far")
+    micropsi.add_node(fixed_nodenet, "Register", (1020, 1080), "ns1", uid="other", name="Other")
+    assert nodenet.max_coords == {'x': 1000, 'y': 1000}
+
+    data = micropsi.get_nodenet_area(fixed_nodenet, "Root", x1=1000, x2=1100, y1=1000, y2=1100)
+    assert list(data['nodes'].keys()) == ["far"]
+
+    micropsi.set_node_position(fixed_nodenet, "far", (2050, 150))
+    assert nodenet.max_coords['x'] == 2000
+    assert micropsi.get_nodenet_area(fixed_nodenet, "Root", x1=1000, x2=1100, y1=1000, y2=1100)['nodes'] == {}
+    assert "far" in micropsi.get_nodenet_area(fixed_nodenet, "Root", x1=0, x2=3000, y1=0, y2=300)['nodes']
+
+    nodenet.nodes["far"].parent_nodespace = "ns1"
+    data = micropsi.get_nodenet_area(fixed_nodenet, "ns1", x1=0, x2=3000, y1=0, y2=3000)
+    assert set(data['nodes'].keys()) == set(["far", "other"])
+
+    micropsi.delete_node(fixed_nodenet, "far")
+    assert nodenet.max_coords == {'x': 1000, 'y': 1000}
+    assert "far" not in nodenet.node_positions
+
+
 def test_get_nodespace_list(test_nodenet):
     data = micropsi.get_nodespace_list(test_nodenet)
     assert data['Root']['name'] == 'Root'
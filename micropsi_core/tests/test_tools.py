@@ -16,3 +16,15 @@ def test_generate_uid():
     assert len(u1)
     assert len(u2)
     assert u1 != u2
+
+
+def test_get_function_compiles_once():
+    micropsi_core.tools.clear_function_cache()
+    f1 = micropsi_core.tools.get_function("return x * 2", parameters="x")
+    f2 = micropsi_core.tools.get_function("return x * 2", parameters="x")
+    assert f1 is f2
+    assert f1(21) == 42
+    assert micropsi_core.tools.get_function("return x * 2", parameters="x=1") is not f1
+    assert micropsi_core.tools.get_function("return x * 3", parameters="x") is not f1
+    micropsi_core.tools.clear_function_cache()
+    assert micropsi_core.tools.get_function("return x * 2", parameters="x") is not f1
@@ -0,0 +1,70 @@
+#!/usr/local/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the vectorized activation spreading engine, against the python reference engine
+"""
+
+import json
+import pytest
+from micropsi_core import runtime as micropsi
+from micropsi_core.tests.conftest import build_random_nodenet, get_activations, assert_same_activations
+
+
+def test_vectorized_engine_matches_python_engine():
+    pytest.importorskip("numpy")
+    reference = build_random_nodenet("python_engine_net", "python")
+    candidate = build_random_nodenet("numpy_engine_net", "numpy")
+    try:
+        for i in range(15):
+            reference.step()
+            candidate.step()
+            assert_same_activations(get_activations(reference), get_activations(candidate))
+        assert candidate.vectorized_engine is not None
+    finally:
+        micropsi.delete_nodenet("python_engine_net")
+        micropsi.delete_nodenet("numpy_engine_net")
+
+
+def test_vectorized_engine_recompiles_on_link_changes(fixed_nodenet):
+    pytest.importorskip("numpy")
+    net = micropsi.get_nodenet(fixed_nodenet)
+    net.state['settings']['engine'] = 'numpy'
+    netapi = net.netapi
+    source = netapi.create_node("Register", "Root", "Source")
+    register = netapi.create_node("Register", "Root", "Register")
+    netapi.link(source, "gen", source, "gen")
+    source.activation = 1
+    net.step()
+    netapi.link(source, "gen", register, "gen", weight=0.5)
+    net.step()
+    assert register.get_slot("gen").activation == 0.5
+    netapi.link(source, "gen", register, "gen", weight=0.3)
+    net.step()
+    assert register.get_slot("gen").activation == 0.3
+    netapi.unlink(source, "gen", register, "gen")
+    net.step()
+    assert register.get_slot("gen").activation == 0
+
+
+def test_single_precision_matches_double_precision():
+    pytest.importorskip("numpy")
+    reference = build_random_nodenet("double_precision_net", "python")
+    candidate = build_random_nodenet("single_precision_net", "numpy")
+    candidate.state['settings']['precision'] = 'single'
+    try:
+        for i in range(15):
+            reference.step()
+            candidate.step()
+            assert_same_activations(get_activations(reference), get_activations(candidate), tolerance=1e-5)
+        assert candidate.nodes['source'].get_gate('gen').sheaves.activations.typecode == 'f'
+        assert candidate.vectorized_engine.weights.dtype == 'float32'
+        data = micropsi.export_nodenet("single_precision_net")
+        assert isinstance(json.loads(data)['nodes']['source']['sheaves']['default']['activation'], float)
+
+        candidate.state['settings']['precision'] = 'double'
+        candidate.step()
+        assert candidate.nodes['source'].get_gate('gen').sheaves.activations.typecode == 'd'
+    finally:
+        micropsi.delete_nodenet("double_precision_net")
+        micropsi.delete_nodenet("single_precision_net")
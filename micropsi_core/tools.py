@@ -10,6 +10,7 @@ __date__ = '29.06.12'
 
 import uuid
 import os
+import hashlib
 
 def generate_uid():
     """produce a unique identifier, restricted to an ASCII string"""
@@ -153,6 +154,32 @@ def create_function(source_string, parameters = "", additional_symbols = None):
     return fct
 
 
+# compiled functions, shared by all nodenets of the process
+function_cache = {}
+
+
+def get_function(source_string, parameters="", additional_symbols=None):
+    """Returns a python function from the given source code, like create_function, but compiles the code only once
+    per process for every source, parameter string and set of additional symbols, and returns the same function
+    object again for all later calls with these arguments.
+
+    The cached functions share their environment, so functions that keep state in their additional symbols should
+    be created with create_function instead. Call clear_function_cache if the sources of the functions may have
+    changed, e.g. when the native modules are reloaded.
+    """
+    symbols = tuple(sorted((name, id(value)) for name, value in (additional_symbols or {}).items()))
+    key = (hashlib.sha1(source_string.encode('utf-8')).hexdigest(), parameters, symbols)
+    fct = function_cache.get(key)
+    if fct is None:
+        fct = function_cache[key] = create_function(source_string, parameters, additional_symbols)
+    return fct
+
+
+def clear_function_cache():
+    """Drops all cached functions, so that they are compiled again when they are requested the next time"""
+    function_cache.clear()
+
+
 class Bunch(dict):
     def __init__(self, **kwargs):
         self.__dict__.update(kwargs)
@@ -62,6 +62,9 @@ class StructuredObjects(WorldAdapter):
         else:
             return WorldAdapter.get_datasource(self, key)
 
+    def get_datasources(self, keys):
+        return [self.get_datasource(key) for key in keys]
+
     def update(self):
         """called on every world simulation step to advance the life of the agent"""
 
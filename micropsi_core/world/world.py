@@ -253,9 +253,16 @@ class World(object):
 
             # remove agent
             del self.agents[nodenet_uid]
+            self.invalidate_binding(nodenet_uid)
         if nodenet_uid in self.data['agents']:
             del self.data['agents'][nodenet_uid]
 
+    def invalidate_binding(self, nodenet_uid):
+        """Tells the nodenet with the given uid, if it is loaded, that its agent in this world changed"""
+        nodenets = getattr(getattr(micropsi_core, 'runtime', None), 'nodenets', {})
+        if nodenet_uid in nodenets:
+            nodenets[nodenet_uid].world_binding.invalidate_agent()
+
     def spawn_agent(self, worldadapter_name, nodenet_uid, **options):
         """Creates an agent object,
 
@@ -264,6 +271,7 @@ class World(object):
         """
         try:
             self.agents[nodenet_uid] = self.supported_worldadapters[worldadapter_name](self, uid=nodenet_uid, **options)
+            self.invalidate_binding(nodenet_uid)
             return True, nodenet_uid
         except AttributeError:
             return False, "Worldadapter \"%s\" not found" % worldadapter_name
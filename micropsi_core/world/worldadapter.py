@@ -67,15 +67,32 @@ class WorldAdapter(WorldObject):
         """allows the agent to read a value from a datasource"""
         return self.datasource_snapshots.get(key)
 
+    def get_datasources(self, keys):
+        """allows the agent to read the values of many datasources at once, returns them as a list"""
+        snapshots = self.datasource_snapshots
+        return [snapshots.get(key) for key in keys]
+
     def set_datatarget(self, key, value):
         """allows the agent to write a value to a datatarget"""
         if key in self.datatargets:
             self.datatargets[key] = value
 
+    def set_datatargets(self, keys, values):
+        """allows the agent to write values to many datatargets at once"""
+        datatargets = self.datatargets
+        for key, value in zip(keys, values):
+            if key in datatargets:
+                datatargets[key] = value
+
     def get_datatarget_feedback(self, key):
         """get feedback whether the actor-induced action succeeded"""
         return self.datatarget_feedback.get(key, 0)
 
+    def get_datatarget_feedbacks(self, keys):
+        """get the feedback of many datatargets at once, as a list"""
+        feedback = self.datatarget_feedback
+        return [feedback.get(key, 0) for key in keys]
+
     def set_datatarget_feedback(self, key, value):
         """set feedback for the given datatarget"""
         self.datatarget_feedback[key] = value
@@ -736,6 +736,24 @@ def step_nodenet(nodenet_uid):
     return runtime.step_nodenet(nodenet_uid)
 
 
+@rpc("run_nodenet", permission_required="manage nodenets")
+def run_nodenet(nodenet_uid, steps=runtime.RUN_NODENET_MAX_STEPS, until=None,
+                timeout=runtime.RUN_NODENET_MAX_SECONDS, monitors=None):
+    return runtime.run_nodenet(nodenet_uid, steps=steps, until=until, timeout=timeout, monitors=monitors)
+
+
+@rpc("get_nodenet_profile")
+def get_nodenet_profile(nodenet_uid, top=10, reset=False):
+    return runtime.get_nodenet_profile(nodenet_uid, top=top, reset=reset)
+
+
+@rpc("get_native_module_violations")
+def get_native_module_violations(nodenet_uid):
+    """ returns the time budget violations of native modules. Only isolated modules are stopped when they exceed
+    their budget; all others are reported after they returned."""
+    return runtime.get_native_module_violations(nodenet_uid)
+
+
 @rpc("revert_nodenet", permission_required="manage nodenets")
 def revert_nodenet(nodenet_uid):
     return runtime.revert_nodenet(nodenet_uid)
@@ -962,6 +980,15 @@ def add_node(nodenet_uid, type, pos, nodespace, state=None, uid=None, name="", p
         return dict(status="error", msg=uid)
 
 
+@rpc("add_nodes", permission_required="manage nodenets")
+def add_nodes(nodenet_uid, nodes):
+    result, uids = runtime.add_nodes(nodenet_uid, nodes)
+    if result:
+        return dict(status="success", uids=uids)
+    else:
+        return dict(status="error", msg=uids)
+
+
 @rpc("clone_nodes", permission_required="manage nodenets")
 def clone_nodes(nodenet_uid, node_uids, clone_mode="all", nodespace=None, offset=[50, 50]):
     added, result = runtime.clone_nodes(nodenet_uid, node_uids, clone_mode, nodespace=nodespace, offset=offset)
@@ -1087,11 +1114,29 @@ def add_link(nodenet_uid, source_node_uid, gate_type, target_node_uid, slot_type
         return {'status': 'error', 'msg': uid}
 
 
+@rpc("add_links", permission_required="manage nodenets")
+def add_links(nodenet_uid, links):
+    res, uids = runtime.add_links(nodenet_uid, links)
+    if res:
+        return {'status': 'success', 'uids': uids}
+    else:
+        return {'status': 'error', 'msg': uids}
+
+
 @rpc("set_link_weight", permission_required="manage nodenets")
 def set_link_weight(nodenet_uid, link_uid, weight, certainty=1):
     return runtime.set_link_weight(nodenet_uid, link_uid, weight, certainty)
 
 
+@rpc("set_link_weights", permission_required="manage nodenets")
+def set_link_weights(nodenet_uid, links):
+    res, msg = runtime.set_link_weights(nodenet_uid, links)
+    if res:
+        return {'status': 'success', 'count': msg}
+    else:
+        return {'status': 'error', 'msg': msg}
+
+
 @rpc("get_link")
 def get_link(nodenet_uid, link_uid):
     return runtime.get_link(nodenet_uid, link_uid)
@@ -3063,6 +3063,9 @@ function handleEditNodenet(event){
         params.worldadapter = worldadapter;
     }
     nodenet_data.settings['renderlinks'] = $('#nodenet_renderlinks').val();
+    nodenet_data.settings['engine'] = $('#nodenet_engine').val();
+    nodenet_data.settings['state_updates'] = $('#nodenet_state_updates').val();
+    nodenet_data.settings['stepping'] = $('#nodenet_stepping').val();
     params.settings = nodenet_data.settings;
 
     api.call("set_nodenet_properties", params,
@@ -3397,6 +3400,9 @@ function showNativeModuleForm(nodeUid){
 function showDefaultForm(){
     $('#nodenet_forms .form-horizontal').hide();
     $('#nodenet_renderlinks').val(nodenet_data.settings['renderlinks']);
+    $('#nodenet_engine').val(nodenet_data.settings['engine'] || 'python');
+    $('#nodenet_state_updates').val(nodenet_data.settings['state_updates'] || 'every_step');
+    $('#nodenet_stepping').val(nodenet_data.settings['stepping'] || 'full');
     $('#nodenet_forms .default_form').show();
 }
 
@@ -101,6 +101,28 @@
                             <option value="no">never</opeion>
                         </select></td>
                     </tr>
+                    <tr>
+                        <td><label for="nodenet_engine">engine</label></td>
+                        <td><select name="nodenet_engine" id="nodenet_engine">
+                            <option value="python">python</option>
+                            <option value="numpy">numpy (vectorized)</option>
+                        </select></td>
+                    </tr>
+                    <tr>
+                        <td><label for="nodenet_state_updates">state updates</label></td>
+                        <td><select name="nodenet_state_updates" id="nodenet_state_updates">
+                            <option value="every_step">every step</option>
+                            <option value="on_demand">on demand</option>
+                        </select></td>
+                    </tr>
+                    <tr>
+                        <td><label for="nodenet_stepping">stepping</label></td>
+                        <td><select name="nodenet_stepping" id="nodenet_stepping">
+                            <option value="full">all nodes</option>
+                            <option value="event_driven">event-driven</option>
+                            <option value="partitioned">partitioned (worker processes)</option>
+                        </select></td>
+                    </tr>
                 </table>
                 <div class="controls">
                     <button type="submit" class="btn btn-primary">Apply</button>